@@ -1,19 +1,437 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, g, has_request_context
+from flask.json.provider import DefaultJSONProvider
+import click
 from werkzeug.security import generate_password_hash, check_password_hash
 import psycopg2
 import psycopg2.errors
+import psycopg2.extras
+import psycopg2.pool
 import os
 from dotenv import load_dotenv
+import base64
+import bisect
+import collections
+import collections.abc
+import concurrent.futures
+import contextlib
+import contextvars
+import datetime
+import hashlib
+import heapq
+import itertools
 import json
-
-load_dotenv() 
+import math
+import multiprocessing
+import re
+import sys
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+
+load_dotenv()
 app = Flask(__name__)
 app.secret_key = os.getenv("SECRET_KEY", "dev-secret")
 
 
+# ============================================================
+# DATABASE CONNECTION POOL
+# ============================================================
+
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+
+
+class ConnectionPool:
+    """Bounded pool of psycopg2 connections with checkout timeout and stats"""
+
+    def __init__(self, dsn, minconn, maxconn, timeout, **connect_kwargs):
+        self.timeout = timeout
+        self._pool = psycopg2.pool.ThreadedConnectionPool(minconn, maxconn, dsn, **connect_kwargs)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self.maxconn = maxconn
+        self.in_use = 0
+        self.waiting = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.discarded = 0
+        self.checkout_time_total = 0.0
+        self.checkout_time_max = 0.0
+
+    def getconn(self):
+        """Borrow a healthy connection, waiting up to `timeout` seconds for a free slot"""
+        started = time.perf_counter()
+
+        with self._lock:
+            self.waiting += 1
+        acquired = self._slots.acquire(timeout=self.timeout)
+        with self._lock:
+            self.waiting -= 1
+
+        if not acquired:
+            with self._lock:
+                self.timeouts += 1
+            raise psycopg2.pool.PoolError("Timed out waiting for a database connection")
+
+        try:
+            conn = self._checkout_healthy()
+        except Exception:
+            self._slots.release()
+            raise
+
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.in_use += 1
+            self.checkouts += 1
+            self.checkout_time_total += elapsed
+            self.checkout_time_max = max(self.checkout_time_max, elapsed)
+        return conn
+
+    def _checkout_healthy(self):
+        """Take a connection from the pool, replacing it once if it is broken"""
+        for attempt in range(2):
+            conn = self._pool.getconn()
+            try:
+                if conn.closed:
+                    raise psycopg2.InterfaceError("connection already closed")
+                # Plain cursor: the ping counts as acquire time, not as a query
+                with conn.cursor(cursor_factory=psycopg2.extensions.cursor) as cur:
+                    cur.execute("SELECT 1")
+                conn.rollback()
+                return conn
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                self._pool.putconn(conn, close=True)
+                with self._lock:
+                    self.discarded += 1
+                if attempt:
+                    raise
+
+    def putconn(self, conn):
+        """Return a connection to the pool, dropping it if it is no longer usable"""
+        self._pool.putconn(conn, close=bool(conn.closed))
+        with self._lock:
+            self.in_use -= 1
+        self._slots.release()
+
+    def stats(self):
+        """Snapshot of pool usage for monitoring"""
+        with self._lock:
+            avg = self.checkout_time_total / self.checkouts if self.checkouts else 0.0
+            return {
+                "pid": os.getpid(),
+                "max_size": self.maxconn,
+                "in_use": self.in_use,
+                "waiting": self.waiting,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "discarded": self.discarded,
+                "checkout_ms_avg": round(avg * 1000, 3),
+                "checkout_ms_max": round(self.checkout_time_max * 1000, 3)
+            }
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Get this worker's pool (created lazily so gunicorn pre-fork workers don't share sockets)"""
+    global _pool, _pool_pid
+
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                _pool = ConnectionPool(
+                    os.getenv("DATABASE_URL"), DB_POOL_MIN, DB_POOL_MAX, DB_POOL_TIMEOUT,
+                    connection_factory=InstrumentedConnection
+                )
+                _pool_pid = pid
+    return _pool
+
+
+@contextmanager
 def get_conn():
-    """Get database connection"""
-    return psycopg2.connect(os.getenv("DATABASE_URL"))
+    """Borrow a database connection from the pool (commit on success, rollback on error)"""
+    pool = get_pool()
+    started = time.perf_counter()
+    conn = pool.getconn()
+    record_request_metric("acquire", time.perf_counter() - started)
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            pass
+        raise
+    finally:
+        pool.putconn(conn)
+
+
+# ============================================================
+# INSTRUMENTATION
+# ============================================================
+# Every request records its SQL statement count, DB time, connection-acquire
+# time, JSON serialization time and response size per route; GET /metrics
+# serves the per-process totals in Prometheus text format. Setting
+# PROFILE_SLOW_MS turns on a stack sampler whose samples are written as
+# collapsed stacks (flamegraph.pl / speedscope) to PROFILE_DIR for every
+# request slower than that. asgi.py's async routes record the same way,
+# through async_request_metrics instead of g.
+
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+
+# The counters of the async request being served, set by asgi.py
+async_request_metrics = contextvars.ContextVar("async_request_metrics", default=None)
+
+
+def new_request_metrics():
+    return {"queries": 0, "db": 0.0, "acquire": 0.0, "serialize": 0.0}
+
+
+def record_request_metric(name, value):
+    """Add to one of the current request's counters (no-op outside a request)"""
+    if has_request_context():
+        if "request_metrics" in g:
+            g.request_metrics[name] += value
+        return
+    counters = async_request_metrics.get()
+    if counters is not None:
+        counters[name] += value
+
+
+class InstrumentedCursor(psycopg2.extensions.cursor):
+    """Cursor that counts and times statements for the current request"""
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            record_request_metric("queries", 1)
+            record_request_metric("db", time.perf_counter() - started)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            record_request_metric("queries", 1)
+            record_request_metric("db", time.perf_counter() - started)
+
+
+class InstrumentedConnection(psycopg2.extensions.connection):
+    def cursor(self, *args, **kwargs):
+        kwargs.setdefault("cursor_factory", InstrumentedCursor)
+        return super().cursor(*args, **kwargs)
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, timing dumps() for the current request"""
+
+    def dumps(self, obj, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            record_request_metric("serialize", time.perf_counter() - started)
+
+
+app.json = TimedJSONProvider(app)
+
+
+class RouteMetrics:
+    """Per-route request totals and latency histograms"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+        self._statuses = {}
+
+    def observe(self, method, route, status, duration, counters, size):
+        with self._lock:
+            entry = self._routes.get((method, route))
+            if entry is None:
+                entry = self._routes[(method, route)] = {
+                    "count": 0, "duration": 0.0, "buckets": [0] * len(METRICS_BUCKETS),
+                    "queries": 0, "db": 0.0, "acquire": 0.0, "serialize": 0.0, "bytes": 0
+                }
+            entry["count"] += 1
+            entry["duration"] += duration
+            for i, bound in enumerate(METRICS_BUCKETS):
+                if duration <= bound:
+                    entry["buckets"][i] += 1
+            for name in ("queries", "db", "acquire", "serialize"):
+                entry[name] += counters[name]
+            entry["bytes"] += size
+            key = (method, route, status)
+            self._statuses[key] = self._statuses.get(key, 0) + 1
+
+    def render(self, pool_stats=None):
+        """Prometheus text exposition format"""
+        def labels(method, route, **extra):
+            pairs = {"method": method, "route": route, **extra}
+            return ",".join(
+                f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                for k, v in pairs.items()
+            )
+
+        with self._lock:
+            routes = {key: dict(entry, buckets=list(entry["buckets"])) for key, entry in self._routes.items()}
+            statuses = dict(self._statuses)
+
+        lines = [
+            "# HELP http_requests_total Requests handled, by route and status.",
+            "# TYPE http_requests_total counter"
+        ]
+        for (method, route, status), count in sorted(statuses.items()):
+            lines.append(f"http_requests_total{{{labels(method, route, status=status)}}} {count}")
+
+        lines += [
+            "# HELP http_request_duration_seconds Request latency.",
+            "# TYPE http_request_duration_seconds histogram"
+        ]
+        for (method, route), entry in sorted(routes.items()):
+            for bound, count in zip(METRICS_BUCKETS, entry["buckets"]):
+                lines.append(f"http_request_duration_seconds_bucket{{{labels(method, route, le=bound)}}} {count}")
+            lines.append(f"http_request_duration_seconds_bucket{{{labels(method, route, le='+Inf')}}} {entry['count']}")
+            lines.append(f"http_request_duration_seconds_sum{{{labels(method, route)}}} {entry['duration']:.6f}")
+            lines.append(f"http_request_duration_seconds_count{{{labels(method, route)}}} {entry['count']}")
+
+        totals = (
+            ("db_queries_total", "queries", "SQL statements executed.", "{:d}"),
+            ("db_query_seconds_total", "db", "Time spent executing SQL.", "{:.6f}"),
+            ("db_connection_acquire_seconds_total", "acquire", "Time spent waiting for a pooled connection.", "{:.6f}"),
+            ("json_serialization_seconds_total", "serialize", "Time spent serializing JSON responses.", "{:.6f}"),
+            ("http_response_bytes_total", "bytes", "Response body bytes sent.", "{:d}")
+        )
+        for metric, name, help_text, fmt in totals:
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+            for (method, route), entry in sorted(routes.items()):
+                lines.append(f"{metric}{{{labels(method, route)}}} {fmt.format(entry[name])}")
+
+        if pool_stats:
+            lines += [
+                "# HELP db_pool_connections Pooled connections by state.",
+                "# TYPE db_pool_connections gauge",
+                f'db_pool_connections{{state="in_use"}} {pool_stats["in_use"]}',
+                f'db_pool_connections{{state="waiting"}} {pool_stats["waiting"]}',
+                f'db_pool_connections{{state="max"}} {pool_stats["max_size"]}',
+                "# HELP db_pool_timeouts_total Checkouts that timed out.",
+                "# TYPE db_pool_timeouts_total counter",
+                f'db_pool_timeouts_total {pool_stats["timeouts"]}'
+            ]
+        return "\n".join(lines) + "\n"
+
+
+route_metrics = RouteMetrics()
+
+
+class SlowRequestProfiler:
+    """Samples the stacks of threads serving requests every `interval` seconds.
+
+    Requests are keyed by their thread, or by `key` when several share one
+    (async requests on an event loop, which then also sample each other).
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._active = {}
+        self._thread = None
+
+    def start(self, ident, key=None):
+        with self._lock:
+            self._active[ident if key is None else key] = (ident, collections.Counter())
+            if self._thread is None or self._thread[0] != os.getpid():
+                thread = threading.Thread(target=self._run, daemon=True)
+                self._thread = (os.getpid(), thread)
+                thread.start()
+
+    def stop(self, key):
+        """Stop sampling a request and return its Counter of collapsed stacks"""
+        with self._lock:
+            entry = self._active.pop(key, None)
+        return entry and entry[1]
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, samples in self._active.values():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        samples[self._collapse(frame)] += 1
+
+    @staticmethod
+    def _collapse(frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def dump(self, samples, route, duration):
+        """Write collapsed stacks to PROFILE_DIR; returns the file path"""
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+        path = os.path.join(
+            PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{int(duration * 1000)}ms-{slug}.folded"
+        )
+        with open(path, "w") as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+
+slow_profiler = SlowRequestProfiler(PROFILE_INTERVAL_MS / 1000) if PROFILE_SLOW_MS > 0 else None
+
+
+def finish_request_metrics(method, route, status, started, counters, size, profile_key):
+    """Record a finished request in route_metrics and dump its profile if it was slow"""
+    duration = time.perf_counter() - started
+    route_metrics.observe(method, route, status, duration, counters, size)
+
+    if slow_profiler:
+        samples = slow_profiler.stop(profile_key)
+        if samples and duration * 1000 >= PROFILE_SLOW_MS:
+            try:
+                slow_profiler.dump(samples, f"{method} {route}", duration)
+            except OSError as e:
+                print(f"Error writing profile: {str(e)}")
+
+
+@app.before_request
+def _start_request_metrics():
+    g.request_metrics = new_request_metrics()
+    g.request_started = time.perf_counter()
+    if slow_profiler:
+        slow_profiler.start(threading.get_ident())
+
+
+@app.after_request
+def _record_request_metrics(response):
+    if "request_started" not in g:
+        return response
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    size = 0 if response.is_streamed else (response.content_length or 0)
+
+    finish_request_metrics(
+        request.method, route, response.status_code, g.request_started, g.request_metrics, size,
+        threading.get_ident()
+    )
+    return response
 
 
 def login_required(f):
@@ -26,6 +444,524 @@ def login_required(f):
     return wrapper
 
 
+# ============================================================
+# CHANGE NOTIFICATIONS
+# ============================================================
+# In-process caches subscribe to a Postgres NOTIFY channel so every worker
+# (and every gunicorn process) hears about changes made by any other one.
+# on_notify(payload) runs per notification; on_reconnect() runs whenever the
+# listener (re)connects, since anything may have changed while it was down.
+
+_change_handlers = {}
+_change_listener = None
+_change_lock = threading.Lock()
+
+
+def on_db_change(channel, on_notify, on_reconnect):
+    """Register callbacks for a NOTIFY channel"""
+    _change_handlers[channel] = (on_notify, on_reconnect)
+
+
+def _listen_for_changes():
+    """Background loop: dispatch NOTIFY messages to the registered handlers"""
+    import select
+
+    while True:
+        conn = None
+        try:
+            conn = psycopg2.connect(os.getenv("DATABASE_URL"))
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                for channel in _change_handlers:
+                    cur.execute(f"LISTEN {channel}")
+            for on_notify, on_reconnect in _change_handlers.values():
+                on_reconnect()
+            while True:
+                if select.select([conn], [], [], 60) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    handler = _change_handlers.get(notify.channel)
+                    if handler:
+                        handler[0](notify.payload)
+        except Exception as e:
+            print(f"Change listener error: {str(e)}")
+            time.sleep(5)
+        finally:
+            if conn is not None:
+                conn.close()
+
+
+def ensure_change_listener():
+    """Start the LISTEN thread once per worker process (DB_CHANGE_LISTEN=0 disables it)"""
+    global _change_listener
+
+    if os.getenv("DB_CHANGE_LISTEN", "1") != "1":
+        return
+    if _change_listener is not None and _change_listener[0] == os.getpid():
+        return
+    with _change_lock:
+        if _change_listener is not None and _change_listener[0] == os.getpid():
+            return
+        thread = threading.Thread(target=_listen_for_changes, daemon=True)
+        _change_listener = (os.getpid(), thread)
+        thread.start()
+
+
+# Per-person caches register with on_person_change(). Routes call
+# person_changed(person_id) after committing a change to that person's
+# profile, education, career, preferences or publish flags; it refreshes this
+# worker and NOTIFYs PERSON_CHANNEL so the other workers refresh too. The
+# payload is "person_id:pid" so a worker skips its own notifications; a bare
+# "person_id" (e.g. from psql) refreshes every worker.
+
+PERSON_CHANNEL = "person_changed"
+
+_person_watchers = []
+
+
+def on_person_change(refresh, invalidate_all):
+    """Register refresh(cur, person_id) and invalidate_all() for a per-person cache"""
+    _person_watchers.append((refresh, invalidate_all))
+
+
+def _invalidate_person_caches():
+    for refresh, invalidate_all in _person_watchers:
+        invalidate_all()
+
+
+def _refresh_person_caches(cur, person_id):
+    for refresh, invalidate_all in _person_watchers:
+        refresh(cur, person_id)
+
+
+def _on_person_notify(payload):
+    person_id, _, sender = payload.partition(":")
+    if sender == str(os.getpid()):
+        return
+    try:
+        person_id = int(person_id)
+    except ValueError:
+        _invalidate_person_caches()
+        return
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            _refresh_person_caches(cur, person_id)
+
+
+on_db_change(PERSON_CHANNEL, _on_person_notify, _invalidate_person_caches)
+
+
+def person_changed(person_id):
+    """Refresh this worker's per-person caches for person_id and notify the other workers.
+
+    Call after the change is committed.
+    """
+    try:
+        with get_conn() as conn:
+            with conn.cursor() as cur:
+                _refresh_person_caches(cur, person_id)
+                cur.execute("SELECT pg_notify(%s, %s)", (PERSON_CHANNEL, f"{person_id}:{os.getpid()}"))
+    except Exception as e:
+        print(f"Error refreshing caches for person {person_id}: {str(e)}")
+        _invalidate_person_caches()
+
+
+# ============================================================
+# REFERENCE DATA CACHE
+# ============================================================
+# country, study_level, faculty, institute, programme and topic only change
+# when an admin reloads them (populateCountriesANDUniversityTables.txt).
+# Responses are cached as pre-serialized JSON and dropped when the version
+# counter moves: invalidate_reference_data() in-process, a NOTIFY on the
+# REFERENCE_CHANNEL channel from psql, or the TTL as a fallback.
+
+REFERENCE_CACHE_TTL = int(os.getenv("REFERENCE_CACHE_TTL", "3600"))
+REFERENCE_CHANNEL = "reference_data_changed"
+
+_reference_cache = {}
+_reference_version = 0
+_reference_lock = threading.Lock()
+
+
+def invalidate_reference_data():
+    """Bump the reference data version so every cached response is rebuilt"""
+    global _reference_version
+    with _reference_lock:
+        _reference_version += 1
+        _reference_cache.clear()
+
+
+on_db_change(
+    REFERENCE_CHANNEL,
+    lambda payload: invalidate_reference_data(),
+    invalidate_reference_data
+)
+
+
+def get_reference_data(key, loader):
+    """Get (payload, body, etag) for a reference data key, loading it on a miss.
+
+    loader(cur) must return a JSON-serializable payload.
+    """
+    ensure_change_listener()
+    now = time.monotonic()
+
+    with _reference_lock:
+        entry = _reference_cache.get(key)
+        version = _reference_version
+    if entry and entry["expires"] > now:
+        return entry["payload"], entry["body"], entry["etag"]
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            payload = loader(cur)
+
+    body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    etag = f"v{version}-{hashlib.sha1(body).hexdigest()[:16]}"
+
+    with _reference_lock:
+        # Don't store a result that was loaded against an older version
+        if version == _reference_version:
+            _reference_cache[key] = {
+                "payload": payload,
+                "body": body,
+                "etag": etag,
+                "expires": now + REFERENCE_CACHE_TTL
+            }
+    return payload, body, etag
+
+
+def reference_response(key, loader):
+    """Serve cached reference data with ETag / Cache-Control (304 on If-None-Match)"""
+    payload, body, etag = get_reference_data(key, loader)
+    response = app.response_class(body, status=200, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "public, max-age=300, must-revalidate"
+    return response.make_conditional(request)
+
+
+# ============================================================
+# IDENTITY CACHE
+# ============================================================
+# The logged-in user's role, publish flags and display name, kept server-side
+# so routes don't re-read person on every request. In-process by default;
+# set IDENTITY_CACHE_URL (redis://...) to share one store between workers -
+# any Redis-compatible server works, the redis package is only needed then.
+# Dropped by person_changed() (save_personal, publish/unpublish) and logout.
+
+IDENTITY_CACHE_TTL = int(os.getenv("IDENTITY_CACHE_TTL", "900"))
+IDENTITY_CACHE_MAX = int(os.getenv("IDENTITY_CACHE_MAX", "10000"))
+IDENTITY_CACHE_URL = os.getenv("IDENTITY_CACHE_URL")
+
+
+class MemoryIdentityStore:
+    """Per-process LRU of user_id -> (expires, identity), at most max_entries"""
+
+    shared = False
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return entry[1]
+
+    def set(self, user_id, identity):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, identity)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisIdentityStore:
+    """Identities as JSON under identity:<user_id> in a Redis-compatible server"""
+
+    prefix = "identity:"
+    shared = True
+
+    def __init__(self, url, ttl):
+        import redis
+        self.ttl = ttl
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, user_id):
+        raw = self._client.get(f"{self.prefix}{user_id}")
+        return json.loads(raw) if raw else None
+
+    def set(self, user_id, identity):
+        self._client.setex(f"{self.prefix}{user_id}", self.ttl, json.dumps(identity))
+
+    def delete(self, user_id):
+        self._client.delete(f"{self.prefix}{user_id}")
+
+    def clear(self):
+        keys = list(self._client.scan_iter(f"{self.prefix}*"))
+        if keys:
+            self._client.delete(*keys)
+
+
+identity_store = (
+    RedisIdentityStore(IDENTITY_CACHE_URL, IDENTITY_CACHE_TTL)
+    if IDENTITY_CACHE_URL else MemoryIdentityStore(IDENTITY_CACHE_TTL, IDENTITY_CACHE_MAX)
+)
+
+
+def get_identity(user_id):
+    """Get {id, username, identity_role, first_name, last_name, profile_published,
+    preferences_published} for a user, or None if they don't exist"""
+    ensure_change_listener()
+    identity = identity_store.get(user_id)
+    if identity is not None:
+        return identity
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT id, username, identity_role, first_name, last_name,
+                       profile_published, preferences_published
+                FROM person
+                WHERE id = %s
+                """,
+                (user_id,)
+            )
+            row = cur.fetchone()
+
+    if not row:
+        return None
+    identity = {
+        "id": row[0],
+        "username": row[1],
+        "identity_role": row[2],
+        "first_name": row[3],
+        "last_name": row[4],
+        "profile_published": row[5],
+        "preferences_published": row[6]
+    }
+    identity_store.set(user_id, identity)
+    return identity
+
+
+def invalidate_identity(user_id):
+    """Drop a user's cached identity"""
+    identity_store.delete(user_id)
+
+
+def _clear_local_identities():
+    # Runs after this worker missed notifications (listener reconnect). A
+    # shared store is left alone: its entries expire by TTL and every change
+    # is deleted per key, so one worker's reconnect mustn't empty it for all.
+    if not identity_store.shared:
+        identity_store.clear()
+
+
+on_person_change(lambda cur, person_id: invalidate_identity(person_id), _clear_local_identities)
+
+
+# ============================================================
+# PAGINATION HELPERS
+# ============================================================
+
+def encode_cursor(values):
+    """Encode the sort key of the last row on a page as an opaque cursor"""
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor, types):
+    """Decode a cursor from encode_cursor() holding one value of each of `types`
+    (a bool never passes as an int); raises ValueError if it is malformed"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(types):
+        raise ValueError("Invalid cursor")
+    for value, expected in zip(values, types):
+        if isinstance(value, bool) or not isinstance(value, expected):
+            raise ValueError("Invalid cursor")
+    return values
+
+
+def get_page_size(default, maximum):
+    """Read ?limit= clamped to 1..maximum"""
+    limit = request.args.get("limit", type=int) or default
+    return max(1, min(limit, maximum))
+
+
+# ============================================================
+# STREAMING JSON
+# ============================================================
+# ?stream=1 on the big list endpoints returns every row instead of one page.
+# Rows come from a server-side (named) cursor STREAM_ITERSIZE at a time and
+# are written out as they arrive, so memory per request stays flat and the
+# first bytes go out before the query has finished. The connection is held
+# until the response is closed. A failure part way through rolls the
+# connection back and ends the body with STREAM_ERROR_MARKER (a record
+# separator, as in RFC 7464) and an error object after the partial JSON, so
+# clients can tell a cut-off stream apart.
+
+STREAM_ITERSIZE = int(os.getenv("STREAM_ITERSIZE", "500"))
+STREAM_CHUNK_BYTES = int(os.getenv("STREAM_CHUNK_BYTES", str(64 * 1024)))
+STREAM_ERROR_MARKER = "\n\x1e"
+
+
+def wants_stream():
+    return request.args.get("stream") == "1"
+
+
+def stream_query(resources, conn, sql, params):
+    """Run sql on a named cursor and return an iterator over its rows.
+
+    The cursor is closed with resources, ahead of the connection it is on.
+    """
+    cur = conn.cursor(name="stream_rows")
+
+    def close():
+        if not conn.closed:
+            cur.close()
+    resources.callback(close)
+
+    cur.itersize = STREAM_ITERSIZE
+    cur.execute(sql, params)
+    return iter(cur)
+
+
+def _json_chunks(fields):
+    """Encode (key, value) pairs as one JSON object; iterator values become arrays"""
+    def dumps(value):
+        return app.json.dumps(value, separators=(",", ":"))
+
+    yield "{"
+    for i, (key, value) in enumerate(fields):
+        yield ("," if i else "") + dumps(key) + ":"
+        if isinstance(value, collections.abc.Iterator):
+            yield "["
+            for j, item in enumerate(value):
+                yield ("," if j else "") + dumps(item)
+            yield "]"
+        else:
+            yield dumps(value)
+    yield "}\n"
+
+
+def _buffered(chunks, size):
+    buffer = []
+    buffered = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= size:
+            yield "".join(buffer).encode("utf-8")
+            buffer = []
+            buffered = 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+def stream_json_response(fields, resources):
+    """Stream a JSON object built from (key, value) pairs, as _json_chunks does.
+
+    resources (an ExitStack holding the connection) is closed with the response,
+    or with the exception if the body fails.
+    """
+    def body():
+        try:
+            yield from _buffered(_json_chunks(fields), STREAM_CHUNK_BYTES)
+        except Exception as e:
+            print(f"Error streaming response: {str(e)}")
+            resources.__exit__(*sys.exc_info())
+            error = app.json.dumps({"error": str(e)}, separators=(",", ":"))
+            yield f"{STREAM_ERROR_MARKER}{error}\n".encode("utf-8")
+
+    response = app.response_class(body(), mimetype="application/json")
+    response.call_on_close(resources.close)
+    return response
+
+
+# ============================================================
+# PASSWORD HASHING
+# ============================================================
+# PASSWORD_HASH_METHOD is any werkzeug method string ("scrypt",
+# "pbkdf2:sha256:600000", ...). Hashes made with another method or cost are
+# upgraded on the next successful login. Checks run on a small thread pool
+# (hashlib releases the GIL) so a burst of logins uses at most
+# PASSWORD_CHECK_WORKERS cores; more than PASSWORD_CHECK_QUEUE waiting checks
+# are turned away instead of piling up request threads.
+
+PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt")
+PASSWORD_CHECK_WORKERS = int(os.getenv("PASSWORD_CHECK_WORKERS", "2"))
+PASSWORD_CHECK_QUEUE = int(os.getenv("PASSWORD_CHECK_QUEUE", "32"))
+PASSWORD_CHECK_TIMEOUT = float(os.getenv("PASSWORD_CHECK_TIMEOUT", "5"))
+
+_password_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=PASSWORD_CHECK_WORKERS, thread_name_prefix="password-check"
+)
+_password_slots = threading.BoundedSemaphore(PASSWORD_CHECK_QUEUE)
+_password_method_prefix = None
+
+
+class PasswordCheckBusy(Exception):
+    """Raised when too many password checks are already waiting"""
+
+
+def hash_password(password):
+    """Hash a password with the configured PASSWORD_HASH_METHOD"""
+    return generate_password_hash(password, method=PASSWORD_HASH_METHOD)
+
+
+def password_needs_rehash(password_hash):
+    """True if password_hash was made with a different method or cost than the current policy"""
+    global _password_method_prefix
+    if _password_method_prefix is None:
+        # werkzeug fills in default parameters, so read them off a real hash
+        _password_method_prefix = hash_password("").split("$", 1)[0]
+    return password_hash.split("$", 1)[0] != _password_method_prefix
+
+
+def _check_and_rehash(password_hash, password):
+    if not check_password_hash(password_hash, password):
+        return False, None
+    if password_needs_rehash(password_hash):
+        return True, hash_password(password)
+    return True, None
+
+
+def check_password(password_hash, password):
+    """Check a password on the hashing pool: (ok, new_hash or None).
+
+    Raises PasswordCheckBusy if the pool's queue is full.
+    """
+    if not _password_slots.acquire(timeout=PASSWORD_CHECK_TIMEOUT):
+        raise PasswordCheckBusy()
+    try:
+        future = _password_executor.submit(_check_and_rehash, password_hash, password)
+        return future.result()
+    finally:
+        _password_slots.release()
+
+
 # ============================================================
 # AUTH ROUTES
 # ============================================================
@@ -48,18 +984,35 @@ def api_register():
     data = request.get_json(silent=True) or {}
 
     username = (data.get("username") or "").strip()
-    email = (data.get("email") or "").strip()
+    # Lower-cased like the people import (_normalize_import_row)
+    email = (data.get("email") or "").strip().lower()
     password = data.get("password") or ""
     role = (data.get("identity_role") or "").strip().lower()
 
     if not username or not email or not password or role not in ("student", "alumni"):
         return jsonify({"error": "Invalid input"}), 400
 
-    password_hash = generate_password_hash(password)
+    password_hash = hash_password(password)
 
     try:
         with get_conn() as conn:
             with conn.cursor() as cur:
+                # Login matches either column case-insensitively, so neither may
+                # equal an existing username or email in any case (the unique
+                # lower() indexes from migrations/0007 cover same-column races)
+                cur.execute(
+                    """
+                    SELECT 1
+                    FROM person
+                    WHERE lower(username) IN (lower(%s), lower(%s))
+                       OR lower(email) IN (lower(%s), lower(%s))
+                    LIMIT 1
+                    """,
+                    (username, email, username, email)
+                )
+                if cur.fetchone():
+                    return jsonify({"error": "Username or email already exists"}), 409
+
                 cur.execute(
                     """
                     INSERT INTO person (username, email, password_hash, identity_role, first_name, last_name)
@@ -95,26 +1048,47 @@ def api_login():
     if not identifier or not password:
         return jsonify({"error": "Invalid input"}), 400
 
+    # Username or email, case-insensitively: a BitmapOr over the two unique
+    # lower() indexes. One account's username can still equal another's email
+    # (accounts from before the registration check), so the password is tried
+    # against every candidate, exact-case matches first.
     try:
         with get_conn() as conn:
             with conn.cursor() as cur:
                 cur.execute(
-                    "SELECT id, password_hash, identity_role FROM person WHERE username=%s OR email=%s",
-                    (identifier, identifier)
+                    """
+                    SELECT id, password_hash, identity_role
+                    FROM person
+                    WHERE lower(username) = lower(%s)
+                       OR lower(email) = lower(%s)
+                    ORDER BY (username = %s OR email = %s) DESC, id
+                    """,
+                    (identifier, identifier, identifier, identifier)
                 )
-                user = cur.fetchone()
-                
-                if not user:
-                    return jsonify({"error": "Invalid credentials"}), 401
-                
-                user_id, password_hash, role = user
-                if not check_password_hash(password_hash, password):
-                    return jsonify({"error": "Invalid credentials"}), 401
-        
+                candidates = cur.fetchall()
+
+        # Checked outside the connection block so no pool connection waits on the hash
+        for user_id, password_hash, role in candidates:
+            ok, new_hash = check_password(password_hash, password)
+            if ok:
+                break
+        else:
+            return jsonify({"error": "Invalid credentials"}), 401
+
+        if new_hash:
+            with get_conn() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        "UPDATE person SET password_hash = %s WHERE id = %s AND password_hash = %s",
+                        (new_hash, user_id, password_hash)
+                    )
+
         session["user_id"] = user_id
         session["identity_role"] = role
         return jsonify({"ok": True}), 200
 
+    except PasswordCheckBusy:
+        return jsonify({"error": "Too many login attempts right now, please try again"}), 503
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -122,6 +1096,8 @@ def api_login():
 @app.get("/logout")
 def logout():
     """Logout user"""
+    if "user_id" in session:
+        invalidate_identity(session["user_id"])
     session.clear()
     return redirect(url_for("home"))
 
@@ -178,15 +1154,16 @@ def profile_page():
 # API: COUNTRIES
 # ============================================================
 
+def _load_countries(cur):
+    cur.execute("SELECT code, name FROM country ORDER BY name")
+    return {"countries": [{"code": row[0], "name": row[1]} for row in cur.fetchall()]}
+
+
 @app.get("/api/countries")
 def get_countries():
     """Get all countries"""
     try:
-        with get_conn() as conn:
-            with conn.cursor() as cur:
-                cur.execute("SELECT code, name FROM country ORDER BY name")
-                countries = [{"code": row[0], "name": row[1]} for row in cur.fetchall()]
-                return jsonify({"countries": countries}), 200
+        return reference_response("countries", _load_countries)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -195,17 +1172,18 @@ def get_countries():
 # API: STUDY LEVELS
 # ============================================================
 
+def _load_study_levels(cur):
+    cur.execute(
+        "SELECT id, name FROM study_level ORDER BY id"
+    )
+    return {"study_levels": [{"id": row[0], "name": row[1]} for row in cur.fetchall()]}
+
+
 @app.get("/api/study-levels")
 def get_study_levels():
     """Get all study levels"""
     try:
-        with get_conn() as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    "SELECT id, name FROM study_level ORDER BY id"
-                )
-                study_levels = [{"id": row[0], "name": row[1]} for row in cur.fetchall()]
-                return jsonify({"study_levels": study_levels}), 200
+        return reference_response("study_levels", _load_study_levels)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -214,38 +1192,43 @@ def get_study_levels():
 # API: PROGRAMMES
 # ============================================================
 
+def _load_programmes(cur, study_level_id=None):
+    level_sql = "WHERE p.study_level_id = %s" if study_level_id is not None else ""
+    cur.execute(
+        f"""
+        SELECT p.id, p.name, p.study_level_id, p.faculty_id, p.institute_id,
+               sl.name as study_level_name,
+               f.name as faculty_name,
+               i.name as institute_name
+        FROM programme p
+        JOIN study_level sl ON p.study_level_id = sl.id
+        JOIN faculty f ON p.faculty_id = f.id
+        LEFT JOIN institute i ON p.institute_id = i.id
+        {level_sql}
+        ORDER BY p.name
+        """,
+        (study_level_id,) if study_level_id is not None else None
+    )
+    programmes = []
+    for row in cur.fetchall():
+        programmes.append({
+            "id": row[0],
+            "name": row[1],
+            "study_level_id": row[2],
+            "faculty_id": row[3],
+            "institute_id": row[4],
+            "study_level_name": row[5],
+            "faculty_name": row[6],
+            "institute_name": row[7]
+        })
+    return {"programmes": programmes}
+
+
 @app.get("/api/programmes")
 def get_programmes():
     """Get all programmes"""
     try:
-        with get_conn() as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    SELECT p.id, p.name, p.study_level_id, p.faculty_id, p.institute_id,
-                           sl.name as study_level_name,
-                           f.name as faculty_name,
-                           i.name as institute_name
-                    FROM programme p
-                    JOIN study_level sl ON p.study_level_id = sl.id
-                    JOIN faculty f ON p.faculty_id = f.id
-                    LEFT JOIN institute i ON p.institute_id = i.id
-                    ORDER BY p.name
-                    """
-                )
-                programmes = []
-                for row in cur.fetchall():
-                    programmes.append({
-                        "id": row[0],
-                        "name": row[1],
-                        "study_level_id": row[2],
-                        "faculty_id": row[3],
-                        "institute_id": row[4],
-                        "study_level_name": row[5],
-                        "faculty_name": row[6],
-                        "institute_name": row[7]
-                    })
-                return jsonify({"programmes": programmes}), 200
+        return reference_response("programmes", _load_programmes)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -254,36 +1237,346 @@ def get_programmes():
 def get_programmes_by_level(study_level_id):
     """Get programmes filtered by study level"""
     try:
+        return reference_response(
+            f"programmes:{study_level_id}",
+            lambda cur: _load_programmes(cur, study_level_id)
+        )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# id -> programme, rebuilt from the cached programme list whenever its ETag
+# changes, so it follows invalidate_reference_data() like everything else.
+PROGRAMME_LOOKUP_MAX = 200
+
+_programme_index = {"etag": None, "by_id": {}}
+_programme_index_lock = threading.Lock()
+
+
+def get_programme_index():
+    """Get the id -> programme dict for the current reference data version"""
+    payload, _, etag = get_reference_data("programmes", _load_programmes)
+    with _programme_index_lock:
+        if _programme_index["etag"] != etag:
+            _programme_index["by_id"] = {p["id"]: p for p in payload["programmes"]}
+            _programme_index["etag"] = etag
+        return _programme_index["by_id"]
+
+
+def _load_programme_catalogue(cur):
+    """Compact catalogue: programme rows as arrays, names looked up by id"""
+    programmes = _load_programmes(cur)["programmes"]
+    study_levels, faculties, institutes = {}, {}, {}
+    rows = []
+    for p in programmes:
+        study_levels[p["study_level_id"]] = p["study_level_name"]
+        faculties[p["faculty_id"]] = p["faculty_name"]
+        if p["institute_id"] is not None:
+            institutes[p["institute_id"]] = p["institute_name"]
+        rows.append([p["id"], p["name"], p["study_level_id"], p["faculty_id"], p["institute_id"]])
+    return {
+        "fields": ["id", "name", "study_level_id", "faculty_id", "institute_id"],
+        "programmes": rows,
+        "study_levels": study_levels,
+        "faculties": faculties,
+        "institutes": institutes
+    }
+
+
+@app.get("/api/programmes/catalogue")
+def get_programme_catalogue():
+    """Get the compact programme catalogue (cache it client-side by ETag)"""
+    try:
+        return reference_response("programme_catalogue", _load_programme_catalogue)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.get("/api/programmes/by-id/<int:programme_id>")
+def get_programme(programme_id):
+    """Get one programme with its study level, faculty and institute"""
+    try:
+        programme = get_programme_index().get(programme_id)
+        if not programme:
+            return jsonify({"error": "Programme not found"}), 404
+        return jsonify(programme), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.get("/api/programmes/by-id")
+def get_programmes_by_ids():
+    """Get several programmes at once: ?ids=1,2,3"""
+    try:
+        ids = [int(x) for x in request.args.get("ids", "").split(",") if x.strip()]
+    except ValueError:
+        return jsonify({"error": "ids must be a comma-separated list of integers"}), 400
+
+    if not ids:
+        return jsonify({"error": "ids is required"}), 400
+    if len(ids) > PROGRAMME_LOOKUP_MAX:
+        return jsonify({"error": f"At most {PROGRAMME_LOOKUP_MAX} ids per request"}), 400
+
+    try:
+        index = get_programme_index()
+        return jsonify({
+            "programmes": [index[i] for i in ids if i in index],
+            "missing": [i for i in ids if i not in index]
+        }), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# ============================================================
+# API: TYPEAHEAD
+# ============================================================
+# Prefix search over programme, topic, institute and country names. Every
+# word of the query must prefix a word of the name (a sorted word list
+# searched with bisect, i.e. a flattened trie); if that gives fewer than
+# `limit` hits, names sharing enough trigrams with the query fill the rest
+# so small typos still match. The index is built from the cached reference
+# data and rebuilt when any of their ETags change.
+
+TYPEAHEAD_TYPES = ("programme", "topic", "institute", "country")
+TYPEAHEAD_LIMIT = 10
+TYPEAHEAD_LIMIT_MAX = 50
+TYPEAHEAD_FUZZY_MIN = 0.5
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def _fold(text):
+    """Lower-case and strip accents and punctuation so names compare loosely"""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _NON_WORD.sub(" ", text.casefold()).strip()
+
+
+def _trigrams(folded):
+    return {
+        gram
+        for word in folded.split()
+        for gram in (f"  {word} "[i:i + 3] for i in range(len(word) + 1))
+    }
+
+
+def _load_institutes(cur):
+    cur.execute("SELECT id, name FROM institute ORDER BY name")
+    return {"institutes": [{"id": row[0], "name": row[1]} for row in cur.fetchall()]}
+
+
+class TypeaheadIndex:
+    """Word-prefix index with a trigram fallback over reference data names"""
+
+    def __init__(self, entries):
+        self.entries = entries
+        self._folded = [_fold(e["name"]) for e in entries]
+        self._gram_counts = []
+        self._grams = {}
+
+        words = []
+        for i, folded in enumerate(self._folded):
+            words.extend((word, i) for word in set(folded.split()))
+            grams = _trigrams(folded)
+            self._gram_counts.append(len(grams))
+            for gram in grams:
+                self._grams.setdefault(gram, []).append(i)
+        words.sort()
+        self._words = [w for w, _ in words]
+        self._word_entries = [i for _, i in words]
+
+    def _prefixed(self, prefix):
+        lo = bisect.bisect_left(self._words, prefix)
+        hi = bisect.bisect_left(self._words, prefix + "\U0010ffff")
+        return set(self._word_entries[lo:hi])
+
+    def search(self, query, types, limit):
+        """Top `limit` entries of the given types for a query string"""
+        folded = _fold(query)
+        words = folded.split()
+        if not words:
+            return []
+
+        # Longest word first: it narrows the candidate set the most
+        matches = None
+        for word in sorted(words, key=len, reverse=True):
+            matches = self._prefixed(word) if matches is None else matches & self._prefixed(word)
+            if not matches:
+                break
+
+        # Names starting with the query first, then shorter names
+        hits = heapq.nsmallest(
+            limit,
+            (i for i in matches if self.entries[i]["type"] in types),
+            key=lambda i: (not self._folded[i].startswith(folded), len(self._folded[i]), self._folded[i])
+        )
+
+        if len(hits) < limit and len(folded) >= 3:
+            grams = _trigrams(folded)
+            shared = {}
+            for gram in grams:
+                for i in self._grams.get(gram, ()):
+                    shared[i] = shared.get(i, 0) + 1
+            seen = set(hits)
+            fuzzy = [
+                (-(n / len(grams)), -(n / (len(grams) + self._gram_counts[i] - n)), i)
+                for i, n in shared.items()
+                if i not in seen
+                and self.entries[i]["type"] in types
+                and n / len(grams) >= TYPEAHEAD_FUZZY_MIN
+            ]
+            hits.extend(i for _, _, i in heapq.nsmallest(limit - len(hits), fuzzy))
+
+        return [self.entries[i] for i in hits]
+
+
+_typeahead = {"versions": None, "index": None}
+_typeahead_lock = threading.Lock()
+
+
+def get_typeahead_index():
+    """Get the typeahead index for the current reference data version"""
+    programmes, _, programmes_version = get_reference_data("programmes", _load_programmes)
+    topics, _, topics_version = get_reference_data("topics", _load_topics)
+    institutes, _, institutes_version = get_reference_data("institutes", _load_institutes)
+    countries, _, countries_version = get_reference_data("countries", _load_countries)
+    versions = (programmes_version, topics_version, institutes_version, countries_version)
+
+    with _typeahead_lock:
+        if _typeahead["versions"] == versions:
+            return _typeahead["index"]
+
+    entries = []
+    for p in programmes["programmes"]:
+        detail = " - ".join(n for n in (p["study_level_name"], p["faculty_name"], p["institute_name"]) if n)
+        entries.append({"type": "programme", "id": p["id"], "name": p["name"], "detail": detail})
+    for t in topics["topics"]:
+        entries.append({"type": "topic", "id": t["id"], "name": t["name"], "detail": None})
+    for i in institutes["institutes"]:
+        entries.append({"type": "institute", "id": i["id"], "name": i["name"], "detail": None})
+    for c in countries["countries"]:
+        entries.append({"type": "country", "id": c["code"], "name": c["name"], "detail": None})
+    index = TypeaheadIndex(entries)
+
+    with _typeahead_lock:
+        _typeahead["versions"] = versions
+        _typeahead["index"] = index
+    return index
+
+
+@app.get("/api/typeahead")
+def get_typeahead():
+    """Search reference data names: ?q=comp sci&types=programme,topic&limit=10"""
+    query = request.args.get("q", "").strip()
+    types = set(filter(None, request.args.get("types", "").split(","))) or set(TYPEAHEAD_TYPES)
+    unknown = types - set(TYPEAHEAD_TYPES)
+    if unknown:
+        return jsonify({"error": f"Unknown types: {', '.join(sorted(unknown))}"}), 400
+    limit = get_page_size(TYPEAHEAD_LIMIT, TYPEAHEAD_LIMIT_MAX)
+
+    try:
+        results = get_typeahead_index().search(query, types, limit) if query else []
+        return jsonify({"results": results}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# ============================================================
+# API: PROFILE BOOTSTRAP
+# ============================================================
+
+@app.get("/api/profile/bootstrap")
+@login_required
+def get_profile_bootstrap():
+    """Everything profile.html needs on load in one response.
+
+    Person, education and career come from one query; countries and the
+    reference data versions (ETags of the cached endpoints) from memory.
+    """
+    user_id = session.get("user_id")
+
+    try:
+        countries, _, countries_version = get_reference_data("countries", _load_countries)
+        versions = {
+            "countries": countries_version,
+            "study_levels": get_reference_data("study_levels", _load_study_levels)[2],
+            "programmes": get_reference_data("programmes", _load_programmes)[2],
+            "programme_catalogue": get_reference_data(
+                "programme_catalogue", _load_programme_catalogue
+            )[2],
+            "topics": get_reference_data("topics", _load_topics)[2]
+        }
+
         with get_conn() as conn:
             with conn.cursor() as cur:
                 cur.execute(
                     """
-                    SELECT p.id, p.name, p.study_level_id, p.faculty_id, p.institute_id,
-                           sl.name as study_level_name,
-                           f.name as faculty_name,
-                           i.name as institute_name
-                    FROM programme p
-                    JOIN study_level sl ON p.study_level_id = sl.id
-                    JOIN faculty f ON p.faculty_id = f.id
-                    LEFT JOIN institute i ON p.institute_id = i.id
-                    WHERE p.study_level_id = %s
-                    ORDER BY p.name
+                    SELECT
+                        p.id, p.username, p.email, p.identity_role, p.first_name, p.last_name,
+                        p.phone_number, p.address, p.home_country,
+                        (
+                            SELECT COALESCE(json_agg(json_build_object(
+                                'id', e.id,
+                                'programme_id', e.programme_id,
+                                'study_level_id', e.study_level_id,
+                                'start_date', e.start_date,
+                                'end_date', e.end_date,
+                                'study_level', sl.name,
+                                'programme', pr.name,
+                                'institute', i.name,
+                                'faculty', f.name
+                            ) ORDER BY e.start_date DESC), '[]'::json)
+                            FROM education e
+                            JOIN study_level sl ON e.study_level_id = sl.id
+                            JOIN programme pr ON e.programme_id = pr.id
+                            LEFT JOIN institute i ON pr.institute_id = i.id
+                            JOIN faculty f ON pr.faculty_id = f.id
+                            WHERE e.person_id = p.id
+                        ) AS education,
+                        (
+                            SELECT COALESCE(json_agg(json_build_object(
+                                'id', c.id,
+                                'job_title', c.job_title,
+                                'company_name', c.company_name,
+                                'country_code', c.country_code,
+                                'start_date', c.start_date,
+                                'end_date', c.end_date,
+                                'job_description', c.job_description,
+                                'country_name', COALESCE(co.name, '')
+                            ) ORDER BY c.start_date DESC), '[]'::json)
+                            FROM career c
+                            LEFT JOIN country co ON c.country_code = co.code
+                            WHERE c.person_id = p.id
+                              AND p.identity_role = 'alumni'
+                        ) AS career
+                    FROM person p
+                    WHERE p.id = %s
                     """,
-                    (study_level_id,)
+                    (user_id,)
                 )
-                programmes = []
-                for row in cur.fetchall():
-                    programmes.append({
-                        "id": row[0],
-                        "name": row[1],
-                        "study_level_id": row[2],
-                        "faculty_id": row[3],
-                        "institute_id": row[4],
-                        "study_level_name": row[5],
-                        "faculty_name": row[6],
-                        "institute_name": row[7]
-                    })
-                return jsonify({"programmes": programmes}), 200
+                row = cur.fetchone()
+
+        if not row:
+            return jsonify({"error": "User not found"}), 404
+
+        return jsonify({
+            "user": {
+                "id": row[0],
+                "username": row[1],
+                "email": row[2],
+                "identity_role": row[3],
+                "first_name": row[4],
+                "last_name": row[5],
+                "phone_number": row[6],
+                "address": row[7],
+                "home_country": row[8]
+            },
+            "education": row[9],
+            "career": row[10],
+            "countries": countries["countries"],
+            "reference_versions": versions
+        }), 200
+
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -320,7 +1613,9 @@ def save_personal():
                     (first_name, last_name, phone_number, address, home_country, user_id)
                 )
             conn.commit()
-            return jsonify({"ok": True}), 200
+
+        person_changed(user_id)
+        return jsonify({"ok": True}), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -410,7 +1705,9 @@ def add_education():
                 )
                 edu_id = cur.fetchone()[0]
             conn.commit()
-            return jsonify({"ok": True, "id": edu_id}), 201
+
+        person_changed(user_id)
+        return jsonify({"ok": True, "id": edu_id}), 201
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -451,7 +1748,9 @@ def update_education(edu_id):
                     (programme_id, study_level_id, start_date, end_date, edu_id)
                 )
             conn.commit()
-            return jsonify({"ok": True}), 200
+
+        person_changed(user_id)
+        return jsonify({"ok": True}), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -474,7 +1773,9 @@ def delete_education(edu_id):
                 
                 cur.execute("DELETE FROM education WHERE id=%s", (edu_id,))
             conn.commit()
-            return jsonify({"ok": True}), 200
+
+        person_changed(user_id)
+        return jsonify({"ok": True}), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -570,7 +1871,9 @@ def add_career():
                 )
                 career_id = cur.fetchone()[0]
             conn.commit()
-            return jsonify({"ok": True, "id": career_id}), 201
+
+        person_changed(user_id)
+        return jsonify({"ok": True, "id": career_id}), 201
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -618,7 +1921,9 @@ def update_career(career_id):
                     (job_title, company_name, country_code, start_date, end_date, job_description, career_id)
                 )
             conn.commit()
-            return jsonify({"ok": True}), 200
+
+        person_changed(user_id)
+        return jsonify({"ok": True}), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -645,12 +1950,31 @@ def delete_career(career_id):
                 
                 cur.execute("DELETE FROM career WHERE id=%s", (career_id,))
             conn.commit()
-            return jsonify({"ok": True}), 200
+
+        person_changed(user_id)
+        return jsonify({"ok": True}), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+# ============================================================
+# API: MONITORING
+# ============================================================
+
+@app.get("/api/health/db-pool")
+def get_db_pool_stats():
+    """Get connection pool stats for this worker"""
+    return jsonify(get_pool().stats()), 200
+
+
+@app.get("/metrics")
+def get_metrics():
+    """Per-route request, DB and serialization metrics for this worker (Prometheus text)"""
+    body = route_metrics.render(get_pool().stats() if _pool is not None else None)
+    return app.response_class(body, mimetype="text/plain; version=0.0.4")
+
+
 # ============================================================
 # ERROR HANDLERS
 # ============================================================
@@ -677,25 +2001,15 @@ def preference_page():
     mode = request.args.get("mode", "view")
     
     try:
-        with get_conn() as conn:
-            with conn.cursor() as cur:
-                # Get user info
-                cur.execute(
-                    """
-                    SELECT id, first_name, last_name FROM person WHERE id=%s
-                    """,
-                    (user_id,)
-                )
-                row = cur.fetchone()
-                
-                if not row:
-                    return jsonify({"error": "User not found"}), 404
-                
-                user = {
-                    "id": row[0],
-                    "first_name": row[1],
-                    "last_name": row[2]
-                }
+        identity = get_identity(user_id)
+        if not identity:
+            return jsonify({"error": "User not found"}), 404
+
+        user = {
+            "id": identity["id"],
+            "first_name": identity["first_name"],
+            "last_name": identity["last_name"]
+        }
         
         return render_template("preference.html", user=user, mode=mode)
     
@@ -703,17 +2017,18 @@ def preference_page():
         return jsonify({"error": str(e)}), 500
 
 
+def _load_topics(cur):
+    cur.execute(
+        "SELECT id, name FROM topic ORDER BY name"
+    )
+    return {"topics": [{"id": row[0], "name": row[1]} for row in cur.fetchall()]}
+
+
 @app.get("/api/topics")
 def get_topics():
     """Get all available topics"""
     try:
-        with get_conn() as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    "SELECT id, name FROM topic ORDER BY name"
-                )
-                topics = [{"id": row[0], "name": row[1]} for row in cur.fetchall()]
-                return jsonify({"topics": topics}), 200
+        return reference_response("topics", _load_topics)
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -755,47 +2070,72 @@ def get_user_preferences():
 @app.post("/api/preference/save")
 @login_required
 def save_preferences():
-    """Save user preferences (delete old, insert new)"""
+    """Save user preferences (apply only the difference to what is stored)"""
     user_id = session.get("user_id")
     data = request.get_json() or {}
     
     preferences = data.get("preferences") or []
     
     # Validate preferences
+    wanted = {}
     for pref in preferences:
         if not pref.get("topic_id") or not pref.get("preference_role"):
             return jsonify({"error": "Invalid preference data"}), 400
         
         if pref.get("preference_role") not in ("mentor", "mentee", "two_way"):
             return jsonify({"error": "Invalid preference role"}), 400
+
+        try:
+            wanted[int(pref.get("topic_id"))] = pref.get("preference_role")
+        except (TypeError, ValueError):
+            return jsonify({"error": "Invalid preference data"}), 400
     
     try:
         with get_conn() as conn:
             with conn.cursor() as cur:
-                # Step 1: Delete all existing preferences for this user
+                # Current preferences, locked against a concurrent save
                 cur.execute(
-                    "DELETE FROM preference WHERE person_id=%s",
+                    "SELECT topic_id, preference_role FROM preference WHERE person_id=%s FOR UPDATE",
                     (user_id,)
                 )
-                
-                # Step 2: Insert new preferences
-                for pref in preferences:
+                current = dict(cur.fetchall())
+
+                added = sorted(t for t in wanted if t not in current)
+                removed = sorted(t for t in current if t not in wanted)
+                changed = sorted(t for t in wanted if t in current and current[t] != wanted[t])
+
+                if removed:
                     cur.execute(
+                        "DELETE FROM preference WHERE person_id=%s AND topic_id = ANY(%s)",
+                        (user_id, removed)
+                    )
+
+                upserts = [(user_id, t, wanted[t]) for t in added + changed]
+                if upserts:
+                    psycopg2.extras.execute_values(
+                        cur,
                         """
                         INSERT INTO preference (person_id, topic_id, preference_role)
-                        VALUES (%s, %s, %s)
+                        VALUES %s
+                        ON CONFLICT (person_id, topic_id)
+                        DO UPDATE SET preference_role = EXCLUDED.preference_role
                         """,
-                        (user_id, pref.get("topic_id"), pref.get("preference_role"))
+                        upserts,
+                        page_size=len(upserts)
                     )
             
             conn.commit()
-            return jsonify({"ok": True}), 200
+
+        if added or removed or changed:
+            person_changed(user_id)
+        return jsonify({
+            "ok": True,
+            "added": added,
+            "removed": removed,
+            "changed": changed
+        }), 200
     
     except Exception as e:
-        try:
-            conn.rollback()
-        except:
-            pass
         return jsonify({"error": str(e)}), 500
 
 
@@ -803,6 +2143,127 @@ def save_preferences():
 # PUBLISH ROUTES
 # ============================================================
 
+# The published profile page is one query returning the whole document as
+# JSON, cached per person until person_changed() or the TTL drops it.
+
+PUBLISHED_PROFILE_CACHE_TTL = int(os.getenv("PUBLISHED_PROFILE_CACHE_TTL", "300"))
+
+_published_profile_cache = {}
+_published_profile_lock = threading.Lock()
+
+
+def _drop_published_profile(cur, person_id):
+    with _published_profile_lock:
+        _published_profile_cache.pop(person_id, None)
+
+
+def _clear_published_profiles():
+    with _published_profile_lock:
+        _published_profile_cache.clear()
+
+
+on_person_change(_drop_published_profile, _clear_published_profiles)
+
+
+def _parse_dates(records):
+    """json_agg returns dates as ISO strings; the template formats date objects"""
+    for record in records:
+        for key in ("start_date", "end_date"):
+            if record.get(key):
+                record[key] = datetime.date.fromisoformat(record[key])
+    return records
+
+
+def _load_published_profile(cur, person_id):
+    cur.execute(
+        """
+        SELECT json_build_object(
+            'id', p.id,
+            'first_name', p.first_name,
+            'last_name', p.last_name,
+            'identity_role', p.identity_role,
+            'home_country', p.home_country,
+            'phone_number', p.phone_number,
+            'address', p.address,
+            'profile_published', p.profile_published,
+            'preferences_published', p.preferences_published,
+            'education', CASE WHEN p.profile_published THEN (
+                SELECT COALESCE(json_agg(json_build_object(
+                    'id', e.id,
+                    'start_date', e.start_date,
+                    'end_date', e.end_date,
+                    'study_level', sl.name,
+                    'programme', pr.name,
+                    'institute', i.name,
+                    'faculty', f.name
+                ) ORDER BY e.start_date DESC), '[]'::json)
+                FROM education e
+                JOIN study_level sl ON e.study_level_id = sl.id
+                JOIN programme pr ON e.programme_id = pr.id
+                LEFT JOIN institute i ON pr.institute_id = i.id
+                JOIN faculty f ON pr.faculty_id = f.id
+                WHERE e.person_id = p.id
+            ) END,
+            'career', CASE WHEN p.profile_published AND p.identity_role = 'alumni' THEN (
+                SELECT COALESCE(json_agg(json_build_object(
+                    'id', c.id,
+                    'job_title', c.job_title,
+                    'company_name', c.company_name,
+                    'start_date', c.start_date,
+                    'end_date', c.end_date,
+                    'job_description', c.job_description,
+                    'country_name', co.name
+                ) ORDER BY c.start_date DESC), '[]'::json)
+                FROM career c
+                LEFT JOIN country co ON c.country_code = co.code
+                WHERE c.person_id = p.id
+            ) END,
+            'preferences', CASE WHEN p.preferences_published THEN (
+                SELECT COALESCE(json_agg(json_build_object(
+                    'topic_id', pf.topic_id,
+                    'topic_name', t.name,
+                    'preference_role', pf.preference_role
+                ) ORDER BY t.name), '[]'::json)
+                FROM preference pf
+                JOIN topic t ON pf.topic_id = t.id
+                WHERE pf.person_id = p.id
+            ) END
+        )
+        FROM person p
+        WHERE p.id = %s
+        """,
+        (person_id,)
+    )
+    row = cur.fetchone()
+    if not row:
+        return None
+
+    document = row[0]
+    _parse_dates(document["education"] or [])
+    _parse_dates(document["career"] or [])
+    return document
+
+
+def get_published_profile(person_id):
+    """Get the published profile document for a person, or None if they don't exist"""
+    ensure_change_listener()
+    now = time.monotonic()
+
+    with _published_profile_lock:
+        entry = _published_profile_cache.get(person_id)
+    if entry and entry[0] > now:
+        return entry[1]
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            document = _load_published_profile(cur, person_id)
+
+    if document is not None:
+        with _published_profile_lock:
+            _published_profile_cache[person_id] = (now + PUBLISHED_PROFILE_CACHE_TTL, document)
+    return document
+
+
 @app.get("/published-profile")
 @login_required
 def published_profile_page():
@@ -810,140 +2271,29 @@ def published_profile_page():
     user_id = session.get("user_id")
     
     try:
-        with get_conn() as conn:
-            with conn.cursor() as cur:
-                # Get person info with publish status
-                cur.execute(
-                    """
-                    SELECT id, first_name, last_name, identity_role, home_country, 
-                           phone_number, address, profile_published, preferences_published
-                    FROM person 
-                    WHERE id = %s
-                    """,
-                    (user_id,)
-                )
-                row = cur.fetchone()
-                
-                if not row:
-                    return jsonify({"error": "User not found"}), 404
-                
-                person = {
-                    "id": row[0],
-                    "first_name": row[1],
-                    "last_name": row[2],
-                    "identity_role": row[3],
-                    "home_country": row[4],
-                    "phone_number": row[5],
-                    "address": row[6],
-                    "profile_published": row[7],
-                    "preferences_published": row[8]
-                }
-                
-                profile_published = person["profile_published"]
-                preferences_published = person["preferences_published"]
-                
-                profile_data = None
-                preferences_data = None
-                
-                # Get profile data if published
-                if profile_published:
-                    # Get education
-                    cur.execute(
-                        """
-                        SELECT e.id, e.start_date, e.end_date, 
-                               sl.name as study_level,
-                               p.name as programme,
-                               i.name as institute,
-                               f.name as faculty
-                        FROM education e
-                        JOIN study_level sl ON e.study_level_id = sl.id
-                        JOIN programme p ON e.programme_id = p.id
-                        LEFT JOIN institute i ON p.institute_id = i.id
-                        JOIN faculty f ON p.faculty_id = f.id
-                        WHERE e.person_id = %s
-                        ORDER BY e.start_date DESC
-                        """,
-                        (user_id,)
-                    )
-                    
-                    # Convert education tuples to dictionaries
-                    education = []
-                    for edu_row in cur.fetchall():
-                        education.append({
-                            "id": edu_row[0],
-                            "start_date": edu_row[1],
-                            "end_date": edu_row[2],
-                            "study_level": edu_row[3],
-                            "programme": edu_row[4],
-                            "institute": edu_row[5],
-                            "faculty": edu_row[6]
-                        })
-                    
-                    # Get career if alumni
-                    career = []
-                    if person["identity_role"] == 'alumni':
-                        cur.execute(
-                            """
-                            SELECT c.id, c.job_title, c.company_name, c.start_date, 
-                                   c.end_date, c.job_description, co.name as country_name
-                            FROM career c
-                            LEFT JOIN country co ON c.country_code = co.code
-                            WHERE c.person_id = %s
-                            ORDER BY c.start_date DESC
-                            """,
-                            (user_id,)
-                        )
-                        
-                        # Convert career tuples to dictionaries
-                        for car_row in cur.fetchall():
-                            career.append({
-                                "id": car_row[0],
-                                "job_title": car_row[1],
-                                "company_name": car_row[2],
-                                "start_date": car_row[3],
-                                "end_date": car_row[4],
-                                "job_description": car_row[5],
-                                "country_name": car_row[6]
-                            })
-                    
-                    profile_data = {
-                        "first_name": person["first_name"],
-                        "last_name": person["last_name"],
-                        "identity_role": person["identity_role"],
-                        "home_country": person["home_country"],
-                        "phone_number": person["phone_number"],
-                        "address": person["address"],
-                        "education": education,
-                        "career": career
-                    }
-                
-                # Get preferences if published
-                if preferences_published:
-                    cur.execute(
-                        """
-                        SELECT pr.topic_id, t.name, pr.preference_role
-                        FROM preference pr
-                        JOIN topic t ON pr.topic_id = t.id
-                        WHERE pr.person_id = %s
-                        ORDER BY t.name
-                        """,
-                        (user_id,)
-                    )
-                    preferences_data = [
-                        {
-                            "topic_id": row[0],
-                            "topic_name": row[1],
-                            "preference_role": row[2]
-                        }
-                        for row in cur.fetchall()
-                    ]
-        
+        document = get_published_profile(user_id)
+        if not document:
+            return jsonify({"error": "User not found"}), 404
+
+        profile_data = None
+        if document["profile_published"]:
+            profile_data = {
+                "first_name": document["first_name"],
+                "last_name": document["last_name"],
+                "identity_role": document["identity_role"],
+                "home_country": document["home_country"],
+                "phone_number": document["phone_number"],
+                "address": document["address"],
+                "education": document["education"],
+                "career": document["career"] or []
+            }
+
         return render_template(
             "published_profile.html",
-            profile_published=profile_published,
-            preferences_published=preferences_published,
+            profile_published=document["profile_published"],
+            preferences_published=document["preferences_published"],
             profile=profile_data,
-            preferences=preferences_data
+            preferences=document["preferences"]
         )
     
     except Exception as e:
@@ -957,26 +2307,14 @@ def get_publish_status():
     user_id = session.get("user_id")
     
     try:
-        with get_conn() as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    SELECT profile_published, preferences_published
-                    FROM person WHERE id = %s
-                    """,
-                    (user_id,)
-                )
-                result = cur.fetchone()
-                
-                if not result:
-                    return jsonify({"error": "User not found"}), 404
-                
-                profile_published, preferences_published = result
-                
-                return jsonify({
-                    "profile_published": profile_published,
-                    "preferences_published": preferences_published
-                }), 200
+        identity = get_identity(user_id)
+        if not identity:
+            return jsonify({"error": "User not found"}), 404
+
+        return jsonify({
+            "profile_published": identity["profile_published"],
+            "preferences_published": identity["preferences_published"]
+        }), 200
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -1020,7 +2358,9 @@ def publish_profile():
                 )
             
             conn.commit()
-            return jsonify({"ok": True, "message": "Profile published successfully"}), 200
+
+        person_changed(user_id)
+        return jsonify({"ok": True, "message": "Profile published successfully"}), 200
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -1056,7 +2396,9 @@ def publish_preferences():
                 )
             
             conn.commit()
-            return jsonify({"ok": True, "message": "Preferences published successfully"}), 200
+
+        person_changed(user_id)
+        return jsonify({"ok": True, "message": "Preferences published successfully"}), 200
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -1081,7 +2423,9 @@ def unpublish_profile():
                 )
             
             conn.commit()
-            return jsonify({"ok": True, "message": "Profile unpublished"}), 200
+
+        person_changed(user_id)
+        return jsonify({"ok": True, "message": "Profile unpublished"}), 200
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -1106,7 +2450,9 @@ def unpublish_preferences():
                 )
             
             conn.commit()
-            return jsonify({"ok": True, "message": "Preferences unpublished"}), 200
+
+        person_changed(user_id)
+        return jsonify({"ok": True, "message": "Preferences unpublished"}), 200
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -1114,11 +2460,347 @@ def unpublish_preferences():
 
 
 # ============================================================
-# MATCHING ROUTES
+# MATCH INDEX
 # ============================================================
+# Published preferences indexed as topic -> (identity_role, preference_role)
+# -> person ids, so a search is a few set lookups instead of a self-join of
+# preference x preference. Each worker keeps its own copy, kept current through
+# person_changed().
+
+MATCH_INDEX_TTL = int(os.getenv("MATCH_INDEX_TTL", "3600"))
+
+# my preference_role -> preference_role the other person must have
+MATCHING_ROLE = {"mentee": "mentor", "mentor": "mentee", "two_way": "two_way"}
+
+MATCH_PAGE_SIZE = int(os.getenv("MATCH_PAGE_SIZE", "50"))
+MATCH_PAGE_SIZE_MAX = int(os.getenv("MATCH_PAGE_SIZE_MAX", "200"))
+
+
+class MatchIndex:
+    """In-memory index of published preferences.
+
+    One thread at a time rebuilds it (_reload_lock); the others keep reading
+    the old snapshot. refresh_person() results that land while a rebuild is
+    running are replayed over the new snapshot, and an invalidate() during a
+    rebuild leaves the new snapshot already expired.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._by_topic = {}
+        self._people = {}
+        self._expires = 0.0
+        self._generation = 0
+        self._replay = None
+
+    def invalidate(self):
+        """Force a full rebuild on next use"""
+        with self._lock:
+            self._expires = 0.0
+            self._generation += 1
+
+    def _ensure_loaded(self, cur):
+        if time.monotonic() < self._expires:
+            return
+        with self._reload_lock:
+            if time.monotonic() < self._expires:
+                return
+            with self._lock:
+                generation = self._generation
+                self._replay = {}
+            try:
+                people, by_topic = self._build(cur)
+            except Exception:
+                with self._lock:
+                    self._replay = None
+                raise
+
+            with self._lock:
+                self._people = people
+                self._by_topic = by_topic
+                for person_id, entry in self._replay.items():
+                    self._put(person_id, entry)
+                self._replay = None
+                if generation == self._generation:
+                    self._expires = time.monotonic() + MATCH_INDEX_TTL
+
+    def _build(self, cur):
+        cur.execute(
+            """
+            SELECT per.id, per.identity_role, p.topic_id, p.preference_role
+            FROM preference p
+            JOIN person per ON per.id = p.person_id
+            WHERE per.preferences_published = TRUE
+            """
+        )
+        rows = cur.fetchall()
+
+        people = {}
+        for person_id, identity_role, topic_id, preference_role in rows:
+            people.setdefault(person_id, (identity_role, {}))[1][topic_id] = preference_role
+
+        by_topic = {}
+        for person_id, (identity_role, prefs) in people.items():
+            for topic_id, preference_role in prefs.items():
+                by_topic.setdefault(topic_id, {}).setdefault(
+                    (identity_role, preference_role), set()
+                ).add(person_id)
+        return people, by_topic
+
+    def _remove(self, person_id):
+        entry = self._people.pop(person_id, None)
+        if not entry:
+            return
+        identity_role, prefs = entry
+        for topic_id, preference_role in prefs.items():
+            bucket = self._by_topic.get(topic_id, {}).get((identity_role, preference_role))
+            if bucket is not None:
+                bucket.discard(person_id)
+
+    def _put(self, person_id, entry):
+        """Replace one person's entry (None removes them); caller holds _lock"""
+        self._remove(person_id)
+        if entry:
+            identity_role, prefs = entry
+            self._people[person_id] = entry
+            for topic_id, preference_role in prefs.items():
+                self._by_topic.setdefault(topic_id, {}).setdefault(
+                    (identity_role, preference_role), set()
+                ).add(person_id)
+
+    def refresh_person(self, cur, person_id):
+        """Re-read one person's published preferences into the index"""
+        with self._lock:
+            if not self._expires and self._replay is None:
+                return
+        cur.execute(
+            """
+            SELECT per.identity_role, p.topic_id, p.preference_role
+            FROM person per
+            JOIN preference p ON p.person_id = per.id
+            WHERE per.id = %s
+              AND per.preferences_published = TRUE
+            """,
+            (person_id,)
+        )
+        rows = cur.fetchall()
+
+        entry = None
+        if rows:
+            entry = (rows[0][0], {topic_id: preference_role for _, topic_id, preference_role in rows})
+        with self._lock:
+            self._put(person_id, entry)
+            if self._replay is not None:
+                self._replay[person_id] = entry
+
+    def load(self, cur):
+        """Build the index now and return (people, by_topic), for batch jobs.
+
+        Unlike candidates() this starts no change listener and sets no TTL.
+        """
+        people, by_topic = self._build(cur)
+        with self._lock:
+            self._people = people
+            self._by_topic = by_topic
+        return people, by_topic
+
+    def candidates(self, cur, person_id, topic_id=None, role_filter=None):
+        """List (other_id, topic_id, my_role, other_role) strict matches for a published person"""
+        ensure_change_listener()
+        self._ensure_loaded(cur)
+        return self.lookup(person_id, topic_id, role_filter)
+
+    def lookup(self, person_id, topic_id=None, role_filter=None):
+        """candidates() against whatever is loaded, without loading or listening"""
+        with self._lock:
+            entry = self._people.get(person_id)
+            if not entry:
+                return []
+            identity_role, prefs = entry
+            opposite_role = "alumni" if identity_role == "student" else "student"
+
+            matches = []
+            for my_topic, my_role in prefs.items():
+                if topic_id and my_topic != topic_id:
+                    continue
+                if role_filter and my_role != role_filter:
+                    continue
+                other_role = MATCHING_ROLE.get(my_role)
+                bucket = self._by_topic.get(my_topic, {}).get((opposite_role, other_role), ())
+                for other_id in bucket:
+                    if other_id != person_id:
+                        matches.append((other_id, my_topic, my_role, other_role))
+            return matches
+
+
+match_index = MatchIndex()
+
+
+on_person_change(match_index.refresh_person, match_index.invalidate)
+
 
 # ============================================================
-# MATCHING ROUTES - CORRECTED VERSION
+# MATCH RANKING
+# ============================================================
+# Every published person is a sparse feature vector (topics, programme,
+# faculty, institute, home country, work country, employer). Candidates that
+# pass the strict topic-role rule are ranked by weighted cosine similarity,
+# which only touches the features two people actually have.
+
+RANKING_WEIGHTS = {
+    "topic": 3.0,
+    "programme": 2.0,
+    "faculty": 1.0,
+    "institute": 1.0,
+    "country": 1.0,
+    "work_country": 0.5,
+    "company": 0.5
+}
+
+
+def similarity(mine, theirs):
+    """Cosine similarity of two (features, norm) vectors, rounded to 4 places"""
+    if not mine or not theirs or not mine[1] or not theirs[1]:
+        return 0.0
+    small, large = sorted((mine[0], theirs[0]), key=len)
+    dot = sum(w * w for f, w in small.items() if f in large)
+    return round(dot / (mine[1] * theirs[1]), 4)
+
+
+class ProfileVectors:
+    """In-memory sparse feature vectors for published people.
+
+    Rebuilt single-flight like MatchIndex, replaying refresh_person() results
+    that land during a rebuild.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._vectors = {}
+        self._expires = 0.0
+        self._generation = 0
+        self._replay = None
+
+    def invalidate(self):
+        """Force a full rebuild on next use"""
+        with self._lock:
+            self._expires = 0.0
+            self._generation += 1
+
+    def _load(self, cur, person_id=None):
+        """Build {person_id: (features, norm)} for published people (or just one)"""
+        person_sql = "AND id = %s" if person_id is not None else ""
+        cur.execute(
+            f"""
+            WITH people AS (
+                SELECT id, home_country
+                FROM person
+                WHERE preferences_published = TRUE
+                  {person_sql}
+            )
+            SELECT id, 'country', home_country FROM people
+             WHERE home_country IS NOT NULL
+            UNION ALL
+            SELECT pr.person_id, 'topic', pr.topic_id::text
+              FROM preference pr JOIN people ON people.id = pr.person_id
+            UNION ALL
+            SELECT e.person_id, 'programme', e.programme_id::text
+              FROM education e JOIN people ON people.id = e.person_id
+            UNION ALL
+            SELECT e.person_id, 'faculty', p.faculty_id::text
+              FROM education e JOIN people ON people.id = e.person_id
+              JOIN programme p ON p.id = e.programme_id
+            UNION ALL
+            SELECT e.person_id, 'institute', p.institute_id::text
+              FROM education e JOIN people ON people.id = e.person_id
+              JOIN programme p ON p.id = e.programme_id
+             WHERE p.institute_id IS NOT NULL
+            UNION ALL
+            SELECT c.person_id, 'work_country', c.country_code
+              FROM career c JOIN people ON people.id = c.person_id
+             WHERE c.country_code IS NOT NULL
+            UNION ALL
+            SELECT c.person_id, 'company', lower(c.company_name)
+              FROM career c JOIN people ON people.id = c.person_id
+            """,
+            (person_id,) if person_id is not None else None
+        )
+
+        features = {}
+        for pid, kind, value in cur.fetchall():
+            features.setdefault(pid, {})[(kind, value)] = RANKING_WEIGHTS[kind]
+
+        return {
+            pid: (feats, math.sqrt(sum(w * w for w in feats.values())))
+            for pid, feats in features.items()
+        }
+
+    def _ensure_loaded(self, cur):
+        if time.monotonic() < self._expires:
+            return
+        with self._reload_lock:
+            if time.monotonic() < self._expires:
+                return
+            with self._lock:
+                generation = self._generation
+                self._replay = {}
+            try:
+                vectors = self._load(cur)
+            except Exception:
+                with self._lock:
+                    self._replay = None
+                raise
+
+            with self._lock:
+                for person_id, vector in self._replay.items():
+                    self._put(vectors, person_id, vector)
+                self._vectors = vectors
+                self._replay = None
+                if generation == self._generation:
+                    self._expires = time.monotonic() + MATCH_INDEX_TTL
+
+    @staticmethod
+    def _put(vectors, person_id, vector):
+        if vector:
+            vectors[person_id] = vector
+        else:
+            vectors.pop(person_id, None)
+
+    def refresh_person(self, cur, person_id):
+        """Re-read one person's vector"""
+        with self._lock:
+            if not self._expires and self._replay is None:
+                return
+        vector = self._load(cur, person_id).get(person_id)
+        with self._lock:
+            self._put(self._vectors, person_id, vector)
+            if self._replay is not None:
+                self._replay[person_id] = vector
+
+    def has_feature(self, person_id, kind, value):
+        with self._lock:
+            entry = self._vectors.get(person_id)
+        return bool(entry) and (kind, value) in entry[0]
+
+    def scores(self, cur, person_id, other_ids):
+        """Cosine similarity in [0, 1] between person_id and each of other_ids"""
+        self._ensure_loaded(cur)
+
+        with self._lock:
+            mine = self._vectors.get(person_id)
+            others = {oid: self._vectors.get(oid) for oid in set(other_ids)}
+
+        return {oid: similarity(mine, theirs) for oid, theirs in others.items()}
+
+
+profile_vectors = ProfileVectors()
+on_person_change(profile_vectors.refresh_person, profile_vectors.invalidate)
+
+
+# ============================================================
+# MATCHING ROUTES
 # ============================================================
 
 @app.get("/matching")
@@ -1129,123 +2811,344 @@ def matching_page():
 
 
 
+def _recommended_page(cur, user_id, topic_id, role_filter, location_code, page_size, after):
+    """One page of precomputed recommendations, or None if none were computed for user_id"""
+    filters = []
+    params = []
+    if topic_id:
+        filters.append("rec.topic_id = %s")
+        params.append(topic_id)
+    if role_filter:
+        filters.append("rec.my_role = %s")
+        params.append(role_filter)
+    if location_code:
+        filters.append("other.home_country = %s")
+        params.append(location_code)
+    filter_sql = "".join(f" AND {f}" for f in filters)
+
+    cur.execute(
+        f"""
+        SELECT COUNT(*), (SELECT COUNT(*) FROM match_recommendation WHERE person_id = %s)
+        FROM match_recommendation rec
+        JOIN person other ON other.id = rec.other_id
+        WHERE rec.person_id = %s
+          AND other.preferences_published = TRUE
+          {filter_sql}
+        """,
+        [user_id, user_id, *params]
+    )
+    total_estimate, computed = cur.fetchone()
+    if not computed:
+        return None
+
+    keyset_sql = ""
+    if after:
+        keyset_sql = """
+          AND (rec.score < %s::numeric
+               OR (rec.score = %s::numeric AND (rec.other_id, rec.topic_id) > (%s, %s)))
+        """
+        params.extend([after[0], after[0], after[1], after[2]])
+
+    cur.execute(
+        f"""
+        SELECT
+            other.id AS person_id,
+            COALESCE(NULLIF(other.first_name, ''), other.username) AS first_name,
+            COALESCE(NULLIF(other.last_name, ''), '') AS last_name,
+            other.identity_role,
+            other.home_country,
+            t.id AS topic_id,
+            t.name AS topic_name,
+            rec.my_role,
+            rec.other_role,
+            mr.status AS request_status,
+            rec.score::float8
+        FROM match_recommendation rec
+        JOIN person other
+          ON other.id = rec.other_id
+        JOIN topic t
+          ON t.id = rec.topic_id
+        LEFT JOIN mentorship_request mr
+          ON mr.pair_low = LEAST(rec.person_id, rec.other_id)
+         AND mr.pair_high = GREATEST(rec.person_id, rec.other_id)
+         AND mr.topic_id = rec.topic_id
+        WHERE rec.person_id = %s
+          AND other.preferences_published = TRUE
+          {filter_sql}
+          {keyset_sql}
+        ORDER BY rec.score DESC, rec.other_id, rec.topic_id
+        LIMIT %s
+        """,
+        [user_id, *params, page_size + 1]
+    )
+    rows = cur.fetchall()
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor([last[10], last[0], last[5]])
+
+    results = [
+        {
+            "person_id": row[0],
+            "first_name": row[1],
+            "last_name": row[2],
+            "identity_role": row[3],
+            "home_country": row[4] or "Not specified",
+            "topic_id": row[5],
+            "topic_name": row[6],
+            "my_role": row[7],
+            "other_role": row[8],
+            "request_status": row[9],
+            "score": row[10]
+        }
+        for row in rows
+    ]
+    return {"results": results, "next_cursor": next_cursor, "total_estimate": total_estimate}
+
+
+def _search_item(row, roles):
+    """Build a search result from a candidate detail row and its (my_role, other_role)"""
+    return {
+        "person_id": row[0],
+        "first_name": row[1],
+        "last_name": row[2],
+        "identity_role": row[3],
+        "home_country": row[4] or "Not specified",
+        "topic_id": row[5],
+        "topic_name": row[6],
+        "my_role": roles[(row[0], row[5])][0],
+        "other_role": roles[(row[0], row[5])][1],
+        "request_status": row[7]
+    }
+
+
+# Shared with the async serving mode in asgi.py
+MATCH_LOCATION_COUNT_SQL = """
+    SELECT COUNT(*)
+    FROM unnest(%s::int[]) AS c(person_id)
+    JOIN person other ON other.id = c.person_id
+    WHERE other.preferences_published = TRUE
+      AND other.home_country = %s
+"""
+
+MATCH_DETAIL_SQL = """
+    SELECT
+        other.id AS person_id,
+        COALESCE(NULLIF(other.first_name, ''), other.username) AS first_name,
+        COALESCE(NULLIF(other.last_name, ''), '') AS last_name,
+        other.identity_role,
+        other.home_country,
+        t.id AS topic_id,
+        t.name AS topic_name,
+        mr.status AS request_status
+    FROM unnest(%s::int[], %s::int[]) AS c(person_id, topic_id)
+    JOIN person other
+      ON other.id = c.person_id
+    JOIN topic t
+      ON t.id = c.topic_id
+    LEFT JOIN mentorship_request mr
+      ON mr.pair_low = LEAST(%s, other.id)
+     AND mr.pair_high = GREATEST(%s, other.id)
+     AND mr.topic_id = c.topic_id
+    WHERE other.preferences_published = TRUE
+      {location_sql}
+      {keyset_sql}
+    ORDER BY t.name, first_name, last_name, other.id, t.id
+    {limit_sql}
+"""
+
+
+def plan_matching_search(cur, user_id, topic_id, role_filter, location_code, ranked, page_size, after,
+                         stream=False):
+    """Work out a search page from the in-memory indexes: (payload, plan).
+
+    payload is the whole response when no query is needed. Otherwise plan holds
+    the detail query ("sql", "params"), an optional MATCH_LOCATION_COUNT_SQL
+    ("count_params") whose result replaces "total_estimate", and what
+    matching_search_payload() needs. cur is only used to (re)load the indexes.
+    """
+    matches = match_index.candidates(cur, user_id, topic_id, role_filter)
+    if not matches:
+        return {"results": [], "next_cursor": None, "total_estimate": 0}, None
+
+    plan = {
+        "roles": {(m[0], m[1]): (m[2], m[3]) for m in matches},
+        "ranked": ranked,
+        "page_size": page_size,
+        "next_cursor": None,
+        "count_params": None,
+        "scores": None,
+        "position": None
+    }
+    location_sql = ""
+    keyset_sql = ""
+
+    if ranked:
+        # Rank and page in memory, then load details for this page only
+        scores = profile_vectors.scores(cur, user_id, [m[0] for m in matches])
+        if location_code:
+            matches = [
+                m for m in matches
+                if profile_vectors.has_feature(m[0], "country", location_code)
+            ]
+        plan["total_estimate"] = len(matches)
+
+        ordered = sorted(matches, key=lambda m: (-scores[m[0]], m[0], m[1]))
+        if after:
+            after_key = (-after[0], after[1], after[2])
+            ordered = [m for m in ordered if (-scores[m[0]], m[0], m[1]) > after_key]
+
+        matches = ordered[:page_size]
+        if len(ordered) > page_size:
+            last = matches[-1]
+            plan["next_cursor"] = encode_cursor([scores[last[0]], last[0], last[1]])
+        plan["scores"] = scores
+        plan["position"] = {(m[0], m[1]): i for i, m in enumerate(matches)}
+
+        if not matches:
+            return {"results": [], "next_cursor": None, "total_estimate": plan["total_estimate"]}, None
+
+    candidate_ids = [m[0] for m in matches]
+    candidate_topics = [m[1] for m in matches]
+    params = [candidate_ids, candidate_topics, user_id, user_id]
+
+    if location_code:
+        location_sql = "AND other.home_country = %s"
+        params.append(location_code)
+
+    if not ranked:
+        # The index already gives the exact count unless a location filter narrows it
+        plan["total_estimate"] = len(matches)
+        if location_code:
+            plan["count_params"] = (candidate_ids, location_code)
+
+        if after:
+            keyset_sql = """
+              AND (t.name,
+                   COALESCE(NULLIF(other.first_name, ''), other.username),
+                   COALESCE(NULLIF(other.last_name, ''), ''),
+                   other.id,
+                   t.id) > (%s, %s, %s, %s, %s)
+            """
+            params.extend(after)
+
+    limit_sql = ""
+    if not stream:
+        limit_sql = "LIMIT %s"
+        params.append(page_size + 1)
+
+    plan["sql"] = MATCH_DETAIL_SQL.format(location_sql=location_sql, keyset_sql=keyset_sql, limit_sql=limit_sql)
+    plan["params"] = params
+    return None, plan
+
+
+def matching_search_payload(plan, rows):
+    """Build the search response from the plan and its MATCH_DETAIL_SQL rows"""
+    next_cursor = plan["next_cursor"]
+    if plan["ranked"]:
+        rows = sorted(rows, key=lambda row: plan["position"][(row[0], row[5])])
+    elif len(rows) > plan["page_size"]:
+        rows = rows[:plan["page_size"]]
+        last = rows[-1]
+        next_cursor = encode_cursor([last[6], last[1], last[2], last[0], last[5]])
+
+    results = []
+    for row in rows:
+        item = _search_item(row, plan["roles"])
+        if plan["ranked"]:
+            item["score"] = plan["scores"][row[0]]
+        results.append(item)
+
+    return {
+        "results": results,
+        "next_cursor": next_cursor,
+        "total_estimate": plan["total_estimate"]
+    }
+
+
 @app.get("/api/matching/search")
 @login_required
 def api_matching_search():
-    """Search for strict topic-role matches from published preferences only."""
+    """Search for strict topic-role matches from published preferences only.
+
+    Results are paged with ?limit= and the opaque ?cursor= returned as
+    next_cursor, ordered by topic name, first name, last name, person id.
+    With ?sort=score they are ordered by profile similarity instead and each
+    result carries its score; ?sort=recommended serves the same order from
+    the precomputed recommend-matches table, ranking live if it is empty.
+    ?stream=1 streams every remaining result in the default order.
+    """
     user_id = session.get("user_id")
 
     topic_id = request.args.get("topic_id", type=int)
     role_filter = request.args.get("role", type=str)
     location_code = request.args.get("location", type=str)
+    sort = request.args.get("sort")
+    ranked = sort in ("score", "recommended")
+    page_size = get_page_size(MATCH_PAGE_SIZE, MATCH_PAGE_SIZE_MAX)
+    stream = wants_stream()
 
-    try:
-        with get_conn() as conn:
-            with conn.cursor() as cur:
-                # Check current user + publication status
-                cur.execute(
-                    """
-                    SELECT id, identity_role, preferences_published
-                    FROM person
-                    WHERE id = %s
-                    """,
-                    (user_id,)
-                )
-                me = cur.fetchone()
+    if stream and ranked:
+        return jsonify({"error": "stream=1 is only supported for the default order"}), 400
 
-                if not me:
-                    return jsonify({"error": "User not found"}), 404
-
-                my_identity_role = me[1]
-                preferences_published = me[2]
-
-                if not preferences_published:
-                    return jsonify({
-                        "results": [],
-                        "message": "Please publish your preferences first to see matches."
-                    }), 200
-
-                opposite_role = "alumni" if my_identity_role == "student" else "student"
-
-                params = [user_id, user_id, opposite_role]
-                extra_filters = []
+    after = None
+    if request.args.get("cursor"):
+        try:
+            after = decode_cursor(
+                request.args["cursor"],
+                ((int, float), int, int) if ranked else (str, str, str, int, int)
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-                if topic_id:
-                    extra_filters.append("my_pref.topic_id = %s")
-                    params.append(topic_id)
+    try:
+        # Check current user + publication status
+        me = get_identity(user_id)
+        if not me:
+            return jsonify({"error": "User not found"}), 404
 
-                if role_filter:
-                    extra_filters.append("my_pref.preference_role = %s")
-                    params.append(role_filter)
+        if not me["preferences_published"]:
+            return jsonify({
+                "results": [],
+                "message": "Please publish your preferences first to see matches."
+            }), 200
 
-                if location_code:
-                    extra_filters.append("other.home_country = %s")
-                    params.append(location_code)
+        with contextlib.ExitStack() as resources:
+            conn = resources.enter_context(get_conn())
+            with conn.cursor() as cur:
 
-                extra_sql = ""
-                if extra_filters:
-                    extra_sql = " AND " + " AND ".join(extra_filters)
+                if sort == "recommended":
+                    page = _recommended_page(
+                        cur, user_id, topic_id, role_filter, location_code, page_size, after
+                    )
+                    if page is not None:
+                        return jsonify(page), 200
 
-                cur.execute(
-                    f"""
-                    SELECT
-                        other.id AS person_id,
-                        COALESCE(NULLIF(other.first_name, ''), other.username) AS first_name,
-                        COALESCE(NULLIF(other.last_name, ''), '') AS last_name,
-                        other.identity_role,
-                        other.home_country,
-                        my_pref.topic_id,
-                        t.name AS topic_name,
-                        my_pref.preference_role AS my_role,
-                        other_pref.preference_role AS other_role,
-                        mr.status AS request_status
-                    FROM preference my_pref
-                    JOIN person me
-                      ON me.id = my_pref.person_id
-                    JOIN topic t
-                      ON t.id = my_pref.topic_id
-                    JOIN preference other_pref
-                      ON other_pref.topic_id = my_pref.topic_id
-                    JOIN person other
-                      ON other.id = other_pref.person_id
-                    LEFT JOIN mentorship_request mr
-                      ON mr.topic_id = my_pref.topic_id
-                     AND LEAST(mr.sender_id, mr.receiver_id) = LEAST(%s, other.id)
-                     AND GREATEST(mr.sender_id, mr.receiver_id) = GREATEST(%s, other.id)
-                    WHERE my_pref.person_id = %s
-                      AND other.id <> %s
-                      AND other.identity_role = %s
-                      AND me.preferences_published = TRUE
-                      AND other.preferences_published = TRUE
-                      AND (
-                            (my_pref.preference_role = 'mentee' AND other_pref.preference_role = 'mentor')
-                         OR (my_pref.preference_role = 'mentor' AND other_pref.preference_role = 'mentee')
-                         OR (my_pref.preference_role = 'two_way' AND other_pref.preference_role = 'two_way')
-                      )
-                      {extra_sql}
-                    ORDER BY t.name, first_name, last_name
-                    """,
-                    [user_id, user_id, user_id, user_id, opposite_role, *params[3:]]
+                payload, plan = plan_matching_search(
+                    cur, user_id, topic_id, role_filter, location_code, ranked, page_size, after, stream
                 )
+                if payload is not None:
+                    return jsonify(payload), 200
+
+                if plan["count_params"]:
+                    cur.execute(MATCH_LOCATION_COUNT_SQL, plan["count_params"])
+                    plan["total_estimate"] = cur.fetchone()[0]
+
+                if stream:
+                    rows = stream_query(resources, conn, plan["sql"], plan["params"])
+                    return stream_json_response(
+                        [
+                            ("results", (_search_item(row, plan["roles"]) for row in rows)),
+                            ("next_cursor", None),
+                            ("total_estimate", plan["total_estimate"])
+                        ],
+                        resources.pop_all()
+                    )
 
-                rows = cur.fetchall()
-
-                results = []
-                for row in rows:
-                    results.append({
-                        "person_id": row[0],
-                        "first_name": row[1],
-                        "last_name": row[2],
-                        "identity_role": row[3],
-                        "home_country": row[4] or "Not specified",
-                        "topic_id": row[5],
-                        "topic_name": row[6],
-                        "my_role": row[7],
-                        "other_role": row[8],
-                        "request_status": row[9]
-                    })
-
-                return jsonify({"results": results}), 200
+                cur.execute(plan["sql"], plan["params"])
+                return jsonify(matching_search_payload(plan, cur.fetchall())), 200
 
     except Exception as e:
         print(f"Error in matching search: {str(e)}")
@@ -1259,20 +3162,17 @@ def api_matching_filter_options():
     user_id = session.get("user_id")
 
     try:
-        with get_conn() as conn:
-            with conn.cursor() as cur:
+        countries = get_reference_data("countries", _load_countries)[0]["countries"]
 
-                # check if user has published preferences
-                cur.execute(
-                    "SELECT preferences_published FROM person WHERE id=%s",
-                    (user_id,)
-                )
-                row = cur.fetchone()
+        # check if user has published preferences
+        identity = get_identity(user_id)
+        if not identity:
+            return jsonify({"error": "User not found"}), 404
 
-                if not row:
-                    return jsonify({"error": "User not found"}), 404
+        preferences_published = identity["preferences_published"]
 
-                preferences_published = row[0]
+        with get_conn() as conn:
+            with conn.cursor() as cur:
 
                 # topics = only user's own preferences
                 cur.execute(
@@ -1295,16 +3195,6 @@ def api_matching_filter_options():
                     for r in cur.fetchall()
                 ]
 
-                # countries
-                cur.execute(
-                    "SELECT code, name FROM country ORDER BY name"
-                )
-
-                countries = [
-                    {"code": r[0], "name": r[1]}
-                    for r in cur.fetchall()
-                ]
-
                 return jsonify({
                     "preferences_published": preferences_published,
                     "topic_options": topic_options,
@@ -1314,65 +3204,174 @@ def api_matching_filter_options():
     except Exception as e:
         return jsonify({"error": str(e)}), 500        
         
+# Card snapshots for the matching modal, kept as pre-serialized JSON in an
+# LRU bounded by PROFILE_SNAPSHOT_CACHE_BYTES. person_changed() reloads the
+# snapshot (publish/unpublish and saved preferences fill it straight away).
+
+PROFILE_SNAPSHOT_CACHE_BYTES = int(os.getenv("PROFILE_SNAPSHOT_CACHE_BYTES", str(8 * 1024 * 1024)))
+
+
+class SnapshotCache:
+    """Thread-safe LRU of person_id -> (payload, body) capped by total body size"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __contains__(self, person_id):
+        with self._lock:
+            return person_id in self._entries
+
+    def get(self, person_id):
+        with self._lock:
+            entry = self._entries.get(person_id)
+            if entry is not None:
+                self._entries.move_to_end(person_id)
+            return entry
+
+    def put(self, person_id, payload):
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        with self._lock:
+            old = self._entries.pop(person_id, None)
+            if old is not None:
+                self._bytes -= len(old[1])
+            self._entries[person_id] = (payload, body)
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+        return payload, body
+
+    def drop(self, person_id):
+        with self._lock:
+            old = self._entries.pop(person_id, None)
+            if old is not None:
+                self._bytes -= len(old[1])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+profile_snapshots = SnapshotCache(PROFILE_SNAPSHOT_CACHE_BYTES)
+
+
+def _load_public_profiles(cur, person_ids):
+    """Load modal snapshots for several people in one query: {person_id: payload}"""
+    cur.execute(
+        """
+        SELECT p.id, p.first_name, p.last_name, p.identity_role, p.home_country,
+               CASE WHEN p.preferences_published THEN (
+                   SELECT COALESCE(json_agg(json_build_object(
+                       'topic_name', t.name,
+                       'preference_role', pf.preference_role
+                   ) ORDER BY t.name), '[]'::json)
+                   FROM preference pf
+                   JOIN topic t ON pf.topic_id = t.id
+                   WHERE pf.person_id = p.id
+               ) ELSE '[]'::json END
+        FROM person p
+        WHERE p.id = ANY(%s)
+        """,
+        (list(person_ids),)
+    )
+    return {
+        row[0]: {
+            "first_name": row[1],
+            "last_name": row[2],
+            "identity_role": row[3],
+            "home_country": row[4],
+            "preferences": row[5]
+        }
+        for row in cur.fetchall()
+    }
+
+
+def _refresh_profile_snapshot(cur, person_id):
+    # Only snapshots someone has opened are reloaded; loading one for every
+    # save would push the hot entries out of the byte budget
+    if person_id not in profile_snapshots:
+        return
+    snapshot = _load_public_profiles(cur, [person_id]).get(person_id)
+    if snapshot is None:
+        profile_snapshots.drop(person_id)
+    else:
+        profile_snapshots.put(person_id, snapshot)
+
+
+on_person_change(_refresh_profile_snapshot, profile_snapshots.clear)
+
+
+def get_profile_snapshots(person_ids):
+    """Get {person_id: (payload, body)}, loading every miss with one query"""
+    ensure_change_listener()
+    found = {}
+    missing = []
+    for person_id in person_ids:
+        entry = profile_snapshots.get(person_id)
+        if entry is None:
+            missing.append(person_id)
+        else:
+            found[person_id] = entry
+
+    if missing:
+        with get_conn() as conn:
+            with conn.cursor() as cur:
+                loaded = _load_public_profiles(cur, missing)
+        for person_id, snapshot in loaded.items():
+            found[person_id] = profile_snapshots.put(person_id, snapshot)
+    return found
+
+
 @app.get("/api/matching/public-profile/<int:person_id>")
 @login_required
 def api_matching_public_profile(person_id):
     """Return simplified published profile for modal view."""
 
     try:
-        with get_conn() as conn:
-            with conn.cursor() as cur:
-
-                cur.execute(
-                    """
-                    SELECT first_name, last_name, identity_role, home_country,
-                           preferences_published
-                    FROM person
-                    WHERE id = %s
-                    """,
-                    (person_id,)
-                )
+        entry = get_profile_snapshots([person_id]).get(person_id)
+        if entry is None:
+            return jsonify({"error": "User not found"}), 404
+        return app.response_class(entry[1], status=200, mimetype="application/json")
 
-                row = cur.fetchone()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-                if not row:
-                    return jsonify({"error": "User not found"}), 404
 
-                first_name, last_name, role, home_country, pref_pub = row
+@app.get("/api/matching/public-profiles")
+@login_required
+def api_matching_public_profiles():
+    """Prefetch modal snapshots for a page of results: ?ids=1,2,3"""
+    try:
+        person_ids = list(dict.fromkeys(
+            int(x) for x in request.args.get("ids", "").split(",") if x.strip()
+        ))
+    except ValueError:
+        return jsonify({"error": "ids must be a comma-separated list of integers"}), 400
 
-                preferences = []
+    if not person_ids:
+        return jsonify({"error": "ids is required"}), 400
+    if len(person_ids) > MATCH_PAGE_SIZE_MAX:
+        return jsonify({"error": f"At most {MATCH_PAGE_SIZE_MAX} ids per request"}), 400
 
-                if pref_pub:
-                    cur.execute(
-                        """
-                        SELECT t.name, p.preference_role
-                        FROM preference p
-                        JOIN topic t ON p.topic_id = t.id
-                        WHERE p.person_id = %s
-                        ORDER BY t.name
-                        """,
-                        (person_id,)
-                    )
+    try:
+        found = get_profile_snapshots(person_ids)
+        return jsonify({
+            "profiles": {str(person_id): entry[0] for person_id, entry in found.items()},
+            "missing": [person_id for person_id in person_ids if person_id not in found]
+        }), 200
 
-                    preferences = [
-                        {
-                            "topic_name": r[0],
-                            "preference_role": r[1]
-                        }
-                        for r in cur.fetchall()
-                    ]
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-                return jsonify({
-                    "first_name": first_name,
-                    "last_name": last_name,
-                    "identity_role": role,
-                    "home_country": home_country,
-                    "preferences": preferences
-                }), 200
 
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500        
-        
 @app.post("/api/matching/request")
 @login_required
 def api_matching_request():
@@ -1430,34 +3429,37 @@ def api_matching_request():
                 if not valid_match:
                     return jsonify({"error": "This request does not match the current strict topic-role rules."}), 400
 
-                # Check existing request for same pair + same topic, any direction
-                cur.execute(
-                    """
-                    SELECT id, status
-                    FROM mentorship_request
-                    WHERE topic_id = %s
-                      AND LEAST(sender_id, receiver_id) = LEAST(%s, %s)
-                      AND GREATEST(sender_id, receiver_id) = GREATEST(%s, %s)
-                    LIMIT 1
-                    """,
-                    (topic_id, sender_id, receiver_id, sender_id, receiver_id)
-                )
-                existing = cur.fetchone()
-
-                if existing:
-                    return jsonify({
-                        "error": f"Request already exists with status: {existing[1]}"
-                    }), 409
-
+                # One request per pair + topic in either direction: the unique
+                # (pair_low, pair_high, topic_id) key settles concurrent sends
                 cur.execute(
                     """
                     INSERT INTO mentorship_request (sender_id, receiver_id, topic_id, status)
                     VALUES (%s, %s, %s, 'pending')
+                    ON CONFLICT (pair_low, pair_high, topic_id) DO NOTHING
                     RETURNING id
                     """,
                     (sender_id, receiver_id, topic_id)
                 )
-                request_id = cur.fetchone()[0]
+                created = cur.fetchone()
+
+                if not created:
+                    cur.execute(
+                        """
+                        SELECT status
+                        FROM mentorship_request
+                        WHERE pair_low = LEAST(%s, %s)
+                          AND pair_high = GREATEST(%s, %s)
+                          AND topic_id = %s
+                        """,
+                        (sender_id, receiver_id, sender_id, receiver_id, topic_id)
+                    )
+                    existing = cur.fetchone()
+                    conn.rollback()
+                    return jsonify({
+                        "error": f"Request already exists with status: {existing[0] if existing else 'unknown'}"
+                    }), 409
+
+                request_id = created[0]
 
             conn.commit()
             return jsonify({
@@ -1479,109 +3481,255 @@ def requests_management_page():
     """Show incoming pending requests page"""
     return render_template("requests_management.html")
     
+REQUEST_STATUSES = ("pending", "accepted", "rejected")
+REQUEST_BUCKET_LIMIT = int(os.getenv("REQUEST_BUCKET_LIMIT", "50"))
+REQUEST_BUCKET_LIMIT_MAX = int(os.getenv("REQUEST_BUCKET_LIMIT_MAX", "200"))
+
+
+def _request_item(row):
+    """Build a request dict from the standard request columns
+    (id, sender_id, receiver_id, sender names/role, receiver names/role,
+    topic_id, topic_name, status, created_at, updated_at)"""
+    return {
+        "request_id": row[0],
+        "sender_id": row[1],
+        "receiver_id": row[2],
+        "sender_first_name": row[3],
+        "sender_last_name": row[4],
+        "sender_identity_role": row[5],
+        "receiver_first_name": row[6],
+        "receiver_last_name": row[7],
+        "receiver_identity_role": row[8],
+        "topic_id": row[9],
+        "topic_name": row[10],
+        "status": row[11],
+        "created_at": str(row[12]) if row[12] else None,
+        "updated_at": str(row[13]) if row[13] else None
+    }
+
+
+# Shared with the async serving mode in asgi.py
+REQUESTS_OVERVIEW_SQL = """
+    WITH me AS (
+        SELECT id, username, first_name, last_name, identity_role
+        FROM person
+        WHERE id = %s
+    ),
+    mine AS (
+        SELECT
+            mr.*,
+            CASE WHEN mr.receiver_id = %s THEN 'received' ELSE 'sent' END AS direction
+        FROM mentorship_request mr
+        WHERE mr.receiver_id = %s
+           OR mr.sender_id = %s
+    ),
+    bucketed AS (
+        SELECT
+            mine.*,
+            ROW_NUMBER() OVER (
+                PARTITION BY direction, status
+                ORDER BY updated_at DESC, id DESC
+            ) AS bucket_position,
+            COUNT(*) OVER (PARTITION BY direction, status) AS bucket_total
+        FROM mine
+    )
+    SELECT
+        me.id,
+        me.username,
+        me.first_name,
+        me.last_name,
+        me.identity_role,
+        b.direction,
+        b.bucket_total,
+        b.id AS request_id,
+        b.sender_id,
+        b.receiver_id,
+        COALESCE(NULLIF(sender.first_name, ''), sender.username) AS sender_first_name,
+        COALESCE(NULLIF(sender.last_name, ''), '') AS sender_last_name,
+        sender.identity_role AS sender_identity_role,
+        COALESCE(NULLIF(receiver.first_name, ''), receiver.username) AS receiver_first_name,
+        COALESCE(NULLIF(receiver.last_name, ''), '') AS receiver_last_name,
+        receiver.identity_role AS receiver_identity_role,
+        b.topic_id,
+        t.name AS topic_name,
+        b.status,
+        b.created_at,
+        b.updated_at
+    FROM me
+    LEFT JOIN bucketed b
+      ON b.bucket_position <= %s
+    LEFT JOIN person sender
+      ON sender.id = b.sender_id
+    LEFT JOIN person receiver
+      ON receiver.id = b.receiver_id
+    LEFT JOIN topic t
+      ON t.id = b.topic_id
+    ORDER BY b.direction, b.status, b.bucket_position
+"""
+
+
+def requests_overview_payload(rows, bucket_limit):
+    """Build the overview response from REQUESTS_OVERVIEW_SQL rows: (payload, status)"""
+    if not rows:
+        return {"error": "User not found"}, 404
+
+    me = rows[0]
+    current_user = {
+        "id": me[0],
+        "username": me[1],
+        "first_name": me[2],
+        "last_name": me[3],
+        "identity_role": me[4]
+    }
+
+    buckets = {
+        f"{direction}_{status}": []
+        for direction in ("received", "sent")
+        for status in REQUEST_STATUSES
+    }
+    counts = {key: 0 for key in buckets}
+
+    cursors = {key: None for key in buckets}
+    last_rows = {}
+
+    for row in rows:
+        key = f"{row[5]}_{row[18]}"
+        if key not in buckets:
+            continue
+        counts[key] = row[6]
+        buckets[key].append(_request_item(row[7:]))
+        last_rows[key] = row
+
+    # Where /api/requests-management/requests should continue each truncated bucket
+    for key, row in last_rows.items():
+        if counts[key] > len(buckets[key]):
+            cursors[key] = encode_cursor([str(row[20]), row[7]])
+
+    return {
+        "ok": True,
+        "current_user": current_user,
+        **buckets,
+        "counts": counts,
+        "cursors": cursors,
+        "bucket_limit": bucket_limit
+    }, 200
+
+
+def requests_overview_fields(first, rows):
+    """(key, value) pairs of the overview for stream_json_response, every request
+    of every bucket; rows continue REQUESTS_OVERVIEW_SQL after its first row"""
+    yield "ok", True
+    yield "current_user", {
+        "id": first[0],
+        "username": first[1],
+        "first_name": first[2],
+        "last_name": first[3],
+        "identity_role": first[4]
+    }
+
+    counts = {
+        f"{direction}_{status}": 0
+        for direction in ("received", "sent")
+        for status in REQUEST_STATUSES
+    }
+
+    def items(key, group):
+        for row in group:
+            counts[key] = row[6]
+            yield _request_item(row[7:])
+
+    # Rows arrive ordered by direction, status: one array per bucket
+    for key, group in itertools.groupby(itertools.chain([first], rows), key=lambda row: f"{row[5]}_{row[18]}"):
+        if key in counts:
+            yield key, items(key, group)
+    for key in counts:
+        if not counts[key]:
+            yield key, []
+
+    yield "counts", counts
+    yield "cursors", {key: None for key in counts}
+    yield "bucket_limit", None
+
+
 @app.get("/api/requests-management/overview")
 @login_required
 def api_requests_management_overview():
-    """Get current user's received and sent requests grouped by status"""
+    """Get current user's received and sent requests grouped by status.
+
+    One query returns the user, the newest ?limit= requests of each
+    direction/status bucket and each bucket's total in "counts".
+    ?stream=1 streams every request of every bucket instead.
+    """
     user_id = session.get("user_id")
+    bucket_limit = get_page_size(REQUEST_BUCKET_LIMIT, REQUEST_BUCKET_LIMIT_MAX)
 
     try:
+        if wants_stream():
+            with contextlib.ExitStack() as resources:
+                conn = resources.enter_context(get_conn())
+                rows = stream_query(
+                    resources, conn, REQUESTS_OVERVIEW_SQL, (user_id, user_id, user_id, user_id, 2 ** 31 - 1)
+                )
+                first = next(rows, None)
+                if first is None:
+                    return jsonify({"error": "User not found"}), 404
+                return stream_json_response(requests_overview_fields(first, rows), resources.pop_all())
+
         with get_conn() as conn:
             with conn.cursor() as cur:
-                # current user info for header
                 cur.execute(
-                    """
-                    SELECT id, username, first_name, last_name, identity_role
-                    FROM person
-                    WHERE id = %s
-                    """,
-                    (user_id,)
+                    REQUESTS_OVERVIEW_SQL,
+                    (user_id, user_id, user_id, user_id, bucket_limit)
                 )
-                me = cur.fetchone()
+                rows = cur.fetchall()
 
-                if not me:
-                    return jsonify({"error": "User not found"}), 404
+        payload, status = requests_overview_payload(rows, bucket_limit)
+        return jsonify(payload), status
 
-                current_user = {
-                    "id": me[0],
-                    "username": me[1],
-                    "first_name": me[2],
-                    "last_name": me[3],
-                    "identity_role": me[4]
-                }
+    except Exception as e:
+        print(f"Error loading requests overview: {str(e)}")
+        return jsonify({"error": str(e)}), 500
 
-                # received requests
-                cur.execute(
-                    """
-                    SELECT
-                        mr.id AS request_id,
-                        mr.sender_id,
-                        mr.receiver_id,
-                        COALESCE(NULLIF(sender.first_name, ''), sender.username) AS sender_first_name,
-                        COALESCE(NULLIF(sender.last_name, ''), '') AS sender_last_name,
-                        sender.identity_role AS sender_identity_role,
-                        COALESCE(NULLIF(receiver.first_name, ''), receiver.username) AS receiver_first_name,
-                        COALESCE(NULLIF(receiver.last_name, ''), '') AS receiver_last_name,
-                        receiver.identity_role AS receiver_identity_role,
-                        mr.topic_id,
-                        t.name AS topic_name,
-                        mr.status,
-                        mr.created_at,
-                        mr.updated_at
-                    FROM mentorship_request mr
-                    JOIN person sender
-                      ON sender.id = mr.sender_id
-                    JOIN person receiver
-                      ON receiver.id = mr.receiver_id
-                    JOIN topic t
-                      ON t.id = mr.topic_id
-                    WHERE mr.receiver_id = %s
-                    ORDER BY
-                        CASE mr.status
-                            WHEN 'pending' THEN 1
-                            WHEN 'accepted' THEN 2
-                            WHEN 'rejected' THEN 3
-                            ELSE 4
-                        END,
-                        mr.updated_at DESC,
-                        mr.created_at DESC,
-                        mr.id DESC
-                    """,
-                    (user_id,)
-                )
 
-                received_pending = []
-                received_accepted = []
-                received_rejected = []
 
-                for row in cur.fetchall():
-                    item = {
-                        "request_id": row[0],
-                        "sender_id": row[1],
-                        "receiver_id": row[2],
-                        "sender_first_name": row[3],
-                        "sender_last_name": row[4],
-                        "sender_identity_role": row[5],
-                        "receiver_first_name": row[6],
-                        "receiver_last_name": row[7],
-                        "receiver_identity_role": row[8],
-                        "topic_id": row[9],
-                        "topic_name": row[10],
-                        "status": row[11],
-                        "created_at": str(row[12]) if row[12] else None,
-                        "updated_at": str(row[13]) if row[13] else None
-                    }
+@app.get("/api/requests-management/requests")
+@login_required
+def api_requests_management_bucket():
+    """Page through one bucket of the current user's requests.
+
+    ?direction=received|sent&status=pending|accepted|rejected, newest first by
+    (updated_at, id); pass next_cursor back as ?cursor= for the next page.
+    """
+    user_id = session.get("user_id")
+    direction = request.args.get("direction", type=str)
+    status = request.args.get("status", type=str)
+    page_size = get_page_size(REQUEST_BUCKET_LIMIT, REQUEST_BUCKET_LIMIT_MAX)
 
-                    if row[11] == "pending":
-                        received_pending.append(item)
-                    elif row[11] == "accepted":
-                        received_accepted.append(item)
-                    elif row[11] == "rejected":
-                        received_rejected.append(item)
+    if direction not in ("received", "sent") or status not in REQUEST_STATUSES:
+        return jsonify({"error": "direction must be received/sent and status pending/accepted/rejected"}), 400
 
-                # sent requests
+    after = None
+    if request.args.get("cursor"):
+        try:
+            after = decode_cursor(request.args["cursor"], (str, int))
+            after[0] = datetime.datetime.fromisoformat(after[0])
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+
+    # Each direction has its own (person, status, updated_at, id) index
+    owner_column = "mr.receiver_id" if direction == "received" else "mr.sender_id"
+    params = [user_id, status]
+    keyset_sql = ""
+    if after:
+        keyset_sql = "AND (mr.updated_at, mr.id) < (%s, %s)"
+        params.extend(after)
+    params.append(page_size + 1)
+
+    try:
+        with get_conn() as conn:
+            with conn.cursor() as cur:
                 cur.execute(
-                    """
+                    f"""
                     SELECT
                         mr.id AS request_id,
                         mr.sender_id,
@@ -1604,66 +3752,169 @@ def api_requests_management_overview():
                       ON receiver.id = mr.receiver_id
                     JOIN topic t
                       ON t.id = mr.topic_id
-                    WHERE mr.sender_id = %s
-                    ORDER BY
-                        CASE mr.status
-                            WHEN 'pending' THEN 1
-                            WHEN 'accepted' THEN 2
-                            WHEN 'rejected' THEN 3
-                            ELSE 4
-                        END,
-                        mr.updated_at DESC,
-                        mr.created_at DESC,
-                        mr.id DESC
+                    WHERE {owner_column} = %s
+                      AND mr.status = %s
+                      {keyset_sql}
+                    ORDER BY mr.updated_at DESC, mr.id DESC
+                    LIMIT %s
                     """,
-                    (user_id,)
+                    params
                 )
+                rows = cur.fetchall()
 
-                sent_pending = []
-                sent_accepted = []
-                sent_rejected = []
-
-                for row in cur.fetchall():
-                    item = {
-                        "request_id": row[0],
-                        "sender_id": row[1],
-                        "receiver_id": row[2],
-                        "sender_first_name": row[3],
-                        "sender_last_name": row[4],
-                        "sender_identity_role": row[5],
-                        "receiver_first_name": row[6],
-                        "receiver_last_name": row[7],
-                        "receiver_identity_role": row[8],
-                        "topic_id": row[9],
-                        "topic_name": row[10],
-                        "status": row[11],
-                        "created_at": str(row[12]) if row[12] else None,
-                        "updated_at": str(row[13]) if row[13] else None
-                    }
-
-                    if row[11] == "pending":
-                        sent_pending.append(item)
-                    elif row[11] == "accepted":
-                        sent_accepted.append(item)
-                    elif row[11] == "rejected":
-                        sent_rejected.append(item)
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_cursor = encode_cursor([str(rows[-1][13]), rows[-1][0]])
 
         return jsonify({
             "ok": True,
-            "current_user": current_user,
-            "received_pending": received_pending,
-            "received_accepted": received_accepted,
-            "received_rejected": received_rejected,
-            "sent_pending": sent_pending,
-            "sent_accepted": sent_accepted,
-            "sent_rejected": sent_rejected
+            "requests": [_request_item(row) for row in rows],
+            "next_cursor": next_cursor
         }), 200
 
     except Exception as e:
-        print(f"Error loading requests overview: {str(e)}")
+        print(f"Error loading requests: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
 
+# Accepting is one statement: lock the requests, derive student/alumni and the
+# mentorship type from roles and topic preferences, upsert the mentorship on
+# the unique (topic_id, student_id, alumni_id) key (migrations/0003) and mark
+# the requests accepted. Rows that fail a check come back with an error and
+# are left untouched.
+ACCEPT_REQUESTS_SQL = """
+    WITH req AS (
+        SELECT id, sender_id, receiver_id, topic_id, status
+        FROM mentorship_request
+        WHERE id = ANY(%(request_ids)s)
+          AND receiver_id = %(user_id)s
+        FOR UPDATE
+    ),
+    roles AS (
+        SELECT
+            req.*,
+            sp.id IS NOT NULL AND rp.id IS NOT NULL AS people_found,
+            CASE
+                WHEN sp.identity_role = 'student' AND rp.identity_role = 'alumni' THEN req.sender_id
+                WHEN sp.identity_role = 'alumni' AND rp.identity_role = 'student' THEN req.receiver_id
+            END AS student_id,
+            CASE
+                WHEN sp.identity_role = 'student' AND rp.identity_role = 'alumni' THEN req.receiver_id
+                WHEN sp.identity_role = 'alumni' AND rp.identity_role = 'student' THEN req.sender_id
+            END AS alumni_id
+        FROM req
+        LEFT JOIN person sp ON sp.id = req.sender_id
+        LEFT JOIN person rp ON rp.id = req.receiver_id
+    ),
+    checked AS (
+        SELECT
+            roles.id,
+            roles.topic_id,
+            roles.student_id,
+            roles.alumni_id,
+            mt.mentorship_type,
+            CASE
+                WHEN roles.status <> 'pending'
+                    THEN 'Only pending requests can be updated'
+                WHEN NOT roles.people_found
+                    THEN 'Sender or receiver not found'
+                WHEN roles.student_id IS NULL
+                    THEN 'Invalid request identities. One user must be student and the other must be alumni.'
+                WHEN st.person_id IS NULL
+                    THEN 'Student subtype record not found'
+                WHEN al.person_id IS NULL
+                    THEN 'Alumni subtype record not found'
+                WHEN student_pref.preference_role IS NULL OR alumni_pref.preference_role IS NULL
+                    THEN 'Missing preference records for this topic'
+                WHEN mt.mentorship_type IS NULL
+                    THEN 'Preference roles do not form a valid mentorship type'
+            END AS error
+        FROM roles
+        LEFT JOIN student st ON st.person_id = roles.student_id
+        LEFT JOIN alumni al ON al.person_id = roles.alumni_id
+        LEFT JOIN preference student_pref
+          ON student_pref.person_id = roles.student_id AND student_pref.topic_id = roles.topic_id
+        LEFT JOIN preference alumni_pref
+          ON alumni_pref.person_id = roles.alumni_id AND alumni_pref.topic_id = roles.topic_id
+        LEFT JOIN (
+            VALUES ('mentor', 'mentee', 'traditional'),
+                   ('mentee', 'mentor', 'reverse'),
+                   ('two_way', 'two_way', 'two_way')
+        ) AS mt (alumni_role, student_role, mentorship_type)
+          ON mt.alumni_role = alumni_pref.preference_role
+         AND mt.student_role = student_pref.preference_role
+    ),
+    created AS (
+        INSERT INTO mentorship (student_id, alumni_id, topic_id, mentorship_type, status, start_date)
+        SELECT DISTINCT ON (topic_id, student_id, alumni_id)
+               student_id, alumni_id, topic_id, mentorship_type, 'active', CURRENT_DATE
+        FROM checked
+        WHERE error IS NULL
+        -- An existing mentorship for the pair and topic is reused as is
+        ON CONFLICT (topic_id, student_id, alumni_id)
+        DO UPDATE SET topic_id = EXCLUDED.topic_id
+        RETURNING id, topic_id, student_id, alumni_id
+    ),
+    accepted AS (
+        UPDATE mentorship_request mr
+        SET status = 'accepted',
+            mentorship_id = created.id,
+            updated_at = CURRENT_TIMESTAMP
+        FROM checked
+        JOIN created USING (topic_id, student_id, alumni_id)
+        WHERE mr.id = checked.id
+          AND checked.error IS NULL
+        RETURNING mr.id
+    )
+    SELECT checked.id, checked.error, CASE WHEN checked.error IS NULL THEN created.id END
+    FROM checked
+    LEFT JOIN created USING (topic_id, student_id, alumni_id)
+"""
+
+
+REJECT_REQUESTS_SQL = """
+    WITH req AS (
+        SELECT id, status
+        FROM mentorship_request
+        WHERE id = ANY(%(request_ids)s)
+          AND receiver_id = %(user_id)s
+        FOR UPDATE
+    ),
+    rejected AS (
+        UPDATE mentorship_request mr
+        SET status = 'rejected',
+            updated_at = CURRENT_TIMESTAMP
+        FROM req
+        WHERE mr.id = req.id
+          AND req.status = 'pending'
+        RETURNING mr.id
+    )
+    SELECT id, CASE WHEN status <> 'pending' THEN 'Only pending requests can be updated' END
+    FROM req
+"""
+
+REQUEST_BULK_MAX = 200
+
+
+def accept_requests(cur, user_id, request_ids):
+    """Accept the user's received requests in one statement.
+
+    Returns {request_id: (error, mentorship_id)}; ids that aren't the user's
+    received requests are missing from the result.
+    """
+    cur.execute(ACCEPT_REQUESTS_SQL, {"request_ids": list(request_ids), "user_id": user_id})
+    return {row[0]: (row[1], row[2]) for row in cur.fetchall()}
+
+
+def reject_requests(cur, user_id, request_ids):
+    """Reject the user's received pending requests in one statement.
+
+    Returns {request_id: (error, None)} like accept_requests().
+    """
+    cur.execute(REJECT_REQUESTS_SQL, {"request_ids": list(request_ids), "user_id": user_id})
+    return {row[0]: (row[1], None) for row in cur.fetchall()}
+
 
 @app.post("/api/requests-management/request/<int:request_id>/status")
 @login_required
@@ -1679,180 +3930,107 @@ def api_requests_management_update_status(request_id):
     try:
         with get_conn() as conn:
             with conn.cursor() as cur:
-                # 1. Find request and ensure current user is the receiver
-                cur.execute(
-                    """
-                    SELECT id, sender_id, receiver_id, topic_id, status, mentorship_id
-                    FROM mentorship_request
-                    WHERE id = %s
-                      AND receiver_id = %s
-                    """,
-                    (request_id, user_id)
-                )
-                request_row = cur.fetchone()
-
-                if not request_row:
-                    return jsonify({"error": "Request not found"}), 404
-
-                req_id, sender_id, receiver_id, topic_id, current_status, existing_mentorship_id = request_row
-
-                if current_status != "pending":
-                    return jsonify({"error": "Only pending requests can be updated"}), 400
-
                 # ------------------------------------------------------------
-                # REJECT branch
+                # ACCEPT branch
                 # ------------------------------------------------------------
-                if new_status == "rejected":
-                    cur.execute(
-                        """
-                        UPDATE mentorship_request
-                        SET status = 'rejected',
-                            updated_at = CURRENT_TIMESTAMP
-                        WHERE id = %s
-                        """,
-                        (request_id,)
-                    )
+                if new_status == "accepted":
+                    result = accept_requests(cur, user_id, [request_id]).get(request_id)
+
+                    if not result:
+                        return jsonify({"error": "Request not found"}), 404
+
+                    error, mentorship_id = result
+                    if error:
+                        return jsonify({"error": error}), 400
 
                     conn.commit()
                     return jsonify({
                         "ok": True,
-                        "message": "Request rejected successfully."
+                        "message": "Request accepted and mentorship created successfully.",
+                        "mentorship_id": mentorship_id
                     }), 200
 
                 # ------------------------------------------------------------
-                # ACCEPT branch
+                # REJECT branch
                 # ------------------------------------------------------------
+                result = reject_requests(cur, user_id, [request_id]).get(request_id)
 
-                # 2. Get sender and receiver identity roles
-                cur.execute(
-                    """
-                    SELECT id, identity_role
-                    FROM person
-                    WHERE id IN (%s, %s)
-                    """,
-                    (sender_id, receiver_id)
-                )
-                people = cur.fetchall()
-
-                if len(people) != 2:
-                    return jsonify({"error": "Sender or receiver not found"}), 400
-
-                role_map = {row[0]: row[1] for row in people}
-                sender_identity = role_map.get(sender_id)
-                receiver_identity = role_map.get(receiver_id)
-
-                # 3. Determine student_id and alumni_id
-                if sender_identity == "student" and receiver_identity == "alumni":
-                    student_id = sender_id
-                    alumni_id = receiver_id
-                elif sender_identity == "alumni" and receiver_identity == "student":
-                    student_id = receiver_id
-                    alumni_id = sender_id
-                else:
-                    return jsonify({
-                        "error": "Invalid request identities. One user must be student and the other must be alumni."
-                    }), 400
+                if not result:
+                    return jsonify({"error": "Request not found"}), 404
 
-                # 4. Confirm subtype rows exist
-                cur.execute("SELECT person_id FROM student WHERE person_id = %s", (student_id,))
-                if not cur.fetchone():
-                    return jsonify({"error": "Student subtype record not found"}), 400
+                if result[0]:
+                    return jsonify({"error": result[0]}), 400
 
-                cur.execute("SELECT person_id FROM alumni WHERE person_id = %s", (alumni_id,))
-                if not cur.fetchone():
-                    return jsonify({"error": "Alumni subtype record not found"}), 400
+                conn.commit()
+                return jsonify({
+                    "ok": True,
+                    "message": "Request rejected successfully."
+                }), 200
 
-                # 5. Get preference roles for both users on this topic
-                cur.execute(
-                    """
-                    SELECT person_id, preference_role
-                    FROM preference
-                    WHERE topic_id = %s
-                      AND person_id IN (%s, %s)
-                    """,
-                    (topic_id, student_id, alumni_id)
-                )
-                pref_rows = cur.fetchall()
-
-                if len(pref_rows) != 2:
-                    return jsonify({"error": "Missing preference records for this topic"}), 400
-
-                pref_map = {row[0]: row[1] for row in pref_rows}
-                student_pref = pref_map.get(student_id)
-                alumni_pref = pref_map.get(alumni_id)
-
-                # 6. Derive mentorship_type
-                if alumni_pref == "mentor" and student_pref == "mentee":
-                    mentorship_type = "traditional"
-                elif alumni_pref == "mentee" and student_pref == "mentor":
-                    mentorship_type = "reverse"
-                elif alumni_pref == "two_way" and student_pref == "two_way":
-                    mentorship_type = "two_way"
-                else:
-                    return jsonify({
-                        "error": "Preference roles do not form a valid mentorship type"
-                    }), 400
+    except Exception as e:
+        print(f"Error updating request status: {str(e)}")
+        return jsonify({"error": str(e)}), 500
 
-                # 7. Avoid duplicate mentorship for same topic + student + alumni
-                cur.execute(
-                    """
-                    SELECT id
-                    FROM mentorship
-                    WHERE topic_id = %s
-                      AND student_id = %s
-                      AND alumni_id = %s
-                    """,
-                    (topic_id, student_id, alumni_id)
-                )
-                existing_mentorship = cur.fetchone()
 
-                if existing_mentorship:
-                    mentorship_id = existing_mentorship[0]
-                else:
-                    # 8. Insert mentorship
-                    cur.execute(
-                        """
-                        INSERT INTO mentorship (
-                            student_id,
-                            alumni_id,
-                            topic_id,
-                            mentorship_type,
-                            status,
-                            start_date
-                        )
-                        VALUES (%s, %s, %s, %s, 'active', CURRENT_DATE)
-                        RETURNING id
-                        """,
-                        (student_id, alumni_id, topic_id, mentorship_type)
-                    )
-                    mentorship_id = cur.fetchone()[0]
 
-                # 9. Update request
-                cur.execute(
-                    """
-                    UPDATE mentorship_request
-                    SET status = 'accepted',
-                        mentorship_id = %s,
-                        updated_at = CURRENT_TIMESTAMP
-                    WHERE id = %s
-                    """,
-                    (mentorship_id, request_id)
-                )
+@app.post("/api/requests-management/requests/status")
+@login_required
+def api_requests_management_bulk_status():
+    """Receiver accepts or rejects several pending requests in one transaction.
 
-            conn.commit()
+    Body: {"request_ids": [...], "status": "accepted" | "rejected"}. Each id
+    gets its own result; the valid ones are applied even if others fail.
+    """
+    user_id = session.get("user_id")
+    data = request.get_json() or {}
+    new_status = (data.get("status") or "").strip().lower()
+    request_ids = data.get("request_ids")
+
+    if new_status not in ("accepted", "rejected"):
+        return jsonify({"error": "Status must be 'accepted' or 'rejected'"}), 400
 
+    if not isinstance(request_ids, list) or not request_ids:
+        return jsonify({"error": "request_ids must be a non-empty list"}), 400
+
+    if not all(isinstance(x, int) and not isinstance(x, bool) for x in request_ids):
+        return jsonify({"error": "request_ids must be integers"}), 400
+    request_ids = list(dict.fromkeys(request_ids))
+
+    if len(request_ids) > REQUEST_BULK_MAX:
+        return jsonify({"error": f"At most {REQUEST_BULK_MAX} requests per call"}), 400
+
+    try:
+        with get_conn() as conn:
+            with conn.cursor() as cur:
+                if new_status == "accepted":
+                    outcomes = accept_requests(cur, user_id, request_ids)
+                else:
+                    outcomes = reject_requests(cur, user_id, request_ids)
+
+        results = []
+        for request_id in request_ids:
+            error, mentorship_id = outcomes.get(request_id, ("Request not found", None))
+            result = {"request_id": request_id, "ok": error is None}
+            if error:
+                result["error"] = error
+            elif mentorship_id is not None:
+                result["mentorship_id"] = mentorship_id
+            results.append(result)
+
+        updated = sum(1 for r in results if r["ok"])
         return jsonify({
             "ok": True,
-            "message": "Request accepted and mentorship created successfully.",
-            "mentorship_id": mentorship_id
+            "status": new_status,
+            "updated": updated,
+            "failed": len(results) - updated,
+            "results": results
         }), 200
 
     except Exception as e:
-        print(f"Error updating request status: {str(e)}")
+        print(f"Error updating request statuses: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
 
-
 @app.get("/mentorship-management")
 @login_required
 def mentorship_management_page():
@@ -1860,6 +4038,79 @@ def mentorship_management_page():
     return render_template("mentorship_management.html")
 
 
+# Shared with the async serving mode in asgi.py
+CURRENT_USER_SQL = """
+    SELECT id, username, first_name, last_name, identity_role
+    FROM person
+    WHERE id = %s
+"""
+
+ACTIVE_MENTORSHIPS_SQL = """
+    SELECT
+        m.id AS mentorship_id,
+        m.student_id,
+        m.alumni_id,
+        m.topic_id,
+        m.mentorship_type,
+        m.status,
+        m.start_date,
+        m.end_date,
+        t.name AS topic_name,
+        p.id AS other_person_id,
+        COALESCE(NULLIF(p.first_name, ''), p.username) AS other_first_name,
+        COALESCE(NULLIF(p.last_name, ''), '') AS other_last_name,
+        p.identity_role AS other_identity_role
+    FROM mentorship m
+    JOIN topic t
+      ON t.id = m.topic_id
+    JOIN person p
+      ON p.id = CASE
+          WHEN m.student_id = %s THEN m.alumni_id
+          ELSE m.student_id
+      END
+    WHERE (m.student_id = %s OR m.alumni_id = %s)
+      AND m.status = 'active'
+    ORDER BY m.start_date DESC, m.id DESC
+"""
+
+
+def active_mentorships_payload(me, rows):
+    """Build the active mentorships response from CURRENT_USER_SQL and
+    ACTIVE_MENTORSHIPS_SQL results: (payload, status)"""
+    if not me:
+        return {"error": "User not found"}, 404
+
+    mentorships = []
+    for row in rows:
+        mentorships.append({
+            "mentorship_id": row[0],
+            "student_id": row[1],
+            "alumni_id": row[2],
+            "topic_id": row[3],
+            "mentorship_type": row[4],
+            "status": row[5],
+            "start_date": str(row[6]) if row[6] else None,
+            "end_date": str(row[7]) if row[7] else None,
+            "topic_name": row[8],
+            "other_person_id": row[9],
+            "other_first_name": row[10],
+            "other_last_name": row[11],
+            "other_identity_role": row[12]
+        })
+
+    return {
+        "ok": True,
+        "current_user": {
+            "id": me[0],
+            "username": me[1],
+            "first_name": me[2],
+            "last_name": me[3],
+            "identity_role": me[4]
+        },
+        "mentorships": mentorships
+    }, 200
+
+
 @app.get("/api/mentorship-management/active")
 @login_required
 def api_mentorship_management_active():
@@ -1870,86 +4121,531 @@ def api_mentorship_management_active():
         with get_conn() as conn:
             with conn.cursor() as cur:
                 # current user info for header
-                cur.execute(
-                    """
-                    SELECT id, username, first_name, last_name, identity_role
-                    FROM person
-                    WHERE id = %s
-                    """,
-                    (user_id,)
-                )
+                cur.execute(CURRENT_USER_SQL, (user_id,))
                 me = cur.fetchone()
 
-                if not me:
-                    return jsonify({"error": "User not found"}), 404
+                rows = []
+                if me:
+                    # active mentorships where current user is student or alumni
+                    cur.execute(ACTIVE_MENTORSHIPS_SQL, (user_id, user_id, user_id))
+                    rows = cur.fetchall()
 
-                current_user = {
-                    "id": me[0],
-                    "username": me[1],
-                    "first_name": me[2],
-                    "last_name": me[3],
-                    "identity_role": me[4]
+        payload, status = active_mentorships_payload(me, rows)
+        return jsonify(payload), status
+
+    except Exception as e:
+        print(f"Error loading mentorships: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+# ============================================================
+# SCHEMA MIGRATIONS
+# ============================================================
+# flask --app app migrate [--status]
+#
+# migrations/NNNN_name.sql are applied in version order, each in its own
+# transaction, and recorded in schema_migrations with a checksum of the file.
+# 0000_baseline_schema.sql only uses IF NOT EXISTS, so running this against
+# a database created before migrations existed adopts it without changes.
+# An advisory lock keeps two deploys from migrating at the same time.
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+MIGRATIONS_LOCK_ID = 7_240_311
+
+MIGRATIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version VARCHAR(255) PRIMARY KEY,
+    checksum CHAR(40) NOT NULL,
+    applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+def list_migrations():
+    """[(version, path, checksum)] for migrations/*.sql in version order"""
+    migrations = []
+    for name in sorted(os.listdir(MIGRATIONS_DIR)):
+        if not re.fullmatch(r"\d{4}_\w+\.sql", name):
+            continue
+        path = os.path.join(MIGRATIONS_DIR, name)
+        with open(path, "rb") as f:
+            checksum = hashlib.sha1(f.read()).hexdigest()
+        migrations.append((name[:-4], path, checksum))
+    return migrations
+
+
+def applied_migrations(cur):
+    """{version: (checksum, applied_at)} from schema_migrations (empty if it doesn't exist)"""
+    cur.execute("SELECT to_regclass('schema_migrations')")
+    if cur.fetchone()[0] is None:
+        return {}
+    cur.execute("SELECT version, checksum, applied_at FROM schema_migrations")
+    return {row[0]: (row[1], row[2]) for row in cur.fetchall()}
+
+
+def pending_migrations(cur):
+    applied = applied_migrations(cur)
+    return [m for m in list_migrations() if m[0] not in applied]
+
+
+def apply_migrations(conn, echo=None):
+    """Apply every pending migration; returns the versions applied"""
+    applied = []
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_lock(%s)", (MIGRATIONS_LOCK_ID,))
+        try:
+            cur.execute(MIGRATIONS_TABLE)
+            conn.commit()
+            for version, path, checksum in pending_migrations(cur):
+                if echo:
+                    echo(f"applying {version}")
+                with open(path, encoding="utf-8") as f:
+                    sql = f.read()
+                try:
+                    cur.execute(sql)
+                    cur.execute(
+                        "INSERT INTO schema_migrations (version, checksum) VALUES (%s, %s)",
+                        (version, checksum)
+                    )
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                applied.append(version)
+        finally:
+            cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATIONS_LOCK_ID,))
+            conn.commit()
+    return applied
+
+
+@app.cli.command("migrate")
+@click.option("--status", is_flag=True, help="List migrations and whether they are applied; change nothing.")
+def migrate(status):
+    """Apply pending schema migrations from migrations/"""
+    with get_conn() as conn:
+        if status:
+            with conn.cursor() as cur:
+                applied = applied_migrations(cur)
+            conn.rollback()
+            for version, path, checksum in list_migrations():
+                if version not in applied:
+                    click.echo(f"  pending  {version}")
+                elif applied[version][0] != checksum:
+                    click.echo(f"  CHANGED  {version} (applied {applied[version][1]:%Y-%m-%d %H:%M}, file edited since)")
+                else:
+                    click.echo(f"  applied  {version} ({applied[version][1]:%Y-%m-%d %H:%M})")
+            return
+
+        try:
+            versions = apply_migrations(conn, echo=click.echo)
+        except psycopg2.Error as e:
+            raise click.ClickException(f"Migration failed, rolled back: {str(e).strip()}")
+
+    click.echo(f"Applied {len(versions)} migration(s)" if versions else "Schema is up to date")
+
+
+# ============================================================
+# BATCH JOB: MATCH RECOMMENDATIONS
+# ============================================================
+# flask --app app recommend-matches [--top-k 20] [--workers N] [--full]
+#
+# Precomputes each published person's top-K ranked candidates into
+# match_recommendation so /api/matching/search?sort=recommended can serve
+# them with one indexed read. Topics are split into partitions scored in a
+# process pool. match_recommendation_state keeps a fingerprint of every
+# person's preferences and profile features, so a normal run only recomputes
+# people whose fingerprint changed plus the people whose lists they appear in
+# (or now could appear in). The tables come from
+# migrations/0004_match_recommendation.sql.
+
+_job_people = {}
+_job_by_topic = {}
+_job_vectors = {}
+_job_top_k = 20
+
+
+def _recommend_init(people, by_topic, vectors, top_k):
+    """Pool initializer: receive the snapshot once per worker process"""
+    global _job_people, _job_by_topic, _job_vectors, _job_top_k
+    _job_people = people
+    _job_by_topic = by_topic
+    _job_vectors = vectors
+    _job_top_k = top_k
+
+
+def _recommend_partition(topic_ids, targets):
+    """Top-K (score, other_id, topic_id, my_role, other_role) per person for some topics"""
+    best = {}
+    for topic_id in topic_ids:
+        buckets = _job_by_topic.get(topic_id, {})
+        for (identity_role, my_role), members in buckets.items():
+            opposite_role = "alumni" if identity_role == "student" else "student"
+            other_role = MATCHING_ROLE.get(my_role)
+            others = buckets.get((opposite_role, other_role), ())
+            if not others:
+                continue
+            for person_id in members:
+                if targets is not None and person_id not in targets:
+                    continue
+                mine = _job_vectors.get(person_id)
+                scored = [
+                    (similarity(mine, _job_vectors.get(other_id)), other_id, topic_id, my_role, other_role)
+                    for other_id in others
+                    if other_id != person_id
+                ]
+                heap = best.setdefault(person_id, [])
+                heap.extend(scored)
+                if len(heap) > 4 * _job_top_k:
+                    best[person_id] = _top_k(heap, _job_top_k)
+    return {person_id: _top_k(heap, _job_top_k) for person_id, heap in best.items()}
+
+
+def _top_k(items, k):
+    """Highest score first; ties broken by lowest other_id, then topic_id"""
+    return heapq.nsmallest(k, items, key=lambda x: (-x[0], x[1], x[2]))
+
+
+def _fingerprint(prefs, vector):
+    raw = json.dumps(
+        [sorted(prefs.items()), sorted(vector[0]) if vector else []],
+        separators=(",", ":"),
+        default=str
+    )
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+@app.cli.command("recommend-matches")
+@click.option("--top-k", default=20, show_default=True, help="Candidates kept per person.")
+@click.option("--workers", default=os.cpu_count() or 1, show_default=True, help="Worker processes.")
+@click.option("--partitions", default=0, help="Topic partitions (default: 4 per worker).")
+@click.option("--full", is_flag=True, help="Recompute everyone, not just changed people.")
+def recommend_matches(top_k, workers, partitions, full):
+    """Precompute top-K match recommendations for every published person"""
+    started = time.perf_counter()
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            if pending_migrations(cur):
+                raise click.ClickException("Database schema is out of date; run: flask --app app migrate")
+
+            index = MatchIndex()
+            people, by_topic = index.load(cur)
+            vectors = ProfileVectors()._load(cur)
+
+            fingerprints = {
+                person_id: _fingerprint(prefs, vectors.get(person_id))
+                for person_id, (identity_role, prefs) in people.items()
+            }
+
+            targets = None
+            if not full:
+                cur.execute("SELECT person_id, fingerprint FROM match_recommendation_state")
+                previous = dict(cur.fetchall())
+                changed = {
+                    person_id for person_id in set(previous) | set(fingerprints)
+                    if previous.get(person_id) != fingerprints.get(person_id)
                 }
 
-                # active mentorships where current user is student or alumni
+                # Lists that show a changed person, or could show them now
+                targets = set(changed)
+                if changed:
+                    cur.execute(
+                        "SELECT DISTINCT person_id FROM match_recommendation WHERE other_id = ANY(%s)",
+                        (list(changed),)
+                    )
+                    targets.update(row[0] for row in cur.fetchall())
+                    for person_id in changed:
+                        if person_id in people:
+                            targets.update(m[0] for m in index.lookup(person_id))
+
+                if not targets:
+                    click.echo("No changes since the last run.")
+                    return
+
+    topics = sorted(by_topic)
+    partitions = partitions or max(1, workers * 4)
+    chunks = [topics[i::partitions] for i in range(partitions) if topics[i::partitions]]
+
+    results = {}
+    if workers > 1 and len(chunks) > 1:
+        with multiprocessing.Pool(
+            workers,
+            initializer=_recommend_init,
+            initargs=(people, by_topic, vectors, top_k)
+        ) as pool:
+            partials = pool.starmap(_recommend_partition, [(chunk, targets) for chunk in chunks])
+    else:
+        _recommend_init(people, by_topic, vectors, top_k)
+        partials = [_recommend_partition(chunk, targets) for chunk in chunks]
+
+    for partial in partials:
+        for person_id, items in partial.items():
+            results.setdefault(person_id, []).extend(items)
+
+    rows = []
+    for person_id, items in results.items():
+        for rank, (score, other_id, topic_id, my_role, other_role) in enumerate(_top_k(items, top_k), 1):
+            rows.append((person_id, other_id, topic_id, my_role, other_role, score, rank))
+
+    recomputed = list(targets) if targets is not None else list(people)
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            if targets is None:
+                cur.execute("DELETE FROM match_recommendation")
+                cur.execute("DELETE FROM match_recommendation_state")
+            else:
                 cur.execute(
-                    """
-                    SELECT
-                        m.id AS mentorship_id,
-                        m.student_id,
-                        m.alumni_id,
-                        m.topic_id,
-                        m.mentorship_type,
-                        m.status,
-                        m.start_date,
-                        m.end_date,
-                        t.name AS topic_name,
-                        p.id AS other_person_id,
-                        COALESCE(NULLIF(p.first_name, ''), p.username) AS other_first_name,
-                        COALESCE(NULLIF(p.last_name, ''), '') AS other_last_name,
-                        p.identity_role AS other_identity_role
-                    FROM mentorship m
-                    JOIN topic t
-                      ON t.id = m.topic_id
-                    JOIN person p
-                      ON p.id = CASE
-                          WHEN m.student_id = %s THEN m.alumni_id
-                          ELSE m.student_id
-                      END
-                    WHERE (m.student_id = %s OR m.alumni_id = %s)
-                      AND m.status = 'active'
-                    ORDER BY m.start_date DESC, m.id DESC
-                    """,
-                    (user_id, user_id, user_id)
+                    "DELETE FROM match_recommendation WHERE person_id = ANY(%s)",
+                    (recomputed,)
+                )
+                cur.execute(
+                    "DELETE FROM match_recommendation_state WHERE person_id = ANY(%s)",
+                    (recomputed,)
                 )
 
-                mentorships = []
-                for row in cur.fetchall():
-                    mentorships.append({
-                        "mentorship_id": row[0],
-                        "student_id": row[1],
-                        "alumni_id": row[2],
-                        "topic_id": row[3],
-                        "mentorship_type": row[4],
-                        "status": row[5],
-                        "start_date": str(row[6]) if row[6] else None,
-                        "end_date": str(row[7]) if row[7] else None,
-                        "topic_name": row[8],
-                        "other_person_id": row[9],
-                        "other_first_name": row[10],
-                        "other_last_name": row[11],
-                        "other_identity_role": row[12]
-                    })
+            psycopg2.extras.execute_values(
+                cur,
+                """
+                INSERT INTO match_recommendation
+                    (person_id, other_id, topic_id, my_role, other_role, score, rank)
+                VALUES %s
+                """,
+                rows,
+                page_size=1000
+            )
+            psycopg2.extras.execute_values(
+                cur,
+                "INSERT INTO match_recommendation_state (person_id, fingerprint) VALUES %s",
+                [(pid, fingerprints[pid]) for pid in recomputed if pid in fingerprints],
+                page_size=1000
+            )
+
+    click.echo(
+        f"Recomputed {len(recomputed)} people, wrote {len(rows)} recommendations "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
 
-        return jsonify({
-            "ok": True,
-            "current_user": current_user,
-            "mentorships": mentorships
-        }), 200
 
-    except Exception as e:
-        print(f"Error loading mentorships: {str(e)}")
-        return jsonify({"error": str(e)}), 500
+# ============================================================
+# BATCH JOB: STUDENT IMPORT
+# ============================================================
+# flask --app app import-students FILE.xlsx [--credentials-out FILE.csv]
+#
+# Streams a registrar spreadsheet (openpyxl read-only mode) and creates a
+# person + student row per valid line. Columns are matched by header name
+# (see IMPORT_COLUMNS). Passwords are hashed in a process pool and rows are
+# written with execute_values, one transaction per chunk. A failing row is
+# reported and skipped; it never aborts the run.
+
+IMPORT_COLUMNS = {
+    "username": ("username", "user", "login", "uni_id"),
+    "email": ("email", "e-mail", "mail"),
+    "first_name": ("first_name", "firstname", "eesnimi"),
+    "last_name": ("last_name", "lastname", "surname", "perenimi"),
+    "password": ("password",)
+}
+IMPORT_REQUIRED = ("username", "email")
+
+
+def _map_import_header(header):
+    """Map our column names to spreadsheet column positions"""
+    normalized = [str(h or "").strip().lower().replace(" ", "_") for h in header]
+    positions = {}
+    for column, aliases in IMPORT_COLUMNS.items():
+        for alias in aliases:
+            if alias in normalized:
+                positions[column] = normalized.index(alias)
+                break
+    return positions
+
+
+def _normalize_import_row(values, positions):
+    """Return (record, None) for a valid row or (None, reason)"""
+    def cell(column):
+        pos = positions.get(column)
+        if pos is None or pos >= len(values) or values[pos] is None:
+            return ""
+        return str(values[pos]).strip()
+
+    username = cell("username")
+    email = cell("email").lower()
+    if not username:
+        return None, "missing username"
+    if not email or "@" not in email:
+        return None, f"invalid email {email!r}"
+
+    return {
+        "username": username,
+        "email": email,
+        "first_name": cell("first_name"),
+        "last_name": cell("last_name"),
+        "password": cell("password") or None
+    }, None
+
+
+def _hash_import_password(args):
+    password, method = args
+    return generate_password_hash(password, method=method or PASSWORD_HASH_METHOD)
+
+
+def _insert_student_chunk(cur, records, hashes):
+    """Insert person + student rows; returns {username: person_id} of rows inserted"""
+    inserted = psycopg2.extras.execute_values(
+        cur,
+        """
+        INSERT INTO person (username, email, password_hash, identity_role, first_name, last_name)
+        VALUES %s
+        ON CONFLICT DO NOTHING
+        RETURNING id, username
+        """,
+        [
+            (r["username"], r["email"], h, "student", r["first_name"], r["last_name"])
+            for r, h in zip(records, hashes)
+        ],
+        page_size=len(records),
+        fetch=True
+    )
+    if inserted:
+        psycopg2.extras.execute_values(
+            cur,
+            "INSERT INTO student (person_id) VALUES %s",
+            [(person_id,) for person_id, username in inserted],
+            page_size=len(inserted)
+        )
+    return {username: person_id for person_id, username in inserted}
+
+
+@app.cli.command("import-students")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--sheet", default=None, help="Worksheet name (default: first sheet).")
+@click.option("--chunk-size", default=1000, show_default=True, help="Rows per transaction.")
+@click.option("--workers", default=os.cpu_count() or 1, show_default=True, help="Password hashing processes.")
+@click.option("--hash-method", default=None,
+              help="werkzeug hash method, e.g. pbkdf2:sha256:100000 (default: PASSWORD_HASH_METHOD).")
+@click.option("--credentials-out", type=click.Path(dir_okay=False),
+              help="CSV for generated initial passwords (required without a password column).")
+@click.option("--errors-out", type=click.Path(dir_okay=False), help="CSV of rejected rows.")
+def import_students(path, sheet, chunk_size, workers, hash_method, credentials_out, errors_out):
+    """Bulk-create student accounts from a registrar XLSX export"""
+    import csv
+    import secrets
+
+    try:
+        import openpyxl
+    except ImportError:
+        raise click.ClickException("openpyxl is required: pip install openpyxl")
+
+    started = time.perf_counter()
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    worksheet = workbook[sheet] if sheet else workbook.worksheets[0]
+    # Registrar exports often carry a stale <dimension>; read every row
+    worksheet.reset_dimensions()
+    rows = worksheet.iter_rows(values_only=True)
+
+    header = next(rows, None) or ()
+    positions = _map_import_header(header)
+    missing = [c for c in IMPORT_REQUIRED if c not in positions]
+    if missing:
+        raise click.ClickException(
+            f"Missing column(s) {', '.join(missing)}; found: {', '.join(str(h) for h in header)}"
+        )
+    if "password" not in positions and not credentials_out:
+        raise click.ClickException("No password column: pass --credentials-out for generated passwords")
+
+    errors = []
+    credentials = []
+    seen = set()
+    totals = {"read": 0, "imported": 0}
+
+    def flush(chunk, pool):
+        """Hash and insert one chunk, isolating bad rows if the batch fails"""
+        if not chunk:
+            return
+        line_numbers, records = zip(*chunk)
+        for record in records:
+            if record["password"] is None:
+                record["password"] = secrets.token_urlsafe(12)
+                record["generated"] = True
+        jobs = [(r["password"], hash_method) for r in records]
+        hashes = pool.map(_hash_import_password, jobs, chunksize=64) if pool else list(map(_hash_import_password, jobs))
+
+        failed = set()
+        try:
+            with get_conn() as conn:
+                with conn.cursor() as cur:
+                    created = _insert_student_chunk(cur, records, hashes)
+        except psycopg2.Error:
+            # Retry row by row so one bad record only costs itself
+            created = {}
+            with get_conn() as conn:
+                with conn.cursor() as cur:
+                    for line, record, password_hash in zip(line_numbers, records, hashes):
+                        cur.execute("SAVEPOINT import_row")
+                        try:
+                            created.update(_insert_student_chunk(cur, [record], [password_hash]))
+                            cur.execute("RELEASE SAVEPOINT import_row")
+                        except psycopg2.Error as e:
+                            cur.execute("ROLLBACK TO SAVEPOINT import_row")
+                            failed.add(line)
+                            errors.append((line, record["username"], str(e).strip()))
+
+        for line, record in zip(line_numbers, records):
+            if record["username"] in created:
+                totals["imported"] += 1
+                if record.get("generated"):
+                    credentials.append((record["username"], record["email"], record["password"]))
+            elif line not in failed:
+                errors.append((line, record["username"], "username or email already exists"))
+
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+    try:
+        chunk = []
+        for line, values in enumerate(rows, start=2):
+            if not values or all(v is None for v in values):
+                continue
+            totals["read"] += 1
+            record, reason = _normalize_import_row(values, positions)
+            if record is None:
+                errors.append((line, "", reason))
+                continue
+            key_username, key_email = record["username"].lower(), record["email"]
+            if key_username in seen or key_email in seen:
+                errors.append((line, record["username"], "duplicate in file"))
+                continue
+            seen.update((key_username, key_email))
+
+            chunk.append((line, record))
+            if len(chunk) >= chunk_size:
+                flush(chunk, pool)
+                chunk = []
+                click.echo(f"... {totals['imported']} imported, {len(errors)} rejected", err=True)
+        flush(chunk, pool)
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+        workbook.close()
+
+    if credentials_out and credentials:
+        with open(credentials_out, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(("username", "email", "initial_password"))
+            writer.writerows(credentials)
+
+    if errors_out:
+        with open(errors_out, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(("line", "username", "error"))
+            writer.writerows(sorted(errors))
+    else:
+        for line, username, reason in sorted(errors):
+            click.echo(f"line {line}: {username} {reason}".replace("  ", " "), err=True)
+
+    click.echo(
+        f"Read {totals['read']} rows, imported {totals['imported']}, rejected {len(errors)} "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+
 
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
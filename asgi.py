@@ -0,0 +1,425 @@
+"""Optional async serving mode.
+
+    uvicorn asgi:application --workers 2
+
+The read-heavy JSON endpoints in ASYNC_ROUTES are answered by coroutines:
+the requests overview and active mentorships query Postgres through a
+psycopg 3 AsyncConnectionPool, and the reference data routes are served
+from app.py's in-memory cache. /api/matching/search picks its page from
+the in-process MatchIndex and ProfileVectors on the default executor and
+loads the page's details on the async pool; ?sort=recommended and
+?stream=1 searches stay on Flask. Every other request is passed to the
+Flask app through asgiref's WsgiToAsgi. URLs, the session cookie and the
+JSON bodies are the same as under a WSGI server, so the templates work
+unchanged, and the async routes are counted in /metrics and the slow-request
+profiler the same way.
+
+Needs: pip install "psycopg[binary,pool]" asgiref uvicorn
+"""
+import asyncio
+import contextlib
+import contextvars
+import os
+import re
+import threading
+import time
+from http.cookies import CookieError, SimpleCookie
+from urllib.parse import parse_qs
+
+from itsdangerous import BadSignature
+from werkzeug.exceptions import HTTPException
+
+try:
+    from asgiref.wsgi import WsgiToAsgi
+    from psycopg import AsyncCursor
+    from psycopg_pool import AsyncConnectionPool
+except ImportError as e:
+    raise ImportError(
+        'The async serving mode needs: pip install "psycopg[binary,pool]" asgiref uvicorn'
+    ) from e
+
+import app as web
+
+
+# ============================================================
+# ASYNC DATABASE POOL
+# ============================================================
+
+_pool = None
+_pool_lock = asyncio.Lock()
+
+
+class InstrumentedAsyncCursor(AsyncCursor):
+    """Counts and times statements for the current request, like app.InstrumentedCursor"""
+
+    async def execute(self, query, params=None, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await super().execute(query, params, **kwargs)
+        finally:
+            web.record_request_metric("queries", 1)
+            web.record_request_metric("db", time.perf_counter() - started)
+
+
+async def get_async_pool():
+    """Get this worker's async pool, sized like the sync one (DB_POOL_MIN/MAX/TIMEOUT)"""
+    global _pool
+    async with _pool_lock:
+        if _pool is None:
+            pool = AsyncConnectionPool(
+                os.getenv("DATABASE_URL"),
+                min_size=web.DB_POOL_MIN,
+                max_size=web.DB_POOL_MAX,
+                timeout=web.DB_POOL_TIMEOUT,
+                kwargs={"cursor_factory": InstrumentedAsyncCursor},
+                open=False
+            )
+            await pool.open()
+            _pool = pool
+    return _pool
+
+
+async def close_async_pool():
+    global _pool
+    async with _pool_lock:
+        if _pool is not None:
+            await _pool.close()
+            _pool = None
+
+
+@contextlib.asynccontextmanager
+async def async_conn():
+    """Borrow a connection from the async pool, recording the wait like app.get_conn"""
+    pool = await get_async_pool()
+    started = time.perf_counter()
+    async with pool.connection() as conn:
+        web.record_request_metric("acquire", time.perf_counter() - started)
+        yield conn
+
+
+# ============================================================
+# REQUEST HELPERS
+# ============================================================
+
+class Request:
+    """The parts of an ASGI http scope the async routes need"""
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        self.args = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        self.session = self._load_session()
+
+    def _load_session(self):
+        """Decode Flask's signed session cookie the same way the Flask app does"""
+        try:
+            cookies = SimpleCookie(self.headers.get("cookie", ""))
+        except CookieError:
+            return {}
+        morsel = cookies.get(web.app.config["SESSION_COOKIE_NAME"])
+        serializer = web.app.session_interface.get_signing_serializer(web.app)
+        if morsel is None or serializer is None:
+            return {}
+        max_age = int(web.app.permanent_session_lifetime.total_seconds())
+        try:
+            return serializer.loads(morsel.value, max_age=max_age)
+        except BadSignature:
+            return {}
+
+    def page_size(self, default, maximum):
+        """Same as app.get_page_size(): ?limit= clamped to 1..maximum"""
+        try:
+            limit = int(self.args.get("limit", [""])[0]) or default
+        except ValueError:
+            limit = default
+        return max(1, min(limit, maximum))
+
+
+class LazyCursor:
+    """A sync cursor that only borrows a pooled connection when first used.
+
+    For executor work against app.py's in-memory indexes, which only touch
+    the database when they (re)load.
+    """
+
+    def __init__(self):
+        self._resources = contextlib.ExitStack()
+        self._cur = None
+
+    def __getattr__(self, name):
+        if self._cur is None:
+            conn = self._resources.enter_context(web.get_conn())
+            self._cur = self._resources.enter_context(conn.cursor())
+        return getattr(self._cur, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return self._resources.__exit__(*exc_info)
+
+
+# Returned by an async route to hand the request to the Flask app instead
+FLASK = object()
+
+
+async def run_sync(func, *args):
+    """Run func on the default executor, keeping the request's metric counters"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, contextvars.copy_context().run, func, *args)
+
+
+async def send_response(send, status, body, headers=()):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-length", str(len(body)).encode("ascii")), *headers]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def send_json(send, payload, status=200):
+    # Same serialization as jsonify() outside debug mode
+    body = web.app.json.dumps(payload, separators=(",", ":")).encode("utf-8") + b"\n"
+    await send_response(send, status, body, [(b"content-type", b"application/json")])
+
+
+def login_required(handler):
+    """Redirect to the login page like app.login_required"""
+    async def wrapper(req, send, **kwargs):
+        if "user_id" not in req.session:
+            return await send_response(send, 302, b"", [(b"location", b"/login")])
+        return await handler(req, send, **kwargs)
+    return wrapper
+
+
+# ============================================================
+# ASYNC ROUTES
+# ============================================================
+
+@login_required
+async def requests_overview(req, send):
+    user_id = req.session["user_id"]
+    bucket_limit = req.page_size(web.REQUEST_BUCKET_LIMIT, web.REQUEST_BUCKET_LIMIT_MAX)
+
+    async with async_conn() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                web.REQUESTS_OVERVIEW_SQL,
+                (user_id, user_id, user_id, user_id, bucket_limit)
+            )
+            rows = await cur.fetchall()
+
+    payload, status = web.requests_overview_payload(rows, bucket_limit)
+    await send_json(send, payload, status)
+
+
+@login_required
+async def active_mentorships(req, send):
+    user_id = req.session["user_id"]
+
+    async with async_conn() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(web.CURRENT_USER_SQL, (user_id,))
+            me = await cur.fetchone()
+
+            rows = []
+            if me:
+                await cur.execute(web.ACTIVE_MENTORSHIPS_SQL, (user_id, user_id, user_id))
+                rows = await cur.fetchall()
+
+    payload, status = web.active_mentorships_payload(me, rows)
+    await send_json(send, payload, status)
+
+
+def _plan_search(user_id, args, page_size):
+    """Runs on the default executor: identity and index work for a search"""
+    me = web.get_identity(user_id)
+    if not me:
+        return {"error": "User not found"}, 404, None
+    if not me["preferences_published"]:
+        return {
+            "results": [],
+            "message": "Please publish your preferences first to see matches."
+        }, 200, None
+
+    with LazyCursor() as cur:
+        payload, plan = web.plan_matching_search(cur, user_id, page_size=page_size, **args)
+    return payload, 200, plan
+
+
+@login_required
+async def matching_search(req, send):
+    """Same as app.api_matching_search for the default and ?sort=score orders"""
+    sort = req.args.get("sort", [None])[0]
+    if sort == "recommended":
+        return FLASK
+
+    user_id = req.session["user_id"]
+    try:
+        topic_id = int(req.args["topic_id"][0]) if "topic_id" in req.args else None
+    except ValueError:
+        topic_id = None
+    ranked = sort == "score"
+    args = {
+        "topic_id": topic_id,
+        "role_filter": req.args.get("role", [None])[0],
+        "location_code": req.args.get("location", [None])[0],
+        "ranked": ranked,
+        "after": None
+    }
+    page_size = req.page_size(web.MATCH_PAGE_SIZE, web.MATCH_PAGE_SIZE_MAX)
+
+    if "cursor" in req.args:
+        try:
+            args["after"] = web.decode_cursor(
+                req.args["cursor"][0],
+                ((int, float), int, int) if ranked else (str, str, str, int, int)
+            )
+        except ValueError as e:
+            return await send_json(send, {"error": str(e)}, 400)
+
+    payload, status, plan = await run_sync(_plan_search, user_id, args, page_size)
+    if plan is None:
+        return await send_json(send, payload, status)
+
+    async with async_conn() as conn:
+        async with conn.cursor() as cur:
+            if plan["count_params"]:
+                await cur.execute(web.MATCH_LOCATION_COUNT_SQL, plan["count_params"])
+                plan["total_estimate"] = (await cur.fetchone())[0]
+
+            await cur.execute(plan["sql"], plan["params"])
+            rows = await cur.fetchall()
+
+    await send_json(send, web.matching_search_payload(plan, rows))
+
+
+def reference_route(key, loader):
+    """Serve a reference data key like app.reference_response (ETag, 304).
+
+    Hits come straight from memory; a miss loads on the default executor.
+    """
+    async def handler(req, send, **kwargs):
+        cache_key = key.format(**kwargs)
+        load = (lambda cur: loader(cur, **kwargs)) if kwargs else loader
+        payload, body, etag = await run_sync(web.get_reference_data, cache_key, load)
+
+        headers = [
+            (b"etag", f'"{etag}"'.encode("ascii")),
+            (b"cache-control", b"public, max-age=300, must-revalidate")
+        ]
+        wanted = {
+            tag.strip().removeprefix("W/").strip('"')
+            for tag in req.headers.get("if-none-match", "").split(",")
+        }
+        if etag in wanted or "*" in wanted:
+            return await send_response(send, 304, b"", headers)
+        await send_response(send, 200, body, [(b"content-type", b"application/json"), *headers])
+    return handler
+
+
+ASYNC_ROUTES = [
+    (re.compile(r"/api/requests-management/overview"), requests_overview),
+    (re.compile(r"/api/mentorship-management/active"), active_mentorships),
+    (re.compile(r"/api/matching/search"), matching_search),
+    (re.compile(r"/api/countries"), reference_route("countries", web._load_countries)),
+    (re.compile(r"/api/study-levels"), reference_route("study_levels", web._load_study_levels)),
+    (re.compile(r"/api/topics"), reference_route("topics", web._load_topics)),
+    (re.compile(r"/api/programmes"), reference_route("programmes", web._load_programmes)),
+    (re.compile(r"/api/programmes/catalogue"),
+     reference_route("programme_catalogue", web._load_programme_catalogue)),
+    (re.compile(r"/api/programmes/(?P<study_level_id>\d+)"),
+     reference_route("programmes:{study_level_id}", web._load_programmes)),
+]
+
+
+# ============================================================
+# ASGI APPLICATION
+# ============================================================
+
+flask_application = WsgiToAsgi(web.app)
+
+
+def _match(path):
+    for pattern, handler in ASYNC_ROUTES:
+        found = pattern.fullmatch(path)
+        if found:
+            return handler, {k: int(v) for k, v in found.groupdict().items()}
+    return None, None
+
+
+def _route_rule(path):
+    """The Flask rule for path, which app.py's metrics use as the route label"""
+    try:
+        return web.app.url_map.bind("").match(path, method="GET", return_rule=True)[0].rule
+    except HTTPException:
+        return "unmatched"
+
+
+async def _serve_async(handler, kwargs, scope, send):
+    """Run an async route under app.py's request metrics and slow-request profiler.
+
+    Returns False when the route handed the request back to Flask, which
+    records it itself.
+    """
+    response = {"status": None, "size": 0}
+
+    async def recording_send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            response["size"] += len(message.get("body", b""))
+        await send(message)
+
+    counters = web.new_request_metrics()
+    token = web.async_request_metrics.set(counters)
+    profile_key = object()
+    if web.slow_profiler:
+        web.slow_profiler.start(threading.get_ident(), profile_key)
+    started = time.perf_counter()
+    handled = True
+    try:
+        handled = await handler(Request(scope), recording_send, **kwargs) is not FLASK
+    except Exception as e:
+        # Once the response has started, the server can only drop the connection
+        if response["status"] is not None:
+            raise
+        await send_json(recording_send, {"error": str(e)}, 500)
+    finally:
+        if handled:
+            web.finish_request_metrics(
+                scope["method"], _route_rule(scope["path"]), response["status"] or 500, started, counters,
+                response["size"], profile_key
+            )
+        elif web.slow_profiler:
+            web.slow_profiler.stop(profile_key)
+        web.async_request_metrics.reset(token)
+    return handled
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await get_async_pool()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await close_async_pool()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    """ASGI entry point: async routes first, everything else through Flask"""
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+
+    # ?stream=1 responses are streamed by the Flask app
+    streamed = "1" in parse_qs(scope.get("query_string", b"").decode("latin-1")).get("stream", [])
+    if scope["type"] == "http" and scope["method"] == "GET" and not streamed:
+        handler, kwargs = _match(scope["path"])
+        if handler is not None and await _serve_async(handler, kwargs, scope, send):
+            return
+
+    await flask_application(scope, receive, send)
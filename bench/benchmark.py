@@ -0,0 +1,556 @@
+"""Benchmark the hot endpoints against a throwaway local Postgres.
+
+    python bench/benchmark.py --scales 1000,10000,100000 --users 16 --requests 50
+
+For each scale a fresh database is created by the app's migration runner
+(migrations/*.sql) plus populateCountriesANDUniversityTables.txt, then seeded
+with synthetic people, preferences, education, careers and requests. Then
+--users concurrent logged-in Flask test clients drive each endpoint
+in-process. Per endpoint it reports p50/p95/p99 latency, throughput and SQL
+statements per request (not counting the pool's SELECT 1 health check), and
+appends one JSON line per (scale, endpoint) to bench_output.txt so runs can
+be compared over time.
+
+The server is started with initdb/pg_ctl from PATH (or --pg-bin). As root,
+or without the binaries, the pgserver package is used if it is installed.
+--dsn points at an existing server instead; it only creates and drops
+bench_* databases there.
+"""
+import io
+import json
+import math
+import multiprocessing
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
+import click
+import psycopg2
+import psycopg2.extensions
+from werkzeug.security import generate_password_hash
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUTPUT = os.path.join(ROOT, "bench_output.txt")
+
+TOPICS = [
+    "Software Engineering", "Data Science", "Machine Learning", "Cyber Security",
+    "Entrepreneurship", "Career Planning", "Public Speaking", "Academic Writing",
+    "Research Methods", "Product Management", "UX Design", "Finance", "Marketing",
+    "International Relations", "Law", "Medicine", "Biotechnology", "Chemistry",
+    "Physics", "Mathematics", "Linguistics", "Philosophy", "History", "Education",
+    "Psychology", "Economics", "Sustainability", "Energy", "Robotics", "Cloud Computing",
+    "Networking", "Job Interviews", "Work Abroad", "PhD Applications", "Leadership",
+    "Project Management", "Startups", "Open Source", "Game Development", "Design Thinking"
+]
+FIRST_NAMES = ["Mari", "Jaan", "Liis", "Karl", "Anna", "Marten", "Kadri", "Andres", "Laura", "Oliver",
+               "Sofia", "Rasmus", "Eliise", "Markus", "Hanna", "Kristjan", "Emma", "Robin", "Maria", "Sander"]
+LAST_NAMES = ["Tamm", "Saar", "Sepp", "Magi", "Kask", "Kukk", "Rebane", "Ilves", "Parn", "Koppel",
+              "Lepik", "Ots", "Kallas", "Vaher", "Luik", "Kaasik", "Oja", "Raud", "Kuusk", "Mets"]
+COMPANIES = ["Bolt", "Wise", "Skype", "Pipedrive", "Veriff", "Swedbank", "Ericsson", "Nortal", "Playtech", "Elisa"]
+
+
+# ============================================================
+# THROWAWAY POSTGRES
+# ============================================================
+
+class LocalPostgres:
+    """A temporary Postgres server: initdb/pg_ctl if usable, else pgserver"""
+
+    def __init__(self, pg_bin=None):
+        self.pg_bin = pg_bin
+        self.tmpdir = None
+        self.server = None
+        self.dsn = None
+
+    def _binary(self, name):
+        if self.pg_bin:
+            return os.path.join(self.pg_bin, name)
+        return shutil.which(name)
+
+    def start(self):
+        self.tmpdir = tempfile.mkdtemp(prefix="bench-pg-")
+        initdb = self._binary("initdb")
+
+        if initdb and os.path.exists(initdb) and os.geteuid() != 0:
+            data = os.path.join(self.tmpdir, "data")
+            subprocess.run(
+                [initdb, "-D", data, "-U", "postgres", "-A", "trust", "-E", "UTF8", "--no-sync"],
+                check=True, stdout=subprocess.DEVNULL
+            )
+            with socket.socket() as s:
+                s.bind(("127.0.0.1", 0))
+                port = s.getsockname()[1]
+            options = (
+                f"-p {port} -k {self.tmpdir} -c listen_addresses='' "
+                "-c fsync=off -c synchronous_commit=off -c full_page_writes=off"
+            )
+            subprocess.run(
+                [self._binary("pg_ctl"), "-D", data, "-l", os.path.join(self.tmpdir, "log"),
+                 "-o", options, "-w", "start"],
+                check=True, stdout=subprocess.DEVNULL
+            )
+            self.dsn = f"host={self.tmpdir} port={port} user=postgres dbname=postgres"
+            return self.dsn
+
+        try:
+            import pgserver
+        except ImportError:
+            raise click.ClickException(
+                "No usable initdb (not found, or running as root) and pgserver is not installed; "
+                "pass --pg-bin, pip install pgserver, or use --dsn"
+            )
+        self.server = pgserver.get_server(self.tmpdir, cleanup_mode="delete")
+        self.dsn = self.server.get_uri()
+        return self.dsn
+
+    def stop(self):
+        if self.server is not None:
+            self.server.cleanup()
+        elif self.tmpdir and os.path.exists(os.path.join(self.tmpdir, "data")):
+            subprocess.run(
+                [self._binary("pg_ctl"), "-D", os.path.join(self.tmpdir, "data"), "-m", "immediate", "stop"],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+        if self.tmpdir:
+            shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+
+def create_database(admin_dsn, name):
+    """(Re)create a database and return its DSN"""
+    conn = psycopg2.connect(admin_dsn)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(f"DROP DATABASE IF EXISTS {name}")
+        cur.execute(f"CREATE DATABASE {name}")
+    conn.close()
+    return psycopg2.extensions.make_dsn(admin_dsn, dbname=name)
+
+
+def drop_database(admin_dsn, name):
+    conn = psycopg2.connect(admin_dsn)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(f"DROP DATABASE IF EXISTS {name}")
+    conn.close()
+
+
+def create_schema(conn):
+    """Migrate an empty database to the current schema and load the reference data"""
+    sys.path.insert(0, ROOT)
+    import app as web
+
+    web.apply_migrations(conn)
+    with conn.cursor() as cur:
+        with open(os.path.join(ROOT, "populateCountriesANDUniversityTables.txt"), encoding="utf-8") as f:
+            cur.execute(f.read())
+
+
+# ============================================================
+# SYNTHETIC DATA
+# ============================================================
+
+def _copy(cur, table, columns, rows):
+    """COPY rows (tuples; None -> NULL) into table"""
+    buf = io.StringIO()
+    for row in rows:
+        buf.write("\t".join("\\N" if v is None else str(v) for v in row))
+        buf.write("\n")
+    buf.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buf)
+
+
+def _reset_sequence(cur, table):
+    cur.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 1)) FROM {table}")
+
+
+def _random_date(rng, start_year, end_year):
+    start = date(start_year, 1, 1)
+    return start + timedelta(days=rng.randrange((date(end_year, 12, 31) - start).days))
+
+
+def seed(cur, scale, rng):
+    """Seed `scale` people with Zipf-distributed topic interest and matching requests"""
+    cur.execute("SELECT code FROM country ORDER BY code")
+    countries = [row[0] for row in cur.fetchall()]
+    cur.execute("SELECT id FROM study_level ORDER BY id")
+    study_levels = [row[0] for row in cur.fetchall()]
+    cur.execute("SELECT id FROM faculty ORDER BY id")
+    faculties = [row[0] for row in cur.fetchall()]
+
+    _copy(cur, "topic", ("id", "name"), enumerate(TOPICS, start=1))
+    topic_ids = list(range(1, len(TOPICS) + 1))
+    topic_weights = [1 / rank ** 1.1 for rank in topic_ids]
+
+    institutes = [(i, f"Institute of {TOPICS[i % len(TOPICS)]} {i}", rng.choice(faculties)) for i in range(1, 25)]
+    _copy(cur, "institute", ("id", "name", "faculty_id"), institutes)
+    programmes = []
+    for i in range(1, 151):
+        institute = rng.choice(institutes) if rng.random() < 0.8 else None
+        faculty_id = institute[2] if institute else rng.choice(faculties)
+        programmes.append((i, f"{TOPICS[i % len(TOPICS)]} {i}", rng.choice(study_levels),
+                           faculty_id, institute[0] if institute else None))
+    _copy(cur, "programme", ("id", "name", "study_level_id", "faculty_id", "institute_id"), programmes)
+
+    password_hash = generate_password_hash("bench", method="pbkdf2:sha256:1000")
+    people = []
+    for pid in range(1, scale + 1):
+        role = "alumni" if rng.random() < 0.35 else "student"
+        country = "EE" if rng.random() < 0.6 else rng.choice(countries)
+        people.append((
+            pid, f"user{pid}", f"user{pid}@bench.test", password_hash, role,
+            rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), None, None, country,
+            rng.random() < 0.85, rng.random() < 0.8
+        ))
+    _copy(cur, "person", ("id", "username", "email", "password_hash", "identity_role", "first_name",
+                          "last_name", "phone_number", "address", "home_country",
+                          "profile_published", "preferences_published"), people)
+    _copy(cur, "student", ("person_id",), ((p[0],) for p in people if p[4] == "student"))
+    _copy(cur, "alumni", ("person_id",), ((p[0],) for p in people if p[4] == "alumni"))
+
+    # Students mostly want mentors, alumni mostly offer mentoring
+    role_mix = {
+        "student": (("mentee", 0.8), ("two_way", 0.15), ("mentor", 0.05)),
+        "alumni": (("mentor", 0.8), ("two_way", 0.15), ("mentee", 0.05))
+    }
+    preferences = []
+    by_topic_role = {}
+    for p in people:
+        count = min(8, 1 + int(rng.expovariate(1 / 2.0)))
+        topics = set(rng.choices(topic_ids, weights=topic_weights, k=count))
+        roles, weights = zip(*role_mix[p[4]])
+        for topic_id in topics:
+            pref_role = rng.choices(roles, weights=weights)[0]
+            preferences.append((p[0], topic_id, pref_role))
+            if p[11]:
+                by_topic_role.setdefault((topic_id, p[4], pref_role), []).append(p[0])
+    _copy(cur, "preference", ("person_id", "topic_id", "preference_role"), preferences)
+
+    education = []
+    careers = []
+    for p in people:
+        for _ in range(2 if rng.random() < 0.3 else 1):
+            programme = rng.choice(programmes)
+            start = _random_date(rng, 2005, 2024)
+            education.append((len(education) + 1, p[0], programme[0], programme[2],
+                              start, start + timedelta(days=365 * rng.randint(2, 5))))
+        if p[4] == "alumni":
+            for _ in range(rng.randint(0, 3)):
+                start = _random_date(rng, 2010, 2025)
+                careers.append((len(careers) + 1, p[0], "Engineer", rng.choice(COMPANIES),
+                                rng.choice(countries), start, None, "Synthetic career entry"))
+    _copy(cur, "education", ("id", "person_id", "programme_id", "study_level_id", "start_date", "end_date"),
+          education)
+    _copy(cur, "career", ("id", "person_id", "job_title", "company_name", "country_code", "start_date",
+                          "end_date", "job_description"), careers)
+
+    # Requests only between compatible published pairs, ~2 per student
+    compatible = {"mentee": ("mentor", "traditional"), "mentor": ("mentee", "reverse"),
+                  "two_way": ("two_way", "two_way")}
+    requests_rows = []
+    mentorships = {}
+    seen = set()
+    now = datetime.now()
+    for student_id, topic_id, student_role in preferences:
+        if people[student_id - 1][4] != "student" or not people[student_id - 1][11]:
+            continue
+        alumni_role, mentorship_type = compatible[student_role]
+        candidates = by_topic_role.get((topic_id, "alumni", alumni_role))
+        if not candidates or rng.random() > 0.6:
+            continue
+        alumni_id = rng.choice(candidates)
+        from_student = rng.random() < 0.75
+        sender, receiver = (student_id, alumni_id) if from_student else (alumni_id, student_id)
+        # One request per pair + topic, whichever side sent it
+        if (student_id, alumni_id, topic_id) in seen:
+            continue
+        seen.add((student_id, alumni_id, topic_id))
+
+        status = rng.choices(("pending", "accepted", "rejected"), weights=(0.6, 0.25, 0.15))[0]
+        created = now - timedelta(minutes=rng.randrange(180 * 24 * 60))
+        updated = created if status == "pending" else created + timedelta(minutes=rng.randrange(7 * 24 * 60))
+        mentorship_id = None
+        if status == "accepted":
+            key = (topic_id, student_id, alumni_id)
+            if key not in mentorships:
+                mentorships[key] = (len(mentorships) + 1, student_id, alumni_id, topic_id,
+                                    mentorship_type, "active", updated.date(), None)
+            mentorship_id = mentorships[key][0]
+        requests_rows.append((len(requests_rows) + 1, sender, receiver, topic_id, status,
+                              mentorship_id, created, updated))
+
+    _copy(cur, "mentorship", ("id", "student_id", "alumni_id", "topic_id", "mentorship_type", "status",
+                              "start_date", "end_date"), mentorships.values())
+    _copy(cur, "mentorship_request", ("id", "sender_id", "receiver_id", "topic_id", "status",
+                                      "mentorship_id", "created_at", "updated_at"), requests_rows)
+
+    for table in ("topic", "institute", "programme", "person", "education", "career",
+                  "mentorship", "mentorship_request"):
+        _reset_sequence(cur, table)
+
+    return {"persons": scale, "preferences": len(preferences), "requests": len(requests_rows),
+            "mentorships": len(mentorships)}
+
+
+# ============================================================
+# QUERY COUNTING
+# ============================================================
+
+_counter = threading.local()
+
+
+def _counting_connection(web):
+    """web.InstrumentedConnection whose cursors also count statements per thread"""
+
+    def count():
+        _counter.queries = getattr(_counter, "queries", 0) + 1
+
+    class CountingCursor(web.InstrumentedCursor):
+        def execute(self, query, vars=None):
+            count()
+            return super().execute(query, vars)
+
+        def executemany(self, query, vars_list):
+            count()
+            return super().executemany(query, vars_list)
+
+    class CountingConnection(web.InstrumentedConnection):
+        def cursor(self, *args, **kwargs):
+            kwargs.setdefault("cursor_factory", CountingCursor)
+            return super().cursor(*args, **kwargs)
+
+    return CountingConnection
+
+
+def _queries():
+    return getattr(_counter, "queries", 0)
+
+
+# ============================================================
+# LOAD GENERATION
+# ============================================================
+
+def _percentile(values, pct):
+    return values[max(0, min(len(values) - 1, math.ceil(pct / 100 * len(values)) - 1))]
+
+
+def _login(client, user_id, role):
+    with client.session_transaction() as sess:
+        sess["user_id"] = user_id
+        sess["identity_role"] = role
+
+
+def drive(flask_app, name, jobs_per_user, call):
+    """Run call(client, job) for each user's jobs on its own thread; return stats"""
+    results = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(len(jobs_per_user) + 1)
+
+    def worker(jobs):
+        client = flask_app.test_client()
+        timings = []
+        barrier.wait()
+        for job in jobs:
+            before = _queries()
+            started = time.perf_counter()
+            status = call(client, job)
+            timings.append((time.perf_counter() - started, _queries() - before, status))
+        with lock:
+            results.extend(timings)
+
+    threads = [threading.Thread(target=worker, args=(jobs,)) for jobs in jobs_per_user]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    if not results:
+        return None
+    latencies = sorted(r[0] * 1000 for r in results)
+    return {
+        "endpoint": name,
+        "requests": len(results),
+        "errors": sum(1 for r in results if r[2] >= 400),
+        "p50_ms": round(_percentile(latencies, 50), 3),
+        "p95_ms": round(_percentile(latencies, 95), 3),
+        "p99_ms": round(_percentile(latencies, 99), 3),
+        "mean_ms": round(sum(latencies) / len(latencies), 3),
+        "max_ms": round(latencies[-1], 3),
+        "throughput_rps": round(len(results) / wall, 2) if wall else None,
+        "queries_per_request": round(sum(r[1] for r in results) / len(results), 2)
+    }
+
+
+def run_scale(admin_dsn, scale, users, requests, seed_value, queue):
+    """Create, seed and benchmark one scale (runs in its own process)"""
+    rng = random.Random(seed_value)
+    db_name = f"bench_{scale}"
+    dsn = create_database(admin_dsn, db_name)
+
+    try:
+        started = time.perf_counter()
+        conn = psycopg2.connect(dsn)
+        create_schema(conn)
+        with conn.cursor() as cur:
+            counts = seed(cur, scale, rng)
+        conn.commit()
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute("VACUUM ANALYZE")
+        seed_seconds = round(time.perf_counter() - started, 2)
+
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT p.id, p.identity_role FROM person p
+                WHERE p.preferences_published AND EXISTS (SELECT 1 FROM preference WHERE person_id = p.id)
+                ORDER BY random() LIMIT 500
+                """
+            )
+            searchers = cur.fetchall()
+            cur.execute(
+                """
+                SELECT p.id, p.identity_role FROM person p
+                WHERE EXISTS (SELECT 1 FROM mentorship_request WHERE receiver_id = p.id OR sender_id = p.id)
+                ORDER BY random() LIMIT 500
+                """
+            )
+            requesters = cur.fetchall()
+            cur.execute(
+                """
+                SELECT mr.id, mr.receiver_id, p.identity_role
+                FROM mentorship_request mr JOIN person p ON p.id = mr.receiver_id
+                WHERE mr.status = 'pending'
+                ORDER BY random() LIMIT %s
+                """,
+                (users * requests,)
+            )
+            pending = cur.fetchall()
+        conn.close()
+
+        os.environ["DATABASE_URL"] = dsn
+        os.environ["DB_CHANGE_LISTEN"] = "0"
+        import app as web
+
+        web._pool = web.ConnectionPool(dsn, 1, users + 2, 30, connection_factory=_counting_connection(web))
+        web._pool_pid = os.getpid()
+
+        def get(url):
+            def call(client, who):
+                _login(client, *who)
+                return client.get(url).status_code
+            return call
+
+        def accept(client, job):
+            request_id, receiver_id, role = job
+            _login(client, receiver_id, role)
+            return client.post(
+                f"/api/requests-management/request/{request_id}/status", json={"status": "accepted"}
+            ).status_code
+
+        def sample(pool):
+            return [[rng.choice(pool) for _ in range(requests)] for _ in range(users)]
+
+        scenarios = [
+            ("matching_search", get("/api/matching/search?limit=50"), searchers),
+            ("matching_search_ranked", get("/api/matching/search?sort=score&limit=50"), searchers),
+            ("requests_overview", get("/api/requests-management/overview"), requesters),
+        ]
+        stats = []
+        for name, call, pool in scenarios:
+            if not pool:
+                continue
+            drive(web.app, name, [[rng.choice(pool) for _ in range(2)] for _ in range(users)], call)
+            result = drive(web.app, name, sample(pool), call)
+            if result:
+                stats.append(result)
+
+        # Each accept consumes a pending request, so every user gets its own slice
+        if pending:
+            result = drive(web.app, "accept_request", [pending[i::users] for i in range(users)], accept)
+            if result:
+                stats.append(result)
+
+        queue.put({"scale": scale, "seed_seconds": seed_seconds, "rows": counts, "stats": stats})
+    except Exception as e:
+        queue.put({"scale": scale, "error": repr(e)})
+    finally:
+        try:
+            drop_database(admin_dsn, db_name)
+        except Exception:
+            pass
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+@click.command()
+@click.option("--scales", default="1000,10000,100000", show_default=True, help="Comma-separated person counts.")
+@click.option("--users", default=16, show_default=True, help="Concurrent simulated users.")
+@click.option("--requests", default=50, show_default=True, help="Requests per user per endpoint.")
+@click.option("--seed", "seed_value", default=42, show_default=True, help="Random seed for the data set.")
+@click.option("--dsn", default=None, help="Use this server instead of starting one.")
+@click.option("--pg-bin", default=None, help="Directory with initdb and pg_ctl.")
+@click.option("--output", default=OUTPUT, show_default=True, help="JSON lines results file (appended).")
+def main(scales, users, requests, seed_value, dsn, pg_bin, output):
+    """Seed synthetic data at each scale and benchmark the hot endpoints"""
+    server = None if dsn else LocalPostgres(pg_bin)
+    admin_dsn = dsn or server.start()
+    run = {
+        "run_id": uuid.uuid4().hex[:12],
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "users": users
+    }
+
+    ctx = multiprocessing.get_context("spawn")
+    try:
+        for scale in (int(s) for s in scales.split(",") if s.strip()):
+            click.echo(f"scale {scale}: seeding and running...")
+            queue = ctx.Queue()
+            proc = ctx.Process(target=run_scale, args=(admin_dsn, scale, users, requests, seed_value, queue))
+            proc.start()
+            result = queue.get()
+            proc.join()
+
+            if "error" in result:
+                click.echo(f"scale {scale}: failed: {result['error']}", err=True)
+                continue
+
+            click.echo(f"  seeded {result['rows']} in {result['seed_seconds']}s")
+            click.echo(f"  {'endpoint':<24}{'p50':>9}{'p95':>9}{'p99':>9}{'rps':>9}{'queries':>9}{'errors':>8}")
+            with open(output, "a") as f:
+                for stat in result["stats"]:
+                    click.echo(
+                        f"  {stat['endpoint']:<24}{stat['p50_ms']:>9}{stat['p95_ms']:>9}{stat['p99_ms']:>9}"
+                        f"{stat['throughput_rps']:>9}{stat['queries_per_request']:>9}{stat['errors']:>8}"
+                    )
+                    f.write(json.dumps({
+                        **run,
+                        "scale": scale,
+                        "seed_seconds": result["seed_seconds"],
+                        **stat
+                    }) + "\n")
+    finally:
+        if server is not None:
+            server.stop()
+    click.echo(f"results appended to {output}")
+
+
+if __name__ == "__main__":
+    main()
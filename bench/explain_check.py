@@ -0,0 +1,179 @@
+"""Fail if a hot route's SQL falls back to a sequential scan.
+
+    python bench/explain_check.py --scale 20000
+
+Builds a throwaway database the same way as benchmark.py (migrations, then
+synthetic data), calls each hot route once to warm the in-process caches,
+then calls it again while recording every statement it executes. Each
+recorded statement is run through EXPLAIN (FORMAT JSON), and any Seq Scan
+on one of the tables in LARGE_TABLES is reported. The exit status is 1 if
+anything was reported, so this can gate a migration or query change in CI.
+
+--dsn / --pg-bin work as in benchmark.py.
+"""
+import os
+import random
+import sys
+
+import click
+import psycopg2
+
+from benchmark import LocalPostgres, _login, create_database, create_schema, drop_database, seed
+
+# Tables that grow with the number of users; reference tables (country,
+# topic, programme, ...) are small enough that a seq scan is the right plan
+LARGE_TABLES = {
+    "person", "student", "alumni", "preference", "education", "career",
+    "mentorship", "mentorship_request", "match_recommendation"
+}
+
+
+def _seq_scans(plan):
+    """Yield the relation names of Seq Scan nodes in an EXPLAIN JSON plan"""
+    if plan.get("Node Type") == "Seq Scan":
+        yield plan.get("Relation Name")
+    for child in plan.get("Plans", ()):
+        yield from _seq_scans(child)
+
+
+def _pick_users(cur):
+    """(user_id, identity_role, request_id) of a published user with a pending received request"""
+    cur.execute(
+        """
+        SELECT mr.receiver_id, p.identity_role, mr.id
+        FROM mentorship_request mr
+        JOIN person p ON p.id = mr.receiver_id
+        WHERE mr.status = 'pending'
+          AND p.preferences_published = TRUE
+          AND p.profile_published = TRUE
+        ORDER BY mr.receiver_id
+        LIMIT 1
+        """
+    )
+    return cur.fetchone()
+
+
+@click.command()
+@click.option("--scale", default=20000, show_default=True, help="Synthetic people to seed.")
+@click.option("--seed", "seed_value", default=42, show_default=True, help="Random seed for the data set.")
+@click.option("--dsn", default=None, help="Use this server instead of starting one.")
+@click.option("--pg-bin", default=None, help="Directory with initdb and pg_ctl.")
+def main(scale, seed_value, dsn, pg_bin):
+    """EXPLAIN every statement of the hot routes and fail on sequential scans"""
+    server = None if dsn else LocalPostgres(pg_bin)
+    admin_dsn = dsn or server.start()
+    db_name = "bench_explain"
+    db_dsn = create_database(admin_dsn, db_name)
+
+    try:
+        conn = psycopg2.connect(db_dsn)
+        create_schema(conn)
+        with conn.cursor() as cur:
+            seed(cur, scale, random.Random(seed_value))
+        conn.commit()
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute("VACUUM ANALYZE")
+            user_id, role, pending_id = _pick_users(cur)
+
+        os.environ["DATABASE_URL"] = db_dsn
+        os.environ["DB_CHANGE_LISTEN"] = "0"
+        import app as web
+
+        recorded = []
+
+        class RecordingCursor(web.InstrumentedCursor):
+            def execute(self, query, vars=None):
+                try:
+                    return super().execute(query, vars)
+                finally:
+                    if recorded is not None and self.query:
+                        recorded.append(self.query.decode("utf-8"))
+
+        class RecordingConnection(web.InstrumentedConnection):
+            def cursor(self, *args, **kwargs):
+                kwargs.setdefault("cursor_factory", RecordingCursor)
+                return super().cursor(*args, **kwargs)
+
+        web._pool = web.ConnectionPool(db_dsn, 1, 2, 30, connection_factory=RecordingConnection)
+        web._pool_pid = os.getpid()
+
+        client = web.app.test_client()
+        _login(client, user_id, role)
+
+        reads = [
+            "/api/matching/search?limit=50",
+            "/api/matching/search?sort=score&limit=50",
+            "/api/matching/search?limit=50&location=EE",
+            "/api/matching/filter-options",
+            "/api/requests-management/overview",
+            "/api/requests-management/requests?direction=received&status=pending",
+            "/api/requests-management/requests?direction=sent&status=accepted",
+            "/api/mentorship-management/active",
+            "/api/profile/bootstrap",
+            "/published-profile",
+        ]
+        for url in reads:
+            client.get(url)
+
+        statements = {}
+        routes = []
+
+        def capture(name, call):
+            routes.append(name)
+            recorded.clear()
+            response = call()
+            if response.status_code >= 400:
+                click.echo(f"  {name}: HTTP {response.status_code}", err=True)
+            for query in recorded:
+                statements.setdefault(query, name)
+            return response
+
+        for url in reads:
+            capture(f"GET {url}", lambda: client.get(url))
+
+        results = capture("GET /api/matching/search", lambda: client.get("/api/matching/search?limit=50"))
+        candidate = next(
+            (r for r in results.get_json().get("results", []) if not r.get("request_status")), None
+        )
+        if candidate:
+            capture(f"GET /api/matching/public-profile/{candidate['person_id']}",
+                    lambda: client.get(f"/api/matching/public-profile/{candidate['person_id']}"))
+            capture("POST /api/matching/request", lambda: client.post(
+                "/api/matching/request",
+                json={"receiver_id": candidate["person_id"], "topic_id": candidate["topic_id"]}
+            ))
+        capture(f"POST /api/requests-management/request/{pending_id}/status", lambda: client.post(
+            f"/api/requests-management/request/{pending_id}/status", json={"status": "accepted"}
+        ))
+        recorded = None
+        web._pool._pool.closeall()
+
+        failures = []
+        with conn.cursor() as cur:
+            for query, route in statements.items():
+                if not query.lstrip().upper().startswith(("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")):
+                    continue
+                cur.execute("EXPLAIN (FORMAT JSON) " + query)
+                plan = cur.fetchone()[0][0]["Plan"]
+                scanned = sorted({t for t in _seq_scans(plan) if t in LARGE_TABLES})
+                if scanned:
+                    failures.append((route, scanned, " ".join(query.split())[:160]))
+        conn.close()
+
+        click.echo(f"checked {len(statements)} statements from {len(routes)} route calls at scale {scale}")
+        for route, tables, query in failures:
+            click.echo(f"  SEQ SCAN on {', '.join(tables)}  [{route}]\n    {query}", err=True)
+        if failures:
+            sys.exit(1)
+        click.echo("  no sequential scans on large tables")
+    finally:
+        try:
+            drop_database(admin_dsn, db_name)
+        finally:
+            if server is not None:
+                server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+-- ============================================================
+-- BASELINE SCHEMA
+-- ============================================================
+-- The tables app.py reads and writes. IF NOT EXISTS throughout so an
+-- existing database can be brought under `flask --app app migrate`:
+-- tables that are already there are left as they are.
+
+CREATE TABLE IF NOT EXISTS country (
+    code VARCHAR(2) PRIMARY KEY,
+    name VARCHAR(100) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS study_level (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(50) NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS faculty (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(150) NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS institute (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(150) NOT NULL,
+    faculty_id INT REFERENCES faculty(id)
+);
+
+CREATE TABLE IF NOT EXISTS programme (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(200) NOT NULL,
+    study_level_id INT NOT NULL REFERENCES study_level(id),
+    faculty_id INT NOT NULL REFERENCES faculty(id),
+    institute_id INT REFERENCES institute(id)
+);
+
+CREATE TABLE IF NOT EXISTS topic (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(100) NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS person (
+    id SERIAL PRIMARY KEY,
+    username VARCHAR(50) NOT NULL UNIQUE,
+    email VARCHAR(100) NOT NULL UNIQUE,
+    password_hash TEXT NOT NULL,
+    identity_role VARCHAR(10) NOT NULL CHECK (identity_role IN ('student', 'alumni')),
+    first_name VARCHAR(50) NOT NULL DEFAULT '',
+    last_name VARCHAR(50) NOT NULL DEFAULT '',
+    phone_number VARCHAR(30),
+    address VARCHAR(255),
+    home_country VARCHAR(2) REFERENCES country(code),
+    profile_published BOOLEAN NOT NULL DEFAULT FALSE,
+    preferences_published BOOLEAN NOT NULL DEFAULT FALSE
+);
+
+CREATE TABLE IF NOT EXISTS student (
+    person_id INT PRIMARY KEY REFERENCES person(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS alumni (
+    person_id INT PRIMARY KEY REFERENCES person(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS education (
+    id SERIAL PRIMARY KEY,
+    person_id INT NOT NULL REFERENCES person(id) ON DELETE CASCADE,
+    programme_id INT NOT NULL REFERENCES programme(id),
+    study_level_id INT NOT NULL REFERENCES study_level(id),
+    start_date DATE,
+    end_date DATE
+);
+
+CREATE TABLE IF NOT EXISTS career (
+    id SERIAL PRIMARY KEY,
+    person_id INT NOT NULL REFERENCES person(id) ON DELETE CASCADE,
+    job_title VARCHAR(100) NOT NULL,
+    company_name VARCHAR(100) NOT NULL,
+    country_code VARCHAR(2) REFERENCES country(code),
+    start_date DATE,
+    end_date DATE,
+    job_description TEXT
+);
+
+CREATE TABLE IF NOT EXISTS preference (
+    person_id INT NOT NULL REFERENCES person(id) ON DELETE CASCADE,
+    topic_id INT NOT NULL REFERENCES topic(id),
+    preference_role VARCHAR(10) NOT NULL CHECK (preference_role IN ('mentor', 'mentee', 'two_way')),
+    PRIMARY KEY (person_id, topic_id)
+);
+
+CREATE TABLE IF NOT EXISTS mentorship (
+    id SERIAL PRIMARY KEY,
+    student_id INT NOT NULL REFERENCES student(person_id),
+    alumni_id INT NOT NULL REFERENCES alumni(person_id),
+    topic_id INT NOT NULL REFERENCES topic(id),
+    mentorship_type VARCHAR(20) NOT NULL CHECK (mentorship_type IN ('traditional', 'reverse', 'two_way')),
+    status VARCHAR(20) NOT NULL DEFAULT 'active',
+    start_date DATE,
+    end_date DATE
+);
+
+CREATE TABLE IF NOT EXISTS mentorship_request (
+    id SERIAL PRIMARY KEY,
+    sender_id INT NOT NULL REFERENCES person(id),
+    receiver_id INT NOT NULL REFERENCES person(id),
+    topic_id INT NOT NULL REFERENCES topic(id),
+    status VARCHAR(20) NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'accepted', 'rejected')),
+    mentorship_id INT REFERENCES mentorship(id),
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
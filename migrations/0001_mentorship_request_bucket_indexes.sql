@@ -0,0 +1,12 @@
+-- ============================================================
+-- MENTORSHIP REQUEST BUCKET INDEXES
+-- ============================================================
+-- Serve /api/requests-management/overview and
+-- /api/requests-management/requests: one direction, one status,
+-- newest first by (updated_at, id).
+
+CREATE INDEX IF NOT EXISTS mentorship_request_receiver_status_updated_idx
+    ON mentorship_request (receiver_id, status, updated_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS mentorship_request_sender_status_updated_idx
+    ON mentorship_request (sender_id, status, updated_at DESC, id DESC);
@@ -0,0 +1,11 @@
+-- ============================================================
+-- PERSON LOGIN IDENTIFIER INDEXES
+-- ============================================================
+-- Serve /api/auth/login: the identifier is matched against both
+-- lower(username) and lower(email). Replaced by unique indexes in 0007.
+
+CREATE INDEX IF NOT EXISTS person_username_lower_idx
+    ON person (lower(username));
+
+CREATE INDEX IF NOT EXISTS person_email_lower_idx
+    ON person (lower(email));
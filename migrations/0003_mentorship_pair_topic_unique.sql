@@ -0,0 +1,9 @@
+-- ============================================================
+-- MENTORSHIP PAIR + TOPIC UNIQUE KEY
+-- ============================================================
+-- Accepting a request upserts the mentorship with
+-- ON CONFLICT (topic_id, student_id, alumni_id), which needs this key.
+-- Merge any existing duplicates before running it.
+
+CREATE UNIQUE INDEX IF NOT EXISTS mentorship_topic_student_alumni_key
+    ON mentorship (topic_id, student_id, alumni_id);
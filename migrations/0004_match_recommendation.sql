@@ -0,0 +1,29 @@
+-- ============================================================
+-- MATCH RECOMMENDATIONS
+-- ============================================================
+-- Written by `flask --app app recommend-matches`, read by
+-- /api/matching/search?sort=recommended.
+
+CREATE TABLE IF NOT EXISTS match_recommendation (
+    person_id INT NOT NULL REFERENCES person(id) ON DELETE CASCADE,
+    other_id INT NOT NULL REFERENCES person(id) ON DELETE CASCADE,
+    topic_id INT NOT NULL REFERENCES topic(id) ON DELETE CASCADE,
+    my_role VARCHAR(20) NOT NULL,
+    other_role VARCHAR(20) NOT NULL,
+    score NUMERIC(6, 4) NOT NULL,
+    rank INT NOT NULL,
+    computed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (person_id, other_id, topic_id)
+);
+
+CREATE INDEX IF NOT EXISTS match_recommendation_person_score_idx
+    ON match_recommendation (person_id, score DESC, other_id, topic_id);
+
+CREATE INDEX IF NOT EXISTS match_recommendation_other_idx
+    ON match_recommendation (other_id);
+
+CREATE TABLE IF NOT EXISTS match_recommendation_state (
+    person_id INT PRIMARY KEY REFERENCES person(id) ON DELETE CASCADE,
+    fingerprint CHAR(40) NOT NULL,
+    computed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,38 @@
+-- ============================================================
+-- HOT QUERY INDEXES
+-- ============================================================
+-- Chosen for the statements behind the hot routes; bench/explain_check.py
+-- fails if one of them falls back to a sequential scan.
+
+-- MatchIndex / candidate search: everyone with a role on a topic
+CREATE INDEX IF NOT EXISTS preference_topic_role_person_idx
+    ON preference (topic_id, preference_role, person_id);
+
+-- Matching only ever looks at people who published their preferences:
+-- the MatchIndex and ProfileVectors loads, and the location filter
+CREATE INDEX IF NOT EXISTS person_preferences_published_idx
+    ON person (id) INCLUDE (identity_role, home_country)
+    WHERE preferences_published = TRUE;
+
+CREATE INDEX IF NOT EXISTS person_preferences_published_country_idx
+    ON person (home_country, id)
+    WHERE preferences_published = TRUE;
+
+-- Request status for a pair + topic in either direction (search results
+-- and the duplicate check in /api/matching/request)
+CREATE INDEX IF NOT EXISTS mentorship_request_pair_topic_idx
+    ON mentorship_request (LEAST(sender_id, receiver_id), GREATEST(sender_id, receiver_id), topic_id);
+
+-- Active mentorships for a student / an alumnus
+CREATE INDEX IF NOT EXISTS mentorship_student_status_idx
+    ON mentorship (student_id, status);
+
+CREATE INDEX IF NOT EXISTS mentorship_alumni_status_idx
+    ON mentorship (alumni_id, status);
+
+-- Profile pages and published profile loads
+CREATE INDEX IF NOT EXISTS education_person_idx
+    ON education (person_id);
+
+CREATE INDEX IF NOT EXISTS career_person_idx
+    ON career (person_id);
@@ -0,0 +1,18 @@
+-- ============================================================
+-- MENTORSHIP REQUEST PAIR KEY
+-- ============================================================
+-- A request is unique per pair of people and topic, whichever of the two
+-- sent it. pair_low/pair_high are the pair in normalized order, kept up to
+-- date by Postgres (generated columns), so /api/matching/request can rely
+-- on ON CONFLICT and the matching search can probe the status with a plain
+-- index lookup. Merge any existing duplicates before running it.
+
+ALTER TABLE mentorship_request
+    ADD COLUMN IF NOT EXISTS pair_low INT GENERATED ALWAYS AS (LEAST(sender_id, receiver_id)) STORED,
+    ADD COLUMN IF NOT EXISTS pair_high INT GENERATED ALWAYS AS (GREATEST(sender_id, receiver_id)) STORED;
+
+CREATE UNIQUE INDEX IF NOT EXISTS mentorship_request_pair_topic_key
+    ON mentorship_request (pair_low, pair_high, topic_id);
+
+-- Superseded by the key above
+DROP INDEX IF EXISTS mentorship_request_pair_topic_idx;
@@ -0,0 +1,18 @@
+-- ============================================================
+-- CASE-INSENSITIVE PERSON IDENTIFIERS
+-- ============================================================
+-- /api/auth/login matches the identifier against lower(username) and
+-- lower(email), so two usernames or two emails differing only by case
+-- would make a login ambiguous. These unique indexes replace the plain
+-- ones from 0002. Merge any existing case-insensitive duplicates before
+-- running it.
+
+CREATE UNIQUE INDEX IF NOT EXISTS person_username_lower_key
+    ON person (lower(username));
+
+CREATE UNIQUE INDEX IF NOT EXISTS person_email_lower_key
+    ON person (lower(email));
+
+-- Superseded by the keys above
+DROP INDEX IF EXISTS person_username_lower_idx;
+DROP INDEX IF EXISTS person_email_lower_idx;
@@ -0,0 +1,10 @@
+-- ============================================================
+-- LOWER-CASE PERSON EMAILS
+-- ============================================================
+-- /api/auth/register and the people import both store emails lower-cased.
+-- This brings accounts registered before that into line. The unique
+-- lower(email) index from 0007 rules out collisions.
+
+UPDATE person
+SET email = lower(email)
+WHERE email <> lower(email);
@@ -0,0 +1,224 @@
+"""Fixtures for tests against a throwaway Postgres.
+
+A temporary server is started with initdb/pg_ctl from PATH, or with the
+pgserver package when running as root or without the binaries; set
+TEST_DATABASE_DSN to an admin DSN to use an existing server instead. The
+database is migrated once per session and emptied between tests.
+"""
+import itertools
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import psycopg2
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import app as web  # noqa: E402
+
+TEST_DB = "mentor_pytest"
+TOPICS = [(1, "Python"), (2, "Careers"), (3, "Research"), (4, "Data")]
+
+
+def _start_postgres(tmpdir):
+    """Start a temporary server in tmpdir; returns (admin_dsn, stop)"""
+    initdb = shutil.which("initdb")
+    if initdb and os.geteuid() != 0:
+        data = os.path.join(tmpdir, "data")
+        pg_ctl = os.path.join(os.path.dirname(initdb), "pg_ctl")
+        subprocess.run(
+            [initdb, "-D", data, "-U", "postgres", "-A", "trust", "-E", "UTF8", "--no-sync"],
+            check=True, stdout=subprocess.DEVNULL
+        )
+        subprocess.run(
+            [pg_ctl, "-D", data, "-l", os.path.join(tmpdir, "log"),
+             "-o", f"-k {tmpdir} -c listen_addresses='' -c fsync=off", "-w", "start"],
+            check=True, stdout=subprocess.DEVNULL
+        )
+        return f"host={tmpdir} user=postgres dbname=postgres", lambda: subprocess.run(
+            [pg_ctl, "-D", data, "-m", "immediate", "stop"], stdout=subprocess.DEVNULL
+        )
+
+    pgserver = pytest.importorskip(
+        "pgserver", reason="needs initdb on PATH (not as root), pgserver or TEST_DATABASE_DSN"
+    )
+    server = pgserver.get_server(tmpdir, cleanup_mode="delete")
+    return server.get_uri(), server.cleanup
+
+
+def _admin(admin_dsn, statement):
+    conn = psycopg2.connect(admin_dsn)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(statement)
+    conn.close()
+
+
+def _create_schema(conn):
+    """Migrate the empty database and load the reference data and TOPICS"""
+    web.apply_migrations(conn)
+    with conn.cursor() as cur:
+        with open(os.path.join(ROOT, "populateCountriesANDUniversityTables.txt"), encoding="utf-8") as f:
+            cur.execute(f.read())
+        cur.executemany("INSERT INTO topic (id, name) VALUES (%s, %s)", TOPICS)
+    conn.commit()
+
+
+@pytest.fixture(scope="session")
+def db_dsn():
+    admin_dsn = os.getenv("TEST_DATABASE_DSN")
+    tmpdir, stop = None, None
+    if not admin_dsn:
+        tmpdir = tempfile.mkdtemp(prefix="tests-pg-")
+        admin_dsn, stop = _start_postgres(tmpdir)
+
+    _admin(admin_dsn, f"DROP DATABASE IF EXISTS {TEST_DB}")
+    _admin(admin_dsn, f"CREATE DATABASE {TEST_DB}")
+    dsn = psycopg2.extensions.make_dsn(admin_dsn, dbname=TEST_DB)
+    conn = psycopg2.connect(dsn)
+    _create_schema(conn)
+    conn.close()
+
+    os.environ["DATABASE_URL"] = dsn
+    os.environ["DB_CHANGE_LISTEN"] = "0"
+    try:
+        yield dsn
+    finally:
+        if web._pool is not None:
+            web._pool._pool.closeall()
+            web._pool = None
+        try:
+            _admin(admin_dsn, f"DROP DATABASE IF EXISTS {TEST_DB}")
+        finally:
+            if stop is not None:
+                stop()
+            if tmpdir is not None:
+                shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+@pytest.fixture
+def db(db_dsn):
+    """An autocommit connection to the emptied test database"""
+    conn = psycopg2.connect(db_dsn)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(
+            "TRUNCATE person, student, alumni, preference, mentorship, mentorship_request "
+            "RESTART IDENTITY CASCADE"
+        )
+    web._invalidate_person_caches()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def fetch(db):
+    """fetch(sql, *params) -> all rows (None for a statement without results)"""
+    def run(sql, *params):
+        with db.cursor() as cur:
+            cur.execute(sql, params)
+            return cur.fetchall() if cur.description else None
+    return run
+
+
+@pytest.fixture
+def make_person(db):
+    """make_person(role, prefs={topic_id: preference_role}) -> person id, published"""
+    names = itertools.count(1)
+
+    def make(role, prefs=None, published=True):
+        n = next(names)
+        with db.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO person (username, email, password_hash, identity_role, preferences_published)
+                VALUES (%s, %s, 'x', %s, %s)
+                RETURNING id
+                """,
+                (f"user{n}", f"user{n}@example.test", role, published)
+            )
+            person_id = cur.fetchone()[0]
+            cur.execute(f"INSERT INTO {role} (person_id) VALUES (%s)", (person_id,))
+            for topic_id, preference_role in (prefs or {}).items():
+                cur.execute(
+                    "INSERT INTO preference (person_id, topic_id, preference_role) VALUES (%s, %s, %s)",
+                    (person_id, topic_id, preference_role)
+                )
+        return person_id
+    return make
+
+
+@pytest.fixture
+def make_request(db):
+    """make_request(sender_id, receiver_id, topic_id, status='pending') -> request id"""
+    def make(sender_id, receiver_id, topic_id, status="pending"):
+        with db.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO mentorship_request (sender_id, receiver_id, topic_id, status)
+                VALUES (%s, %s, %s, %s)
+                RETURNING id
+                """,
+                (sender_id, receiver_id, topic_id, status)
+            )
+            return cur.fetchone()[0]
+    return make
+
+
+@pytest.fixture
+def login(fetch):
+    """login(person_id) -> a test client with that user's session"""
+    def make(person_id):
+        client = web.app.test_client()
+        with client.session_transaction() as sess:
+            sess["user_id"] = person_id
+            sess["identity_role"] = fetch("SELECT identity_role FROM person WHERE id = %s", person_id)[0][0]
+        return client
+    return make
+
+
+@pytest.fixture
+def post_json():
+    """post_json(client, url, payload) -> (status code, JSON body)"""
+    def post(client, url, payload):
+        response = client.post(url, json=payload)
+        return response.status_code, response.get_json()
+    return post
+
+
+@pytest.fixture
+def set_status(post_json):
+    """set_status(client, request_id, status) through the single-request status route"""
+    def post(client, request_id, status):
+        return post_json(client, f"/api/requests-management/request/{request_id}/status", {"status": status})
+    return post
+
+
+@pytest.fixture
+def mentorships(fetch):
+    """mentorships() -> [(student_id, alumni_id, topic_id, mentorship_type)] in id order"""
+    return lambda: fetch(
+        "SELECT student_id, alumni_id, topic_id, mentorship_type FROM mentorship ORDER BY id"
+    )
+
+
+@pytest.fixture
+def request_row(fetch):
+    """request_row(request_id) -> (status, mentorship_id)"""
+    return lambda request_id: fetch(
+        "SELECT status, mentorship_id FROM mentorship_request WHERE id = %s", request_id
+    )[0]
+
+
+@pytest.fixture
+def request_rows(fetch):
+    """request_rows() -> [(sender_id, receiver_id, topic_id, status)] in id order"""
+    return lambda: fetch(
+        "SELECT sender_id, receiver_id, topic_id, status FROM mentorship_request ORDER BY id"
+    )
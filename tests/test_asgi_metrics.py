@@ -0,0 +1,91 @@
+"""asgi.py's async routes record the same per-route metrics as the Flask app"""
+import asyncio
+import re
+
+import pytest
+
+pytest.importorskip("psycopg_pool")
+pytest.importorskip("asgiref")
+import asgi  # noqa: E402
+import app as web  # noqa: E402
+
+OVERVIEW_RULE = "/api/requests-management/overview"
+
+
+def call(path, cookie=""):
+    """Run one GET through asgi.application -> (messages sent, exception or None)"""
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "GET", "scheme": "http", "path": path,
+        "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"localhost"), (b"cookie", cookie.encode())],
+        "client": ("127.0.0.1", 1), "server": ("localhost", 80)
+    }
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    async def run():
+        try:
+            await asgi.application(scope, receive, send)
+        except Exception as e:
+            return e
+        finally:
+            await asgi.close_async_pool()
+
+    return sent, asyncio.run(run())
+
+
+def route_totals(route):
+    entry = web.route_metrics._routes.get(("GET", route), {})
+    return entry.get("count", 0), entry.get("queries", 0), entry.get("bytes", 0)
+
+
+def statuses(route, status):
+    return web.route_metrics._statuses.get(("GET", route, status), 0)
+
+
+def test_async_route_records_metrics(make_person, login):
+    client = login(make_person("student"))
+    cookie = f"session={client.get_cookie('session').value}"
+    count, queries, size = route_totals(OVERVIEW_RULE)
+    ok = statuses(OVERVIEW_RULE, 200)
+
+    sent, error = call(OVERVIEW_RULE, cookie)
+
+    assert error is None and sent[0]["status"] == 200
+    assert route_totals(OVERVIEW_RULE) == (count + 1, queries + 1, size + len(sent[1]["body"]))
+    assert statuses(OVERVIEW_RULE, 200) == ok + 1
+
+
+def test_error_before_response_sends_500(db, monkeypatch):
+    async def fail(req, send):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(asgi, "ASYNC_ROUTES", [(re.compile(OVERVIEW_RULE), fail)])
+    failed = statuses(OVERVIEW_RULE, 500)
+
+    sent, error = call(OVERVIEW_RULE)
+
+    assert error is None
+    assert [m["type"] for m in sent] == ["http.response.start", "http.response.body"]
+    assert sent[0]["status"] == 500 and sent[1]["body"] == b'{"error":"boom"}\n'
+    assert statuses(OVERVIEW_RULE, 500) == failed + 1
+
+
+def test_error_after_response_started_is_raised(db, monkeypatch):
+    async def fail(req, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(asgi, "ASYNC_ROUTES", [(re.compile(OVERVIEW_RULE), fail)])
+    ok = statuses(OVERVIEW_RULE, 200)
+
+    sent, error = call(OVERVIEW_RULE)
+
+    assert isinstance(error, RuntimeError)
+    assert [m["type"] for m in sent] == ["http.response.start"]
+    assert statuses(OVERVIEW_RULE, 200) == ok + 1
@@ -0,0 +1,67 @@
+"""POST /api/requests-management/requests/status"""
+import pytest
+
+BULK_URL = "/api/requests-management/requests/status"
+
+
+def test_bulk_accept_partial_failure(fetch, make_person, make_request, login, post_json, request_row):
+    alumni = make_person("alumni", {1: "mentor", 2: "mentor", 3: "mentor"})
+    good = make_request(make_person("student", {1: "mentee"}), alumni, 1)
+    done = make_request(make_person("student", {2: "mentee"}), alumni, 2, status="rejected")
+    no_type = make_request(make_person("student", {3: "mentor"}), alumni, 3)
+    other_alumni = make_person("alumni", {1: "mentor"})
+    not_mine = make_request(make_person("student", {1: "mentee"}), other_alumni, 1)
+    also_good = make_request(make_person("student", {2: "two_way", 1: "mentee"}), alumni, 1)
+
+    status, body = post_json(login(alumni), BULK_URL, {
+        "request_ids": [no_type, good, done, not_mine, 9999, also_good, good],
+        "status": "accepted"
+    })
+
+    assert status == 200
+    assert (body["updated"], body["failed"]) == (2, 4)
+    results = body["results"]
+    assert [r["request_id"] for r in results] == [no_type, good, done, not_mine, 9999, also_good]
+    assert results[0] == {
+        "request_id": no_type, "ok": False,
+        "error": "Preference roles do not form a valid mentorship type"
+    }
+    assert results[1]["ok"] and results[1]["mentorship_id"]
+    assert results[2] == {"request_id": done, "ok": False, "error": "Only pending requests can be updated"}
+    assert results[3] == {"request_id": not_mine, "ok": False, "error": "Request not found"}
+    assert results[4] == {"request_id": 9999, "ok": False, "error": "Request not found"}
+    assert results[5]["ok"] and results[5]["mentorship_id"] != results[1]["mentorship_id"]
+
+    # The valid ones are applied, the rest left as they were
+    assert [request_row(r)[0] for r in (good, done, no_type, not_mine, also_good)] == [
+        "accepted", "rejected", "pending", "pending", "accepted"
+    ]
+    assert fetch("SELECT COUNT(*) FROM mentorship") == [(2,)]
+
+
+def test_bulk_reject_partial_failure(make_person, make_request, login, post_json, request_row):
+    alumni = make_person("alumni", {1: "mentor", 2: "mentor"})
+    pending = make_request(make_person("student", {1: "mentee"}), alumni, 1)
+    accepted = make_request(make_person("student", {2: "mentee"}), alumni, 2, status="accepted")
+
+    status, body = post_json(login(alumni), BULK_URL, {"request_ids": [accepted, pending], "status": "rejected"})
+
+    assert status == 200
+    assert body["results"] == [
+        {"request_id": accepted, "ok": False, "error": "Only pending requests can be updated"},
+        {"request_id": pending, "ok": True},
+    ]
+    assert (request_row(pending)[0], request_row(accepted)[0]) == ("rejected", "accepted")
+
+
+@pytest.mark.parametrize("payload, error", [
+    ({"request_ids": [1], "status": "pending"}, "Status must be 'accepted' or 'rejected'"),
+    ({"request_ids": [], "status": "accepted"}, "request_ids must be a non-empty list"),
+    ({"request_ids": 1, "status": "accepted"}, "request_ids must be a non-empty list"),
+    ({"request_ids": [1, "x"], "status": "accepted"}, "request_ids must be integers"),
+    ({"request_ids": [1, "2"], "status": "accepted"}, "request_ids must be integers"),
+    ({"request_ids": [1.0], "status": "accepted"}, "request_ids must be integers"),
+    ({"request_ids": [True], "status": "accepted"}, "request_ids must be integers"),
+])
+def test_bulk_rejects_bad_input(make_person, login, post_json, payload, error):
+    assert post_json(login(make_person("alumni")), BULK_URL, payload) == (400, {"error": error})
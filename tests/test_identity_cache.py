@@ -0,0 +1,36 @@
+"""The identity cache stores and what a listener reconnect clears"""
+import app as web
+
+
+def test_memory_store_is_bounded():
+    store = web.MemoryIdentityStore(ttl=60, max_entries=2)
+    store.set(1, {"id": 1})
+    store.set(2, {"id": 2})
+    assert store.get(1) == {"id": 1}
+
+    # 2 is now the least recently used
+    store.set(3, {"id": 3})
+    assert (store.get(1), store.get(2), store.get(3)) == ({"id": 1}, None, {"id": 3})
+
+
+def test_memory_store_expires():
+    store = web.MemoryIdentityStore(ttl=0, max_entries=2)
+    store.set(1, {"id": 1})
+    assert store.get(1) is None
+
+
+def test_reconnect_clears_local_store_only(monkeypatch):
+    local = web.MemoryIdentityStore(ttl=60, max_entries=10)
+    local.set(1, {"id": 1})
+    monkeypatch.setattr(web, "identity_store", local)
+    web._invalidate_person_caches()
+    assert local.get(1) is None
+
+    class SharedStore(web.MemoryIdentityStore):
+        shared = True
+
+    shared = SharedStore(ttl=60, max_entries=10)
+    shared.set(1, {"id": 1})
+    monkeypatch.setattr(web, "identity_store", shared)
+    web._invalidate_person_caches()
+    assert shared.get(1) == {"id": 1}
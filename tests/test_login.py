@@ -0,0 +1,73 @@
+"""POST /api/auth/register and /api/auth/login identifiers"""
+import app as web
+
+REGISTER_URL = "/api/auth/register"
+LOGIN_URL = "/api/auth/login"
+
+
+def register(post_json, username, email, password="pw-1"):
+    return post_json(web.app.test_client(), REGISTER_URL, {
+        "username": username, "email": email, "password": password, "identity_role": "student"
+    })
+
+
+def log_in(post_json, identifier, password):
+    client = web.app.test_client()
+    status, body = post_json(client, LOGIN_URL, {"identifier": identifier, "password": password})
+    with client.session_transaction() as sess:
+        return status, sess.get("user_id")
+
+
+def test_login_by_username_or_email_in_any_case(db, post_json):
+    person_id = register(post_json, "Mari", "Mari@Example.test")[1]["person_id"]
+
+    for identifier in ("Mari", "mari", "MARI", "Mari@Example.test", "mari@example.test"):
+        assert log_in(post_json, identifier, "pw-1") == (200, person_id)
+    assert log_in(post_json, "mari", "wrong") == (401, None)
+    assert log_in(post_json, "nobody", "pw-1") == (401, None)
+
+
+def test_login_username_with_at_sign(db, post_json):
+    person_id = register(post_json, "mari@home", "mari@example.test")[1]["person_id"]
+
+    assert log_in(post_json, "mari@home", "pw-1") == (200, person_id)
+
+
+def test_register_rejects_case_insensitive_collisions(db, post_json):
+    assert register(post_json, "mari", "mari@example.test")[0] == 201
+
+    conflict = (409, {"error": "Username or email already exists"})
+    assert register(post_json, "MARI", "other@example.test") == conflict
+    assert register(post_json, "other", "MARI@example.test") == conflict
+    # A username may not equal another account's email, nor the other way round
+    assert register(post_json, "Mari@Example.test", "other@example.test") == conflict
+    assert register(post_json, "other", "Mari") == conflict
+
+
+def test_login_tries_every_candidate(fetch, post_json):
+    # From before the registration check: one account's username is another's email
+    first, second = (
+        fetch(
+            """
+            INSERT INTO person (username, email, password_hash, identity_role)
+            VALUES (%s, %s, %s, 'student')
+            RETURNING id
+            """,
+            username, email, web.hash_password(password)
+        )[0][0]
+        for username, email, password in (
+            ("shared@example.test", "first@example.test", "first-pw"),
+            ("second", "shared@example.test", "second-pw"),
+        )
+    )
+
+    assert log_in(post_json, "shared@example.test", "first-pw") == (200, first)
+    assert log_in(post_json, "shared@example.test", "second-pw") == (200, second)
+    assert log_in(post_json, "shared@example.test", "wrong") == (401, None)
+
+
+def test_register_lower_cases_email(fetch, post_json):
+    person_id = register(post_json, "Mari", " Mari@Example.test ")[1]["person_id"]
+
+    # Same as the people import
+    assert fetch("SELECT username, email FROM person WHERE id = %s", person_id) == [("Mari", "mari@example.test")]
@@ -0,0 +1,104 @@
+"""POST /api/matching/request and the (pair_low, pair_high, topic_id) key"""
+import threading
+import time
+
+import psycopg2
+import pytest
+
+REQUEST_URL = "/api/matching/request"
+
+
+@pytest.fixture
+def send(post_json):
+    """send(client, receiver_id, topic_id)"""
+    return lambda client, receiver_id, topic_id: post_json(
+        client, REQUEST_URL, {"receiver_id": receiver_id, "topic_id": topic_id}
+    )
+
+
+def wait_for_lock_wait(fetch, timeout=10):
+    """Wait until some backend is blocked on a lock"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if fetch("SELECT 1 FROM pg_stat_activity WHERE wait_event_type = 'Lock' AND datname = current_database()"):
+            return
+        time.sleep(0.01)
+    raise AssertionError("no backend waited on a lock")
+
+
+def test_request_created(make_person, login, send, request_rows):
+    student = make_person("student", {1: "mentee"})
+    alumni = make_person("alumni", {1: "mentor"})
+
+    status, body = send(login(student), alumni, 1)
+
+    assert status == 201 and body["ok"]
+    assert request_rows() == [(student, alumni, 1, "pending")]
+
+
+def test_reverse_request_conflicts(make_person, login, send, request_rows):
+    student = make_person("student", {1: "mentee", 2: "two_way"})
+    alumni = make_person("alumni", {1: "mentor", 2: "two_way"})
+    assert send(login(student), alumni, 1)[0] == 201
+
+    assert send(login(alumni), student, 1) == (409, {"error": "Request already exists with status: pending"})
+    assert send(login(student), alumni, 1) == (409, {"error": "Request already exists with status: pending"})
+    # Another topic for the same pair is a separate request
+    assert send(login(alumni), student, 2)[0] == 201
+    assert len(request_rows()) == 2
+
+
+def test_reverse_request_reports_status(make_person, make_request, login, send):
+    student = make_person("student", {1: "mentee"})
+    alumni = make_person("alumni", {1: "mentor"})
+    make_request(alumni, student, 1, status="rejected")
+
+    assert send(login(student), alumni, 1) == (409, {"error": "Request already exists with status: rejected"})
+
+
+def test_concurrent_reverse_request_conflicts(db_dsn, fetch, make_person, login, send, request_rows):
+    student = make_person("student", {1: "mentee"})
+    alumni = make_person("alumni", {1: "mentor"})
+    client = login(alumni)
+
+    # The student's request is in flight when the alumni sends theirs
+    first = psycopg2.connect(db_dsn)
+    try:
+        with first.cursor() as cur:
+            cur.execute(
+                "INSERT INTO mentorship_request (sender_id, receiver_id, topic_id) VALUES (%s, %s, 1)",
+                (student, alumni)
+            )
+
+        outcome = []
+        second = threading.Thread(target=lambda: outcome.append(send(client, student, 1)))
+        second.start()
+        wait_for_lock_wait(fetch)
+        first.commit()
+        second.join(timeout=10)
+    finally:
+        first.close()
+
+    assert outcome == [(409, {"error": "Request already exists with status: pending"})]
+    assert request_rows() == [(student, alumni, 1, "pending")]
+
+
+def test_simultaneous_requests_create_one(make_person, login, send, request_rows):
+    student = make_person("student", {1: "two_way"})
+    alumni = make_person("alumni", {1: "two_way"})
+    clients = [(login(student), alumni), (login(alumni), student)]
+    barrier = threading.Barrier(len(clients))
+    outcomes = []
+
+    def worker(client, receiver_id):
+        barrier.wait()
+        outcomes.append(send(client, receiver_id, 1)[0])
+
+    threads = [threading.Thread(target=worker, args=pair) for pair in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    assert sorted(outcomes) == [201, 409]
+    assert len(request_rows()) == 1
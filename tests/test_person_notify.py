@@ -0,0 +1,19 @@
+"""PERSON_CHANNEL payloads and which ones a worker acts on"""
+import os
+
+import app as web
+
+
+def test_worker_skips_its_own_notifications(db, monkeypatch):
+    refreshed = []
+    invalidated = []
+    monkeypatch.setattr(web, "_refresh_person_caches", lambda cur, person_id: refreshed.append(person_id))
+    monkeypatch.setattr(web, "_invalidate_person_caches", lambda: invalidated.append(True))
+
+    web._on_person_notify(f"1:{os.getpid()}")
+    web._on_person_notify(f"2:{os.getpid() + 1}")
+    web._on_person_notify("3")
+    web._on_person_notify("garbage")
+
+    assert refreshed == [2, 3]
+    assert invalidated == [True]
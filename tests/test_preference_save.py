@@ -0,0 +1,85 @@
+"""POST /api/preference/save applies only the difference to what is stored"""
+import pytest
+
+SAVE_URL = "/api/preference/save"
+
+
+@pytest.fixture
+def save(post_json):
+    """save(client, {topic_id: preference_role})"""
+    def post(client, prefs):
+        return post_json(client, SAVE_URL, {
+            "preferences": [{"topic_id": t, "preference_role": r} for t, r in prefs.items()]
+        })
+    return post
+
+
+@pytest.fixture
+def stored(fetch):
+    """stored(person_id) -> {topic_id: (preference_role, xmin)}; xmin changes whenever a row is rewritten"""
+    return lambda person_id: {
+        row[0]: (row[1], row[2]) for row in fetch(
+            "SELECT topic_id, preference_role, xmin::text FROM preference WHERE person_id = %s", person_id
+        )
+    }
+
+
+def test_save_applies_the_difference(make_person, login, save, stored):
+    person = make_person("student", {1: "mentee", 2: "mentor", 4: "two_way"})
+    before = stored(person)
+
+    status, body = save(login(person), {1: "mentee", 2: "two_way", 3: "mentor"})
+
+    assert status == 200
+    assert body == {"ok": True, "added": [3], "removed": [4], "changed": [2]}
+    after = stored(person)
+    assert {t: role for t, (role, _) in after.items()} == {1: "mentee", 2: "two_way", 3: "mentor"}
+    # The unchanged row is left alone
+    assert after[1] == before[1]
+    assert after[2][1] != before[2][1]
+
+
+def test_save_unchanged(make_person, login, save, stored):
+    person = make_person("student", {1: "mentee", 2: "mentor"})
+    before = stored(person)
+
+    assert save(login(person), {2: "mentor", 1: "mentee"}) == (
+        200, {"ok": True, "added": [], "removed": [], "changed": []}
+    )
+    assert stored(person) == before
+
+
+def test_save_empty_removes_everything(make_person, login, save, stored):
+    person = make_person("alumni", {1: "mentor", 3: "mentor"})
+
+    assert save(login(person), {}) == (200, {"ok": True, "added": [], "removed": [1, 3], "changed": []})
+    assert stored(person) == {}
+
+
+def test_save_leaves_other_people_alone(make_person, login, save, stored):
+    person = make_person("student", {1: "mentee"})
+    other = make_person("student", {1: "mentor", 2: "mentee"})
+    other_before = stored(other)
+
+    assert save(login(person), {2: "two_way"})[0] == 200
+    assert stored(other) == other_before
+
+
+def test_save_invalid_role(make_person, login, save, stored):
+    person = make_person("student", {1: "mentee"})
+    before = stored(person)
+
+    assert save(login(person), {1: "mentor", 2: "coach"}) == (400, {"error": "Invalid preference role"})
+    assert stored(person) == before
+
+
+def test_save_updates_match_index(make_person, login, save):
+    student = make_person("student", {1: "mentee"})
+    alumni = make_person("alumni", {2: "mentor"})
+    client = login(student)
+
+    assert client.get("/api/matching/search").get_json()["results"] == []
+    assert save(client, {2: "mentee"})[0] == 200
+
+    results = client.get("/api/matching/search").get_json()["results"]
+    assert [(r["person_id"], r["topic_id"]) for r in results] == [(alumni, 2)]
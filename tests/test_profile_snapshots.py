@@ -0,0 +1,18 @@
+"""Which profile snapshots a person change reloads"""
+import app as web
+
+
+def test_person_change_refreshes_only_cached_snapshots(make_person, login, fetch):
+    viewed = make_person("alumni", {1: "mentor"})
+    unviewed = make_person("alumni", {1: "mentor"})
+    client = login(make_person("student"))
+    assert client.get(f"/api/matching/public-profile/{viewed}").status_code == 200
+
+    fetch("UPDATE preference SET preference_role = 'two_way' WHERE person_id IN (%s, %s)", viewed, unviewed)
+    web.person_changed(viewed)
+    web.person_changed(unviewed)
+
+    assert viewed in web.profile_snapshots
+    assert unviewed not in web.profile_snapshots
+    body = client.get(f"/api/matching/public-profile/{viewed}").get_json()
+    assert body["preferences"][0]["preference_role"] == "two_way"
@@ -0,0 +1,173 @@
+"""ACCEPT_REQUESTS_SQL and rejecting through the single-request status route"""
+import pytest
+
+
+@pytest.mark.parametrize("student_role, alumni_role, mentorship_type", [
+    ("mentee", "mentor", "traditional"),
+    ("mentor", "mentee", "reverse"),
+    ("two_way", "two_way", "two_way"),
+])
+def test_accept_creates_mentorship(make_person, make_request, login, set_status, mentorships, request_row,
+                                   student_role, alumni_role, mentorship_type):
+    student = make_person("student", {1: student_role})
+    alumni = make_person("alumni", {1: alumni_role})
+    request_id = make_request(student, alumni, 1)
+
+    status, body = set_status(login(alumni), request_id, "accepted")
+
+    assert status == 200 and body["ok"]
+    assert mentorships() == [(student, alumni, 1, mentorship_type)]
+    assert request_row(request_id) == ("accepted", body["mentorship_id"])
+
+
+def test_accept_from_alumni_sender(make_person, make_request, login, set_status, mentorships):
+    student = make_person("student", {2: "mentee"})
+    alumni = make_person("alumni", {2: "mentor"})
+    request_id = make_request(alumni, student, 2)
+
+    assert set_status(login(student), request_id, "accepted")[0] == 200
+    assert mentorships() == [(student, alumni, 2, "traditional")]
+
+
+def test_accept_already_accepted(make_person, make_request, login, set_status, mentorships):
+    student = make_person("student", {1: "mentee"})
+    alumni = make_person("alumni", {1: "mentor"})
+    request_id = make_request(student, alumni, 1)
+    client = login(alumni)
+
+    assert set_status(client, request_id, "accepted")[0] == 200
+    assert set_status(client, request_id, "accepted") == (400, {"error": "Only pending requests can be updated"})
+    assert len(mentorships()) == 1
+
+
+def test_accept_reuses_existing_mentorship(fetch, make_person, make_request, login, set_status, mentorships,
+                                           request_row):
+    student = make_person("student", {1: "mentee"})
+    alumni = make_person("alumni", {1: "mentor"})
+    existing = fetch(
+        """
+        INSERT INTO mentorship (student_id, alumni_id, topic_id, mentorship_type, status)
+        VALUES (%s, %s, 1, 'two_way', 'active')
+        RETURNING id
+        """,
+        student, alumni
+    )[0][0]
+    request_id = make_request(student, alumni, 1)
+
+    status, body = set_status(login(alumni), request_id, "accepted")
+
+    assert status == 200 and body["mentorship_id"] == existing
+    assert mentorships() == [(student, alumni, 1, "two_way")]
+    assert request_row(request_id) == ("accepted", existing)
+
+
+def test_accept_not_found(make_person, make_request, login, set_status, request_row):
+    student = make_person("student", {1: "mentee"})
+    alumni = make_person("alumni", {1: "mentor"})
+    request_id = make_request(student, alumni, 1)
+
+    # Only the receiver can answer a request
+    assert set_status(login(student), request_id, "accepted") == (404, {"error": "Request not found"})
+    assert set_status(login(alumni), request_id + 1, "accepted") == (404, {"error": "Request not found"})
+    assert request_row(request_id) == ("pending", None)
+
+
+def test_accept_same_identity_roles(make_person, make_request, login, set_status):
+    sender = make_person("student", {1: "mentee"})
+    receiver = make_person("student", {1: "mentor"})
+    request_id = make_request(sender, receiver, 1)
+
+    assert set_status(login(receiver), request_id, "accepted") == (
+        400, {"error": "Invalid request identities. One user must be student and the other must be alumni."}
+    )
+
+
+@pytest.mark.parametrize("subtype, error", [
+    ("student", "Student subtype record not found"),
+    ("alumni", "Alumni subtype record not found"),
+])
+def test_accept_missing_subtype(fetch, make_person, make_request, login, set_status, subtype, error):
+    people = {"student": make_person("student", {1: "mentee"}), "alumni": make_person("alumni", {1: "mentor"})}
+    request_id = make_request(people["student"], people["alumni"], 1)
+    fetch(f"DELETE FROM {subtype} WHERE person_id = %s", people[subtype])
+
+    assert set_status(login(people["alumni"]), request_id, "accepted") == (400, {"error": error})
+
+
+def test_accept_missing_preference(make_person, make_request, login, set_status):
+    student = make_person("student", {1: "mentee"})
+    alumni = make_person("alumni", {2: "mentor"})
+    request_id = make_request(student, alumni, 1)
+
+    assert set_status(login(alumni), request_id, "accepted") == (
+        400, {"error": "Missing preference records for this topic"}
+    )
+
+
+def test_accept_roles_without_mentorship_type(make_person, make_request, login, set_status, mentorships):
+    student = make_person("student", {1: "mentor"})
+    alumni = make_person("alumni", {1: "mentor"})
+    request_id = make_request(student, alumni, 1)
+
+    assert set_status(login(alumni), request_id, "accepted") == (
+        400, {"error": "Preference roles do not form a valid mentorship type"}
+    )
+    assert mentorships() == []
+
+
+def test_accept_checks_status_first(fetch, make_person, make_request, login, set_status):
+    # Fails the identity, subtype and preference checks too; status wins
+    sender = make_person("student")
+    receiver = make_person("student")
+    request_id = make_request(sender, receiver, 1, status="rejected")
+    fetch("DELETE FROM student WHERE person_id = %s", sender)
+
+    assert set_status(login(receiver), request_id, "accepted") == (
+        400, {"error": "Only pending requests can be updated"}
+    )
+
+
+def test_accept_checks_identities_before_subtypes(fetch, make_person, make_request, login, set_status):
+    sender = make_person("alumni")
+    receiver = make_person("alumni")
+    request_id = make_request(sender, receiver, 1)
+    fetch("DELETE FROM alumni WHERE person_id = %s", sender)
+
+    status, body = set_status(login(receiver), request_id, "accepted")
+
+    assert status == 400 and body["error"].startswith("Invalid request identities")
+
+
+def test_accept_checks_subtypes_before_preferences(fetch, make_person, make_request, login, set_status):
+    student = make_person("student")
+    alumni = make_person("alumni")
+    request_id = make_request(student, alumni, 1)
+    fetch("DELETE FROM student WHERE person_id = %s", student)
+
+    assert set_status(login(alumni), request_id, "accepted") == (
+        400, {"error": "Student subtype record not found"}
+    )
+
+
+def test_reject(make_person, make_request, login, set_status, mentorships, request_row):
+    student = make_person("student", {1: "mentee"})
+    alumni = make_person("alumni", {1: "mentor"})
+    request_id = make_request(student, alumni, 1)
+    client = login(alumni)
+
+    status, body = set_status(client, request_id, "rejected")
+    assert status == 200 and body["ok"]
+    assert request_row(request_id) == ("rejected", None)
+
+    assert set_status(client, request_id, "rejected") == (400, {"error": "Only pending requests can be updated"})
+    assert set_status(client, request_id, "accepted") == (400, {"error": "Only pending requests can be updated"})
+    assert mentorships() == []
+
+
+def test_reject_not_found(make_person, make_request, login, set_status, request_row):
+    student = make_person("student", {1: "mentee"})
+    alumni = make_person("alumni", {1: "mentor"})
+    request_id = make_request(student, alumni, 1)
+
+    assert set_status(login(student), request_id, "rejected") == (404, {"error": "Request not found"})
+    assert request_row(request_id) == ("pending", None)
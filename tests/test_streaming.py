@@ -0,0 +1,65 @@
+"""?stream=1 responses and what happens when one fails part way"""
+import contextlib
+import json
+
+import app as web
+
+
+def test_failed_stream_rolls_back_and_ends_with_error(make_person, login, monkeypatch):
+    student = make_person("student", {1: "mentee"})
+    for _ in range(3):
+        make_person("alumni", {1: "mentor"})
+
+    outcomes = []
+    get_conn = web.get_conn
+
+    @contextlib.contextmanager
+    def recording_get_conn():
+        with get_conn() as conn:
+            try:
+                yield conn
+            except Exception as e:
+                outcomes.append(e)
+                raise
+            outcomes.append(None)
+
+    items = []
+
+    def search_item(row, roles):
+        if items:
+            raise RuntimeError("boom")
+        items.append(row)
+        return {"person_id": row[0]}
+
+    monkeypatch.setattr(web, "get_conn", recording_get_conn)
+    monkeypatch.setattr(web, "_search_item", search_item)
+    monkeypatch.setattr(web, "STREAM_CHUNK_BYTES", 1)
+
+    response = login(student).get("/api/matching/search?stream=1")
+    body = response.get_data(as_text=True)
+
+    partial, error = body.split(web.STREAM_ERROR_MARKER)
+    assert partial == '{"results":[{"person_id":%d}' % items[0][0]
+    assert json.loads(error) == {"error": "boom"}
+    # The streaming connection is the last one borrowed
+    assert isinstance(outcomes[-1], RuntimeError)
+
+
+def test_stream_commits_on_success(make_person, login, monkeypatch):
+    student = make_person("student", {1: "mentee"})
+    alumni = make_person("alumni", {1: "mentor"})
+    outcomes = []
+    get_conn = web.get_conn
+
+    @contextlib.contextmanager
+    def recording_get_conn():
+        with get_conn() as conn:
+            yield conn
+            outcomes.append(None)
+
+    monkeypatch.setattr(web, "get_conn", recording_get_conn)
+
+    body = login(student).get("/api/matching/search?stream=1").get_json()
+
+    assert [r["person_id"] for r in body["results"]] == [alumni]
+    assert outcomes and set(outcomes) == {None}